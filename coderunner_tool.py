@@ -17,7 +17,7 @@ def run_code(language: str, code: str, timeout: int = 10) -> Dict[str, str]:
     try:
         proc = subprocess.run(
             cmd,
-            input=code.encode(),
+            input=code,
             capture_output=True,
             text=True,
             timeout=timeout,
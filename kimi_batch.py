@@ -0,0 +1,54 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Batch-Verarbeitung
+Parallele Abarbeitung vieler unabhängiger Anfragen mit begrenzter Nebenläufigkeit
+"""
+
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+ProgressCallback = Callable[[int, int, Dict[str, Any]], None]
+
+
+def run_batch(func: Callable[[Any], Any], items: Sequence[Any], concurrency: int = 4,
+              on_progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+    """
+    Funktion parallel auf alle Items anwenden
+
+    Fehler einzelner Items brechen den Batch nicht ab, sondern werden im
+    jeweiligen Ergebnis vermerkt.
+
+    Args:
+        func: Funktion, die pro Item aufgerufen wird
+        items: Eingaben (Reihenfolge bleibt im Ergebnis erhalten)
+        concurrency: Maximale Anzahl gleichzeitiger Aufrufe
+        on_progress: Optional callback(erledigt, gesamt, ergebnis) nach jedem Item
+
+    Returns:
+        Liste von Dicts mit index, input, result und error - in Eingabereihenfolge
+    """
+    if concurrency < 1:
+        raise ValueError("concurrency muss mindestens 1 sein")
+
+    total = len(items)
+    results: List[Optional[Dict[str, Any]]] = [None] * total
+    if not total:
+        return []
+
+    def _run(index: int) -> Dict[str, Any]:
+        try:
+            return {"index": index, "input": items[index], "result": func(items[index]), "error": None}
+        except Exception as e:
+            return {"index": index, "input": items[index], "result": None, "error": str(e)}
+
+    with ThreadPoolExecutor(max_workers=min(concurrency, total)) as pool:
+        futures = [pool.submit(_run, i) for i in range(total)]
+        for done, future in enumerate(as_completed(futures), 1):
+            item = future.result()
+            results[item["index"]] = item
+            if on_progress:
+                on_progress(done, total, item)
+
+    return results
@@ -0,0 +1,485 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Latenz-Benchmark
+Misst den Overhead der Client-Schicht gegen den lokalen Stand-in Server
+
+Für jede Kombination aus Client (KimiClient, KimiMoonshotClient), Operation
+(chat, chat_stream, conversation_stream, tool_call) und Nebenläufigkeit
+(Standard 1/10/100) werden Latenz-Perzentile, TTFT, Chunks/Sekunde,
+CPU-Zeit pro Anfrage und Peak-RSS gemessen. Als Referenz dient derselbe
+Request über rohes http.client ("raw") - die Differenz ist der Overhead
+der Client-Schicht. Ergebnisse werden als JSON gespeichert und lassen sich
+mit --compare zwischen Commits vergleichen.
+
+Starten:
+    python3 kimi_benchmark.py
+    python3 kimi_benchmark.py --concurrency 1 10 --requests 200 --compare benchmarks/alt.json
+"""
+
+import argparse
+import http.client
+import json
+import os
+import platform
+import subprocess
+import sys
+import threading
+import time
+from datetime import datetime
+from typing import Any, Callable, Dict, List, Optional, Sequence
+from urllib.parse import urlsplit
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from kimi_batch import run_batch
+from kimi_client import KimiClient
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_ratelimit import RateLimiter, set_shared_limiter
+
+OPERATIONS = ("chat", "chat_stream", "chat_stream_raw", "chat_stream_coalesced", "conversation_stream", "tool_call")
+STREAM_OPERATIONS = ("chat_stream", "chat_stream_raw", "chat_stream_coalesced", "conversation_stream")
+CLIENTS = {"KimiClient": KimiClient, "KimiMoonshotClient": KimiMoonshotClient}
+BASELINE = "raw"
+DEFAULT_CONCURRENCY = (1, 10, 100)
+
+BENCH_TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": "get_weather",
+        "description": "Retrieve weather information",
+        "parameters": {
+            "type": "object",
+            "required": ["city"],
+            "properties": {"city": {"type": "string", "description": "City name"}},
+        },
+    },
+}]
+
+# Sample = Messwerte einer einzelnen Anfrage
+Sample = Dict[str, Any]
+
+
+def percentile(values: Sequence[float], p: float) -> Optional[float]:
+    """Perzentil mit linearer Interpolation (p in 0-100)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = (len(ordered) - 1) * p / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+
+def _distribution_ms(values: Sequence[float]) -> Optional[Dict[str, float]]:
+    """p50/p95/p99/Mittelwert in Millisekunden"""
+    if not values:
+        return None
+    return {
+        "p50": round(percentile(values, 50) * 1000, 3),
+        "p95": round(percentile(values, 95) * 1000, 3),
+        "p99": round(percentile(values, 99) * 1000, 3),
+        "mean": round(sum(values) / len(values) * 1000, 3),
+    }
+
+
+def peak_rss_mb() -> Optional[float]:
+    """Höchststand des Arbeitsspeichers dieses Prozesses in MB"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux liefert KB, macOS Bytes
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024
+    return round(peak / divisor, 2)
+
+
+def _is_error_text(text: str) -> bool:
+    """Stream-Methoden melden Fehler als Text-Chunk statt als Exception"""
+    return text.startswith("❌")
+
+
+# --- Operationen über die Clients ---
+
+def _prompt(operation: str, index: int) -> str:
+    # Eindeutige Prompts, damit Single-Flight keine Anfragen zusammenfasst
+    return f"Benchmark {operation} Anfrage {index}"
+
+
+def _timed_stream(stream) -> Sample:
+    start = time.perf_counter()
+    ttft = None
+    chunks = []
+    for chunk in stream:
+        if ttft is None:
+            ttft = time.perf_counter() - start
+        chunks.append(chunk)
+    text = "".join(chunks)
+    if _is_error_text(text):
+        raise RuntimeError(text)
+    return {"latency": time.perf_counter() - start, "ttft": ttft, "chunks": len(chunks)}
+
+
+def _client_operation(client_class: type, operation: str, base_url: str) -> Optional[Callable[[int], Sample]]:
+    """Aufruf-Funktion für eine Client-Operation (None, wenn der Client sie nicht anbietet)"""
+    if operation == "tool_call" and not hasattr(client_class, "tool_call"):
+        return None
+
+    def new_client():
+        # chat_stream_raw: SSE-Fast-Path statt SDK-Objekten pro Chunk
+        return client_class(api_key="sk-benchmark", base_url=base_url, raw_sse=operation == "chat_stream_raw")
+
+    shared = new_client()
+    local = threading.local()
+
+    def call(index: int) -> Sample:
+        prompt = _prompt(operation, index)
+        if operation == "chat":
+            start = time.perf_counter()
+            shared.chat(prompt)
+            return {"latency": time.perf_counter() - start, "ttft": None, "chunks": 0}
+        if operation in ("chat_stream", "chat_stream_raw"):
+            return _timed_stream(shared.chat_stream([{"role": "user", "content": prompt}]))
+        if operation == "chat_stream_coalesced":
+            # chunks = Anzahl der Callbacks beim Aufrufer
+            return _timed_stream(shared.chat_stream([{"role": "user", "content": prompt}]).coalesce())
+        if operation == "conversation_stream":
+            # Verlauf ist Zustand - ein Client pro Worker-Thread
+            if not hasattr(local, "client"):
+                local.client = new_client()
+            return _timed_stream(local.client.conversation_stream(prompt))
+        start = time.perf_counter()
+        result = shared.tool_call(prompt, BENCH_TOOLS)
+        if "error" in result:
+            raise RuntimeError(result["error"])
+        return {"latency": time.perf_counter() - start, "ttft": None, "chunks": 0}
+
+    return call
+
+
+# --- Referenz: derselbe Request über rohes http.client ---
+
+def _raw_operation(operation: str, base_url: str) -> Callable[[int], Sample]:
+    """Aufruf-Funktion, die den Request ohne Client-Schicht sendet"""
+    url = urlsplit(base_url)
+    path = url.path.rstrip("/") + "/chat/completions"
+    headers = {"Authorization": "Bearer sk-benchmark", "Content-Type": "application/json"}
+    stream = operation in STREAM_OPERATIONS
+    local = threading.local()
+
+    def call(index: int) -> Sample:
+        if not hasattr(local, "conn"):
+            local.conn = http.client.HTTPConnection(url.hostname, url.port, timeout=60)
+        body: Dict[str, Any] = {
+            "model": "moonshot-v1-8k",
+            "messages": [{"role": "user", "content": _prompt(operation, index)}],
+            "temperature": 0.6,
+            "max_tokens": 4096,
+        }
+        if stream:
+            body["stream"] = True
+        if operation == "tool_call":
+            body["tools"] = BENCH_TOOLS
+            body["tool_choice"] = "auto"
+
+        start = time.perf_counter()
+        local.conn.request("POST", path, json.dumps(body).encode("utf-8"), headers)
+        response = local.conn.getresponse()
+        if response.status != 200:
+            response.read()
+            raise RuntimeError(f"HTTP {response.status}")
+        if not stream:
+            json.loads(response.read())
+            return {"latency": time.perf_counter() - start, "ttft": None, "chunks": 0}
+
+        ttft = None
+        chunks = 0
+        for line in response:
+            if not line.startswith(b"data: ") or line.startswith(b"data: [DONE]"):
+                continue
+            choices = json.loads(line[6:]).get("choices") or []
+            if choices and choices[0].get("delta", {}).get("content"):
+                if ttft is None:
+                    ttft = time.perf_counter() - start
+                chunks += 1
+        response.close()
+        return {"latency": time.perf_counter() - start, "ttft": ttft, "chunks": chunks}
+
+    return call
+
+
+# --- Messung ---
+
+def run_scenario(call: Callable[[int], Sample], concurrency: int, requests: int,
+                 warmup: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Eine Operation mit fester Nebenläufigkeit messen
+
+    Args:
+        call: Führt Anfrage Nummer i aus und liefert ein Sample
+        concurrency: Gleichzeitige Anfragen
+        requests: Anzahl gemessener Anfragen
+        warmup: Nicht gemessene Anfragen vorab (Standard: eine pro Worker)
+
+    Returns:
+        Dict mit Latenz/TTFT-Perzentilen, Durchsatz, CPU-Zeit und Peak-RSS
+    """
+    warmup = concurrency if warmup is None else warmup
+    if warmup:
+        run_batch(call, range(-warmup, 0), concurrency=concurrency)
+
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    items = run_batch(call, range(requests), concurrency=concurrency)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    samples = [item["result"] for item in items if item["error"] is None]
+    errors = [item["error"] for item in items if item["error"] is not None]
+    chunks = sum(s["chunks"] for s in samples)
+    return {
+        "concurrency": concurrency,
+        "requests": requests,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "wall_time_s": round(wall, 4),
+        "throughput_rps": round(len(samples) / wall, 2) if wall > 0 else None,
+        "latency_ms": _distribution_ms([s["latency"] for s in samples]),
+        "ttft_ms": _distribution_ms([s["ttft"] for s in samples if s["ttft"] is not None]),
+        "chunks_per_sec": round(chunks / wall, 1) if chunks and wall > 0 else None,
+        "cpu_ms_per_request": round(cpu / requests * 1000, 3) if requests else None,
+        "cpu_ms_per_1k_chunks": round(cpu / chunks * 1e6, 2) if chunks else None,
+        "peak_rss_mb": peak_rss_mb(),
+    }
+
+
+def _add_overhead(rows: List[Dict[str, Any]]):
+    """Overhead jeder Client-Messung gegenüber der raw-Referenz eintragen"""
+    baseline = {(r["operation"], r["concurrency"]): r for r in rows if r["client"] == BASELINE}
+    for row in rows:
+        raw = baseline.get((row["operation"], row["concurrency"]))
+        if row["client"] == BASELINE or raw is None:
+            continue
+        overhead: Dict[str, Optional[float]] = {}
+        for metric in ("latency_ms", "ttft_ms"):
+            if row[metric] and raw[metric]:
+                overhead[metric.replace("_ms", "_p50_ms")] = round(row[metric]["p50"] - raw[metric]["p50"], 3)
+        if row["cpu_ms_per_request"] is not None and raw["cpu_ms_per_request"] is not None:
+            overhead["cpu_ms_per_request"] = round(row["cpu_ms_per_request"] - raw["cpu_ms_per_request"], 3)
+        row["overhead"] = overhead
+
+
+def run_suite(base_url: str, concurrency_levels: Sequence[int] = DEFAULT_CONCURRENCY,
+              requests: Optional[int] = None, clients: Sequence[str] = tuple(CLIENTS),
+              operations: Sequence[str] = OPERATIONS,
+              on_row: Optional[Callable[[Dict[str, Any]], None]] = None) -> List[Dict[str, Any]]:
+    """
+    Alle Szenarien gegen einen laufenden Stand-in Server messen
+
+    Der prozessweite Rate-Limiter wird für die Dauer des Laufs deaktiviert,
+    damit nur der Overhead der Client-Schicht gemessen wird.
+
+    Args:
+        base_url: Endpoint des Stand-in Servers (…/v1)
+        concurrency_levels: Zu messende Nebenläufigkeiten
+        requests: Anfragen pro Szenario (Standard: max(50, 3 * Nebenläufigkeit))
+        clients: Client-Namen aus CLIENTS
+        operations: Operationen aus OPERATIONS
+        on_row: Optional callback(ergebnis) nach jedem Szenario
+
+    Returns:
+        Liste von Ergebnis-Dicts (client, operation, concurrency, Metriken)
+    """
+    rows = []
+    set_shared_limiter(RateLimiter())
+    try:
+        for concurrency in concurrency_levels:
+            count = requests or max(50, 3 * concurrency)
+            for operation in operations:
+                calls = [(BASELINE, _raw_operation(operation, base_url))]
+                calls += [(name, _client_operation(CLIENTS[name], operation, base_url)) for name in clients]
+                for name, call in calls:
+                    if call is None:
+                        continue
+                    row = {"client": name, "operation": operation}
+                    row.update(run_scenario(call, concurrency, count))
+                    rows.append(row)
+                    if on_row:
+                        on_row(row)
+    finally:
+        set_shared_limiter(None)
+    _add_overhead(rows)
+    return rows
+
+
+def start_standin(ttft: float = 0.0, token_delay: float = 0.0, response_tokens: int = 32):
+    """
+    Stand-in Server als eigenen Prozess starten
+
+    Ein separater Prozess hält CPU-Zeit und RSS des Servers aus den
+    Messwerten heraus.
+
+    Returns:
+        (Popen, base_url)
+    """
+    process = subprocess.Popen(
+        [sys.executable, "-u", os.path.join(os.path.dirname(os.path.abspath(__file__)), "kimi_standin_server.py"),
+         "--port", "0", "--ttft", str(ttft), "--token-delay", str(token_delay),
+         "--response-tokens", str(response_tokens)],
+        stdout=subprocess.PIPE, text=True,
+    )
+    for line in process.stdout:
+        if "Base URL:" in line:
+            return process, line.split("Base URL:", 1)[1].strip()
+    process.kill()
+    raise RuntimeError("Stand-in Server konnte nicht gestartet werden")
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def sse_cpu_savings(rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    CPU-Zeit pro 1000 Chunks: SDK-Stream (chat_stream) gegen SSE-Fast-Path (chat_stream_raw)
+
+    Returns:
+        Liste von Dicts (client, concurrency, sdk_ms, raw_ms, saved_ms, saved_pct)
+    """
+    by_key = {(r["client"], r["operation"], r["concurrency"]): r for r in rows}
+    savings = []
+    for (client, operation, concurrency), row in by_key.items():
+        raw = by_key.get((client, "chat_stream_raw", concurrency))
+        if operation != "chat_stream" or client == BASELINE or raw is None:
+            continue
+        sdk_ms, raw_ms = row.get("cpu_ms_per_1k_chunks"), raw.get("cpu_ms_per_1k_chunks")
+        if not sdk_ms or not raw_ms:
+            continue
+        savings.append({
+            "client": client,
+            "concurrency": concurrency,
+            "sdk_ms": sdk_ms,
+            "raw_ms": raw_ms,
+            "saved_ms": round(sdk_ms - raw_ms, 2),
+            "saved_pct": round((sdk_ms - raw_ms) / sdk_ms * 100, 1),
+        })
+    return savings
+
+
+def build_report(rows: List[Dict[str, Any]], settings: Dict[str, Any]) -> Dict[str, Any]:
+    """Ergebnisse mit Metadaten (Commit, Python, Plattform) für die JSON-Datei"""
+    return {
+        "meta": {
+            "timestamp": datetime.now().isoformat(timespec="seconds"),
+            "git_commit": _git_commit(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "settings": settings,
+        },
+        "results": rows,
+        "sse_cpu_savings": sse_cpu_savings(rows),
+    }
+
+
+def compare_reports(old: Dict[str, Any], new: Dict[str, Any], metric: str = "latency_ms") -> List[Dict[str, Any]]:
+    """
+    p50 einer Metrik zwischen zwei Läufen vergleichen
+
+    Returns:
+        Liste von Dicts (client, operation, concurrency, old, new, change_pct)
+    """
+    def index(report):
+        return {(r["client"], r["operation"], r["concurrency"]): r for r in report["results"]}
+
+    before = index(old)
+    rows = []
+    for key, row in index(new).items():
+        if key not in before or not row.get(metric) or not before[key].get(metric):
+            continue
+        old_value, new_value = before[key][metric]["p50"], row[metric]["p50"]
+        change = (new_value - old_value) / old_value * 100 if old_value else None
+        rows.append({"client": key[0], "operation": key[1], "concurrency": key[2],
+                     "old": old_value, "new": new_value,
+                     "change_pct": round(change, 1) if change is not None else None})
+    return rows
+
+
+def _format_row(row: Dict[str, Any]) -> str:
+    latency = row["latency_ms"] or {}
+    ttft = row["ttft_ms"] or {}
+    overhead = row.get("overhead", {}).get("latency_p50_ms")
+    return (f"{row['client']:<19} {row['operation']:<20} c={row['concurrency']:<4} "
+            f"p50={latency.get('p50', '-'):>8} p95={latency.get('p95', '-'):>8} p99={latency.get('p99', '-'):>8} "
+            f"ttft={ttft.get('p50', '-'):>8} chunks/s={row['chunks_per_sec'] or '-':>8} "
+            f"cpu/req={row['cpu_ms_per_request']:>7} "
+            + (f"overhead={overhead:+.3f}ms " if overhead is not None else "")
+            + (f"❌ {row['errors']} Fehler" if row["errors"] else ""))
+
+
+def main():
+    """Benchmark-Suite ausführen und Ergebnisse als JSON speichern"""
+    parser = argparse.ArgumentParser(description="Latenz-Benchmark der Kimi-Clients gegen den Stand-in Server")
+    parser.add_argument("--concurrency", type=int, nargs="+", default=list(DEFAULT_CONCURRENCY))
+    parser.add_argument("--requests", type=int, default=None, help="Anfragen pro Szenario")
+    parser.add_argument("--clients", nargs="+", choices=list(CLIENTS), default=list(CLIENTS))
+    parser.add_argument("--operations", nargs="+", choices=OPERATIONS, default=list(OPERATIONS))
+    parser.add_argument("--ttft", type=float, default=0.0, help="Server-Verzögerung bis zum ersten Token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Server-Pause zwischen Chunks (s)")
+    parser.add_argument("--response-tokens", type=int, default=32)
+    parser.add_argument("--base-url", default=None, help="Bereits laufenden Stand-in Server verwenden")
+    parser.add_argument("--output", default=None, help="JSON-Datei (Standard: benchmarks/latency-<commit>-<zeit>.json)")
+    parser.add_argument("--compare", default=None, help="Früheren Lauf (JSON) zum Vergleich")
+    args = parser.parse_args()
+
+    print("⏱️  Kimi K2 Latenz-Benchmark")
+    process = None
+    base_url = args.base_url
+    if base_url is None:
+        process, base_url = start_standin(args.ttft, args.token_delay, args.response_tokens)
+    print(f"   Stand-in: {base_url}\n")
+
+    try:
+        rows = run_suite(base_url, args.concurrency, args.requests, args.clients, args.operations,
+                         on_row=lambda row: print(_format_row(row)))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    settings = {k: v for k, v in vars(args).items() if k not in ("output", "compare")}
+    report = build_report(rows, settings)
+
+    output = args.output
+    if output is None:
+        stamp = datetime.now().strftime("%Y%m%d-%H%M%S")
+        output = os.path.join("benchmarks", f"latency-{report['meta']['git_commit'] or 'unknown'}-{stamp}.json")
+    os.makedirs(os.path.dirname(output) or ".", exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2, ensure_ascii=False)
+    print(f"\n💾 Ergebnisse gespeichert: {output}")
+
+    if report["sse_cpu_savings"]:
+        print("\n🧮 CPU pro 1000 Chunks (SDK → SSE-Fast-Path):")
+        for row in report["sse_cpu_savings"]:
+            print(f"   {row['client']:<19} c={row['concurrency']:<4} {row['sdk_ms']:>8} ms → {row['raw_ms']:>8} ms "
+                  f"({-row['saved_ms']:+.2f} ms, {-row['saved_pct']:+.1f}%)")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            old = json.load(f)
+        print(f"\n📊 Vergleich mit {args.compare} (Latenz p50, ms):")
+        for row in compare_reports(old, report):
+            change = f"{row['change_pct']:+.1f}%" if row["change_pct"] is not None else "-"
+            print(f"   {row['client']:<19} {row['operation']:<20} c={row['concurrency']:<4} "
+                  f"{row['old']:>9} → {row['new']:>9}  {change}")
+
+
+if __name__ == "__main__":
+    main()
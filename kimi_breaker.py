@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Circuit Breaker
+Pro Modell: nach wiederholten Fehlern oder SLO-Verletzungen auf Fallback-Modelle ausweichen
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, List, Optional
+
+from kimi_context import context_window_for
+from kimi_ratelimit import is_retryable
+
+logger = logging.getLogger("kimi.breaker")
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Ausweichmodelle, größtes Kontextfenster zuerst
+DEFAULT_FALLBACKS: Dict[str, List[str]] = {
+    "kimi-k2-0711-preview": ["moonshot-v1-128k", "moonshot-v1-32k", "moonshot-v1-8k"],
+    "moonshot-v1-128k": ["moonshot-v1-32k", "moonshot-v1-8k"],
+    "moonshot-v1-32k": ["moonshot-v1-8k"],
+}
+
+
+class CircuitOpenError(Exception):
+    """Alle passenden Modelle sind gesperrt - schneller Fehler statt Timeout"""
+
+
+def parse_fallbacks(value: str) -> Dict[str, List[str]]:
+    """KIMI_FALLBACKS lesen: "modell=fallback1,fallback2;modell2=fallback3" """
+    fallbacks: Dict[str, List[str]] = {}
+    for entry in value.split(";"):
+        if "=" not in entry:
+            continue
+        model, chain = entry.split("=", 1)
+        fallbacks[model.strip()] = [name.strip() for name in chain.split(",") if name.strip()]
+    return fallbacks
+
+
+class CircuitBreaker:
+    """
+    Zustand eines Modells: closed -> open -> half_open -> closed
+
+    - closed: alle Anfragen erlaubt; ``failure_threshold`` Fehler bzw.
+      SLO-Verletzungen in Folge öffnen den Breaker
+    - open: keine Anfragen, bis ``open_seconds`` vergangen sind
+    - half_open: genau eine Probe-Anfrage; Erfolg schließt, Fehler öffnet erneut
+    """
+
+    def __init__(self, model: str, failure_threshold: int = 3, open_seconds: float = 30.0,
+                 on_transition: Optional[Callable[[str, str, str, str], None]] = None):
+        self.model = model
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self._probing = False
+        self._on_transition = on_transition
+        self._lock = threading.Lock()
+        self.stats = {"successes": 0, "failures": 0, "slo_breaches": 0, "rejected": 0, "opened": 0}
+
+    def _transition(self, state: str, reason: str):
+        previous, self.state = self.state, state
+        if state == OPEN:
+            self.opened_at = time.monotonic()
+            self.stats["opened"] += 1
+        if self._on_transition is not None:
+            self._on_transition(self.model, previous, state, reason)
+
+    def allow(self) -> bool:
+        """Darf eine Anfrage an dieses Modell gehen? (half_open: nur eine Probe gleichzeitig)"""
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self.opened_at >= self.open_seconds:
+                self._transition(HALF_OPEN, "Wartezeit abgelaufen")
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            self.stats["rejected"] += 1
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self.stats["successes"] += 1
+            self.failures = 0
+            self._probing = False
+            if self.state != CLOSED:
+                self._transition(CLOSED, "Probe erfolgreich")
+
+    def record_failure(self, reason: str, slo_breach: bool = False):
+        with self._lock:
+            self.stats["slo_breaches" if slo_breach else "failures"] += 1
+            self.failures += 1
+            probing, self._probing = self._probing, False
+            if self.state == HALF_OPEN and probing:
+                self._transition(OPEN, f"Probe fehlgeschlagen: {reason}")
+            elif self.state == CLOSED and self.failures >= self.failure_threshold:
+                self._transition(OPEN, f"{self.failures} Fehler in Folge: {reason}")
+
+    def release_probe(self):
+        """Probe ohne Ergebnis beenden (z.B. Client-Fehler wie 400)"""
+        with self._lock:
+            self._probing = False
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            info: Dict[str, Any] = dict(self.stats)
+            info["state"] = self.state
+            info["consecutive_failures"] = self.failures
+        return info
+
+
+class ModelBreakers:
+    """
+    Circuit Breaker pro Modell mit Fallback-Ketten
+
+    Ist der Breaker eines Modells offen, gehen Anfragen an die konfigurierten
+    Ausweichmodelle (z.B. 128k -> 32k -> 8k), sofern deren Kontextfenster
+    reicht. Scheitert ein Modell mit einem vorübergehenden Fehler (429, 5xx,
+    Timeout), wird sofort das nächste versucht. Eine Antwort langsamer als
+    ``slo`` Sekunden wird zurückgegeben, zählt aber als Verletzung.
+    Zustandswechsel landen in ``events`` und im Logger "kimi.breaker".
+    """
+
+    def __init__(self, fallbacks: Optional[Dict[str, List[str]]] = None, failure_threshold: int = 3,
+                 open_seconds: float = 30.0, slo: Optional[float] = None, max_events: int = 100,
+                 on_event: Optional[Callable[[Dict[str, Any]], None]] = None):
+        """
+        Args:
+            fallbacks: Modell -> Ausweichmodelle (Standard aus KIMI_FALLBACKS oder DEFAULT_FALLBACKS)
+            failure_threshold: Fehler/SLO-Verletzungen in Folge bis zum Öffnen
+            open_seconds: Sperrzeit bis zur Probe-Anfrage
+            slo: Latenz-Ziel in Sekunden bis zur Antwort bzw. zum Stream-Beginn (None = aus)
+            max_events: Anzahl gespeicherter Zustandswechsel
+            on_event: Optional callback(event) bei jedem Zustandswechsel
+        """
+        if fallbacks is None:
+            fallbacks = parse_fallbacks(os.getenv("KIMI_FALLBACKS", "")) or DEFAULT_FALLBACKS
+        self.fallbacks = fallbacks
+        self.failure_threshold = failure_threshold
+        self.open_seconds = open_seconds
+        self.slo = slo
+        self.events: deque = deque(maxlen=max_events)
+        self._on_event = on_event
+        self._lock = threading.Lock()
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._fallback_calls = 0
+
+    def breaker(self, model: str) -> CircuitBreaker:
+        with self._lock:
+            breaker = self._breakers.get(model)
+            if breaker is None:
+                breaker = self._breakers[model] = CircuitBreaker(model, self.failure_threshold, self.open_seconds,
+                                                                 self._record_event)
+            return breaker
+
+    def _record_event(self, model: str, previous: str, state: str, reason: str):
+        event = {"time": time.time(), "model": model, "from": previous, "to": state, "reason": reason}
+        self.events.append(event)
+        log = logger.warning if state == OPEN else logger.info
+        log("Circuit Breaker %s: %s -> %s (%s)", model, previous, state, reason)
+        if self._on_event is not None:
+            self._on_event(event)
+
+    def candidates(self, model: str, needed_tokens: int = 0) -> List[str]:
+        """Modell und passende Ausweichmodelle in Versuchsreihenfolge"""
+        chain = [model] + [name for name in self.fallbacks.get(model, []) if name != model]
+        return [name for name in chain if name == model or needed_tokens <= context_window_for(name)]
+
+    def call(self, model: str, func: Callable[[str], Any], needed_tokens: int = 0) -> Any:
+        """
+        func mit dem ersten verfügbaren Modell ausführen
+
+        Args:
+            model: Gewünschtes Modell
+            func: Erhält den Modellnamen und sendet die Anfrage
+            needed_tokens: Prompt + max_tokens (Fallbacks mit zu kleinem Kontext entfallen)
+
+        Raises:
+            CircuitOpenError: Wenn alle passenden Modelle gesperrt sind
+        """
+        last_error: Optional[Exception] = None
+        for name in self.candidates(model, needed_tokens):
+            breaker = self.breaker(name)
+            if not breaker.allow():
+                continue
+            if name != model:
+                with self._lock:
+                    self._fallback_calls += 1
+            start = time.perf_counter()
+            try:
+                result = func(name)
+            except Exception as e:
+                if not is_retryable(e):
+                    # Client-Fehler (400, 401, ...) sagen nichts über den Zustand des Modells
+                    breaker.release_probe()
+                    raise
+                breaker.record_failure(f"{type(e).__name__}: {e}")
+                last_error = e
+                continue
+            latency = time.perf_counter() - start
+            if self.slo is not None and latency > self.slo:
+                breaker.record_failure(f"SLO verletzt ({latency:.2f}s > {self.slo:.2f}s)", slo_breach=True)
+            else:
+                breaker.record_success()
+            return result
+        if last_error is not None:
+            raise last_error
+        raise CircuitOpenError(f"Circuit Breaker offen für {model} und alle Ausweichmodelle")
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Zustand pro Modell, Anzahl Fallback-Aufrufe und letzte Zustandswechsel"""
+        with self._lock:
+            breakers = dict(self._breakers)
+            fallback_calls = self._fallback_calls
+        return {
+            "models": {model: breaker.as_dict() for model, breaker in breakers.items()},
+            "fallback_calls": fallback_calls,
+            "events": list(self.events)[-10:],
+        }
+
+
+def circuit_breaker_enabled(enabled: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_CIRCUIT_BREAKER)"""
+    if enabled is not None:
+        return enabled
+    return os.getenv("KIMI_CIRCUIT_BREAKER", "0").lower() in ("1", "true", "yes")
+
+
+_shared_breakers: Optional[ModelBreakers] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_breakers() -> ModelBreakers:
+    """Prozessweite Breaker (KIMI_FALLBACKS, KIMI_SLO in Sekunden)"""
+    global _shared_breakers
+    with _shared_lock:
+        if _shared_breakers is None:
+            slo = os.getenv("KIMI_SLO")
+            _shared_breakers = ModelBreakers(slo=float(slo) if slo else None)
+        return _shared_breakers
+
+
+def set_shared_breakers(breakers: Optional[ModelBreakers]):
+    """Prozessweite Breaker ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_breakers
+    with _shared_lock:
+        _shared_breakers = breakers
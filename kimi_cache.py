@@ -0,0 +1,169 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Response-Cache
+Zweistufiger Cache (In-Memory LRU + SQLite) für deterministische Chat-Anfragen
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Iterator, List, Optional
+
+
+class ResponseCache:
+    """
+    Zweistufiger Response-Cache
+
+    - Stufe 1: In-Memory LRU (schnell, pro Prozess)
+    - Stufe 2: SQLite-Datei (persistent, optional)
+    - TTL- und größenbasierte Verdrängung
+    - Standardmäßig werden nur Anfragen mit temperature=0 gecacht
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = 24 * 3600,
+                 db_path: Optional[str] = None, max_db_entries: int = 10000,
+                 only_deterministic: bool = True):
+        """
+        Initialisiere Response-Cache
+
+        Args:
+            max_entries: Maximale Einträge im Speicher-Tier
+            ttl: Lebensdauer eines Eintrags in Sekunden (None = unbegrenzt)
+            db_path: Pfad zur SQLite-Datei (None = nur In-Memory)
+            max_db_entries: Maximale Einträge im SQLite-Tier
+            only_deterministic: Nur Anfragen mit temperature=0 cachen
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_db_entries = max_db_entries
+        self.only_deterministic = only_deterministic
+
+        self._memory: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS responses ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created REAL NOT NULL, accessed REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(base_url: str, model: str, temperature: float, max_tokens: int,
+                 messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None) -> str:
+        """Stabilen Hash über alle Parameter bilden, die die Antwort bestimmen (inkl. Endpoint)"""
+        payload = {
+            "base_url": base_url,
+            "model": model,
+            "temperature": temperature,
+            "max_tokens": max_tokens,
+            "messages": messages,
+            "tools": tools,
+        }
+        raw = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":"), default=str)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def is_cacheable(self, temperature: float) -> bool:
+        """Prüfen, ob eine Anfrage laut Policy gecacht werden darf"""
+        return not self.only_deterministic or temperature == 0
+
+    def _expired(self, created: float) -> bool:
+        return self.ttl is not None and time.time() - created > self.ttl
+
+    def get(self, key: str) -> Optional[str]:
+        """Eintrag abrufen (erst Speicher, dann SQLite)"""
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                value, created = entry
+                if not self._expired(created):
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return value
+                del self._memory[key]
+
+            if self._db is not None:
+                row = self._db.execute(
+                    "SELECT value, created FROM responses WHERE key = ?", (key,)
+                ).fetchone()
+                if row is not None:
+                    value, created = row
+                    if not self._expired(created):
+                        self._db.execute("UPDATE responses SET accessed = ? WHERE key = ?", (time.time(), key))
+                        self._db.commit()
+                        self._remember(key, value, created)
+                        self._stats["disk_hits"] += 1
+                        return value
+                    self._db.execute("DELETE FROM responses WHERE key = ?", (key,))
+                    self._db.commit()
+
+            self._stats["misses"] += 1
+            return None
+
+    def set(self, key: str, value: str):
+        """Eintrag in beiden Tiers speichern"""
+        now = time.time()
+        with self._lock:
+            self._remember(key, value, now)
+            self._stats["stores"] += 1
+
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses (key, value, created, accessed) VALUES (?, ?, ?, ?)",
+                    (key, value, now, now),
+                )
+                count = self._db.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+                if count > self.max_db_entries:
+                    self._db.execute(
+                        "DELETE FROM responses WHERE key IN "
+                        "(SELECT key FROM responses ORDER BY accessed ASC LIMIT ?)",
+                        (count - self.max_db_entries,),
+                    )
+                    self._stats["evictions"] += count - self.max_db_entries
+                self._db.commit()
+
+    def _remember(self, key: str, value: str, created: float):
+        """Eintrag ins LRU-Tier übernehmen (Lock muss gehalten werden)"""
+        self._memory[key] = (value, created)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+            self._stats["evictions"] += 1
+
+    @staticmethod
+    def replay(text: str, chunk_size: int = 32) -> Iterator[str]:
+        """Gecachte Antwort als Stream-Chunks wiedergeben"""
+        for i in range(0, len(text), chunk_size):
+            yield text[i:i + chunk_size]
+
+    def clear(self):
+        """Alle Einträge löschen"""
+        with self._lock:
+            self._memory.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hit/Miss-Zähler abrufen"""
+        with self._lock:
+            stats = dict(self._stats)
+            stats["memory_entries"] = len(self._memory)
+        hits = stats["memory_hits"] + stats["disk_hits"]
+        lookups = hits + stats["misses"]
+        stats["hit_rate"] = hits / lookups if lookups else 0.0
+        return stats
+
+    def close(self):
+        """SQLite-Verbindung schließen"""
+        if self._db is not None:
+            self._db.close()
+            self._db = None
@@ -8,7 +8,6 @@ Kommandozeilen-Chat-Interface für Kimi K2 Instruct
 
 import cmd
 import sys
-from kimi_client import KimiClient
 
 class KimiChatCLI(cmd.Cmd):
     """Interaktiver Chat für Kimi K2 Instruct"""
@@ -37,8 +36,11 @@ Geben Sie 'help' ein für Kommandos oder chatten Sie direkt los!
     
     def setup_client(self):
         """Initialisiert den Kimi Client"""
+        # Import erst hier - so erscheint der Prompt ohne Wartezeit
+        from kimi_client import KimiClient
+        
         try:
-            self.kimi = KimiClient()
+            self.kimi = KimiClient(prewarm=True)
             print("✅ Kimi K2 Client erfolgreich initialisiert!")
             
             # Modell-Info anzeigen
@@ -78,10 +80,9 @@ Geben Sie 'help' ein für Kommandos oder chatten Sie direkt los!
                 messages = [{"role": "system", "content": self.system_prompt}]
                 messages.append({"role": "user", "content": line})
                 
-                full_response = ""
-                for chunk in self.kimi.chat_stream(messages):
+                # Gebündelt ausgeben: ein flush() pro ~30 ms statt pro Token
+                for chunk in self.kimi.chat_stream(messages).coalesce():
                     print(chunk, end="", flush=True)
-                    full_response += chunk
                 print("\n")
             else:
                 # Normaler Modus
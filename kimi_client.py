@@ -7,18 +7,40 @@ Python-Client für Kimi K2 Instruct über die Moonshot AI API
 """
 
 import os
-from typing import Iterator, List, Dict, Any, Optional
-from openai import OpenAI
-from dotenv import load_dotenv
-from pydantic import BaseModel
+import threading
+from typing import Callable, Iterator, List, Dict, Any, Optional
+from kimi_batch import run_batch, ProgressCallback
+from kimi_cache import ResponseCache
+from kimi_stream import TRUNCATED_MARKER, CancelToken, StreamResult, record_chunk_meta
+from kimi_context import ConversationWindow, context_window_for, estimate_request_tokens
+from kimi_ratelimit import RequestStats, call_with_retry, get_shared_limiter
+from kimi_singleflight import flight_key, shared_single_flight
+from kimi_lazy import load_env
+from kimi_prewarm import Prewarm, pooled_http_client, prewarm_enabled, warm_openai_client
+from kimi_hedge import HedgePolicy
+from kimi_sse import RawSSEStream, raw_sse_enabled
+from kimi_wire import WireOptions, compact_json_enabled, create_chat_completion
+from kimi_keypool import KeyPool, get_shared_key_pool
+from kimi_concurrency import AdaptiveConcurrency, adaptive_concurrency_enabled, get_shared_concurrency
+from kimi_breaker import ModelBreakers, circuit_breaker_enabled, get_shared_breakers
+from kimi_context_cache import ContextCache, context_cache_enabled, get_shared_context_cache, uses_cache
+from kimi_files import FileStore, file_message, get_shared_file_store
+from kimi_mapreduce import MapReduce, ProgressEvent, chunk_budget
 
-# Environment laden
-load_dotenv()
 
-class ChatMessage(BaseModel):
-    """Chat-Nachricht Model"""
-    role: str  # "user", "assistant", "system"
-    content: str
+def __getattr__(name: str):
+    # pydantic erst laden, wenn ChatMessage tatsächlich verwendet wird
+    if name == "ChatMessage":
+        from pydantic import BaseModel
+
+        class ChatMessage(BaseModel):
+            """Chat-Nachricht Model"""
+            role: str  # "user", "assistant", "system"
+            content: str
+
+        globals()["ChatMessage"] = ChatMessage
+        return ChatMessage
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 class KimiClient:
     """
@@ -31,19 +53,51 @@ class KimiClient:
     - Konfigurierbares Model & Temperature
     """
     
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, cache: Optional[ResponseCache] = None,
+                 history_window: Optional[ConversationWindow] = None, base_url: Optional[str] = None,
+                 prewarm: Optional[bool] = None, hedge: Optional[HedgePolicy] = None,
+                 raw_sse: Optional[bool] = None, compact_json: Optional[bool] = None,
+                 compression: Optional[str] = None, key_pool: Optional[KeyPool] = None,
+                 concurrency: Optional[AdaptiveConcurrency] = None, breakers: Optional[ModelBreakers] = None,
+                 context_cache: Optional[ContextCache] = None, file_store: Optional[FileStore] = None):
         """
         Initialisiere Kimi K2 Client
         
         Args:
             api_key: Moonshot AI API Key (optional, wird aus .env geladen)
+            cache: Optional ResponseCache (opt-in, Standard: nur temperature=0)
+            history_window: Token-Budget für den Verlauf (Standard: 90% des Kontextfensters)
+            base_url: API-Endpoint (optional, Standard aus MOONSHOT_BASE_URL oder api.moonshot.ai)
+            prewarm: Verbindung im Hintergrund aufbauen (Standard aus KIMI_PREWARM, aus)
+            hedge: Optional HedgePolicy - Duplikat senden, wenn der erste Token ausbleibt (opt-in)
+            raw_sse: Streams direkt als SSE parsen, ohne SDK-Objekt pro Chunk (Standard aus KIMI_RAW_SSE, aus)
+            compact_json: Request-Body selbst serialisieren (orjson), ohne SDK-Umwandlung (Standard aus KIMI_COMPACT_JSON, aus)
+            compression: Request-Bodies ab KIMI_COMPRESSION_THRESHOLD mit "gzip"/"deflate" senden (Standard aus KIMI_COMPRESSION, aus)
+            key_pool: Optional KeyPool - Anfragen auf mehrere API-Keys verteilen (Standard: prozessweiter Pool aus MOONSHOT_API_KEYS)
+            concurrency: Optional AdaptiveConcurrency - AIMD-Limit gleichzeitiger Anfragen
+                (Standard: prozessweiter Limiter, falls KIMI_ADAPTIVE_CONCURRENCY gesetzt)
+            breakers: Optional ModelBreakers - Circuit Breaker pro Modell mit Fallback-Modellen
+                (Standard: prozessweite Breaker, falls KIMI_CIRCUIT_BREAKER gesetzt)
+            context_cache: Optional ContextCache - System-Prompt und Dateien einmal registrieren, danach per Cache-ID
+                (Standard: prozessweiter Cache, falls KIMI_CONTEXT_CACHE gesetzt)
+            file_store: Optional FileStore - Upload-Cache für die Files API (Standard: prozessweit, KIMI_FILE_CACHE)
         """
-        self.api_key = api_key or os.getenv("MOONSHOT_API_KEY")
+        load_env()
+        # Optional mehrere Keys: jeder mit eigenem Rate-Limit, Anfragen gehen an den freiesten
+        self.key_pool = key_pool or get_shared_key_pool()
+        self.api_key = api_key or (self.key_pool.keys[0] if self.key_pool else os.getenv("MOONSHOT_API_KEY"))
         if not self.api_key or self.api_key == "sk-demo_key_please_replace":
             raise ValueError("MOONSHOT_API_KEY ist erforderlich. Bitte in .env-Datei konfigurieren.")
         
         # Moonshot AI Client (OpenAI kompatibel)
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.moonshot.ai/v1")
+        # Retries übernimmt call_with_retry (mit geteiltem Rate-Limiter)
+        self.base_url = base_url or os.getenv("MOONSHOT_BASE_URL", "https://api.moonshot.ai/v1")
+        # openai wird erst beim ersten Zugriff auf self.client importiert
+        self._client = None
+        self._client_lock = threading.Lock()
+        self._key_clients: Dict[str, Any] = {}
+        self.rate_limiter = get_shared_limiter()
+        self.request_stats = RequestStats()
         
         # Standard-Konfiguration
         self.model = os.getenv("KIMI_MODEL", "moonshotai/Kimi-K2-Instruct")  # Korrigiert mit moonshotai/ Prefix
@@ -52,7 +106,206 @@ class KimiClient:
         
         # Conversation State
         self.conversation_history: List[Dict[str, str]] = []
+        self.history_window = history_window or ConversationWindow()
+        
+        # Optionaler Response-Cache
+        self.cache = cache
+        
+        # Identische laufende Anfragen prozessweit zusammenfassen
+        self.single_flight = shared_single_flight
+        
+        # Optional: adaptives Limit gleichzeitiger Anfragen (geteilt von Batch, Agent und Fan-out)
+        if concurrency is None and adaptive_concurrency_enabled(None):
+            concurrency = get_shared_concurrency()
+        self.concurrency = concurrency
+        
+        # Optional: Circuit Breaker pro Modell - gestörte Modelle werden übersprungen
+        if breakers is None and circuit_breaker_enabled(None):
+            breakers = get_shared_breakers()
+        self.breakers = breakers
+        
+        # Optional: stabilen Präfix per Moonshot Context Caching statt bei jeder Anfrage senden
+        if context_cache is None and context_cache_enabled(None):
+            context_cache = get_shared_context_cache()
+        self.context_cache = context_cache
+        
+        # Hochgeladene Dateien: Inhalts-Hash -> file_id und extrahierter Text
+        self.file_store = file_store or get_shared_file_store()
+        
+        # Request-Bodies: kompakte Serialisierung, optionale Kompression, Bytes pro Anfrage
+        self.compact_json = compact_json_enabled(compact_json)
+        self.wire = WireOptions(compression)
+        
+        # Optional: DNS, TCP/TLS und HTTP-Client im Hintergrund vorwärmen (GET /v1/models)
+        self.prewarm: Optional[Prewarm] = None
+        if prewarm_enabled(prewarm):
+            self.prewarm = Prewarm(lambda: warm_openai_client(self.client)).start()
+        
+        # Optionales Hedging gegen langsame erste Tokens (Tail-Latenz)
+        self.hedge = hedge
+        
+        # Optionaler SSE-Fast-Path für Text-Streams (spart CPU pro Chunk)
+        self.raw_sse = raw_sse_enabled(raw_sse)
 
+    @property
+    def client(self):
+        """OpenAI-Client (openai wird beim ersten Zugriff importiert)"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    from openai import OpenAI
+                    self._client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0,
+                                          http_client=pooled_http_client(
+                                              wire=self.wire,
+                                              on_response=self.key_pool.observe if self.key_pool else None))
+        return self._client
+    
+    @client.setter
+    def client(self, value):
+        self._client = value
+        self._key_clients = {}
+    
+    def _client_for(self, key: str):
+        """OpenAI-Client für einen Key aus dem Pool (teilt HTTP-Client und Verbindungen)"""
+        if key == self.api_key:
+            return self.client
+        client = self._key_clients.get(key)
+        if client is None:
+            client = self._key_clients[key] = self.client.with_options(api_key=key)
+        return client
+    
+    def _create(self, raw_sse: bool = False, **kwargs):
+        """chat.completions.create über den geteilten Rate-Limiter mit Retry/Backoff (raw_sse: SSE-Fast-Path)"""
+        tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("tools")) + kwargs.get("max_tokens", 0)
+        key = self.key_pool.pick(tokens) if self.context_cache is not None and self.key_pool else None
+        if self.context_cache is not None and (self.key_pool is None or key is not None):
+            # Führende System-Nachrichten durch die Cache-ID ersetzen; verdrängt -> voller Präfix.
+            # Caches gelten pro Key: Registrierung und Referenz laufen über denselben Key
+            return self.context_cache.call(
+                self._client_for(key) if key else self.client, kwargs,
+                lambda request: self._dispatch(raw_sse, request, tokens, key if uses_cache(request["messages"]) else None))
+        return self._dispatch(raw_sse, kwargs, tokens)
+    
+    def _dispatch(self, raw_sse: bool, kwargs: Dict[str, Any], tokens: int, key: Optional[str] = None):
+        """Anfrage an das Modell oder - bei offenem Circuit Breaker - an ein Ausweichmodell"""
+        if self.breakers is None:
+            return self._request(raw_sse, kwargs, tokens, key=key)
+        # Gesperrte Modelle überspringen; vor einem Ausweichmodell nur ein schneller Retry statt vollem Backoff
+        last = self.breakers.candidates(kwargs["model"], tokens)[-1]
+        return self.breakers.call(
+            kwargs["model"],
+            lambda model: self._request(raw_sse, dict(kwargs, model=model), tokens, 4 if model == last else 1, key),
+            tokens)
+    
+    def _request(self, raw_sse: bool, kwargs: Dict[str, Any], tokens: int, max_retries: int = 4,
+                 key: Optional[str] = None):
+        """Eine Anfrage an ein Modell: Key-Pool (key: fester Key), adaptives Limit, Rate-Limiter und Retry"""
+        def _send(client):
+            if raw_sse:
+                return RawSSEStream(client, compact_json=self.compact_json, **kwargs)
+            if self.compact_json:
+                return create_chat_completion(client, kwargs)
+            return client.chat.completions.create(**kwargs)
+        
+        send = _send
+        if self.concurrency is not None:
+            # Jeder Versuch belegt einen Platz - Streams bis zum Ende; 429/5xx und Latenz-Spitzen senken das Limit
+            send = lambda client: self.concurrency.call(lambda: _send(client), stream=bool(kwargs.get("stream")))
+        
+        if self.key_pool is None:
+            return call_with_retry(lambda: send(self.client), limiter=self.rate_limiter, tokens=tokens,
+                                   stats=self.request_stats, max_retries=max_retries)
+        # Limits pro Key im Pool; 429/401 wechseln sofort den Key, Backoff erst wenn alle erschöpft sind
+        return call_with_retry(lambda: self.key_pool.call(lambda pool_key: send(self._client_for(pool_key)),
+                                                          tokens, key),
+                               stats=self.request_stats, max_retries=max_retries)
+    
+    def _upstream(self, model: str, messages: List[Dict[str, str]]) -> Iterator[Any]:
+        """Upstream-Stream öffnen - mit Hedging, falls eine HedgePolicy gesetzt ist"""
+        def _open(stream_model: str):
+            return self._create(
+                raw_sse=self.raw_sse,
+                model=stream_model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+        
+        if self.hedge is None:
+            return _open(model)
+        return self.hedge.stream(_open, model, self.hedge.model_for(model, messages, self.max_tokens))
+    
+    def _cache_key(self, request_key: str) -> Optional[str]:
+        """Cache-Key für eine Anfrage (None, wenn nicht gecacht wird)"""
+        if self.cache is None or not self.cache.is_cacheable(self.temperature):
+            return None
+        return request_key
+    
+    def _flight_key(self, request_key: str) -> str:
+        """Single-Flight-Key: Endpoint steckt im request_key, dazu API-Key bzw. alle Keys des Pools"""
+        account = ",".join(self.key_pool.keys) if self.key_pool else (self.api_key or "")
+        return flight_key(request_key, account)
+    
+    def _complete(self, messages: List[Dict[str, str]]) -> str:
+        """Completion anfordern - Cache-Treffer und identische laufende Anfragen sparen den API-Aufruf"""
+        model = self.model
+        request_key = ResponseCache.make_key(self.base_url, model, self.temperature, self.max_tokens, messages)
+        key = self._cache_key(request_key)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+        
+        def _call() -> str:
+            if self.hedge is not None:
+                # Hedging braucht den ersten Token als Signal - intern gestreamt
+                return "".join(chunk.choices[0].delta.content for chunk in self._upstream(model, messages)
+                               if chunk.choices and chunk.choices[0].delta.content)
+            response = self._create(
+                model=model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+            return response.choices[0].message.content
+        
+        content = self.single_flight.do(self._flight_key(request_key), _call)
+        if key and content is not None:
+            self.cache.set(key, content)
+        return content
+    
+    def _stream(self, messages: List[Dict[str, str]], result: Optional[StreamResult] = None) -> Iterator[str]:
+        """Streaming-Completion - Cache-Treffer werden als Chunks wiedergegeben, identische Streams geteilt"""
+        model = self.model
+        request_key = ResponseCache.make_key(self.base_url, model, self.temperature, self.max_tokens, messages)
+        key = self._cache_key(request_key)
+        if key:
+            cached = self.cache.get(key)
+            if cached is not None:
+                if result is not None:
+                    result.finish_reason = "stop"
+                yield from self.cache.replay(cached)
+                return
+        
+        cancel = result.cancel_token if result is not None else None
+        if cancel is not None and cancel.cancelled:
+            return
+        stream = self.single_flight.stream(self._flight_key(request_key),
+                                           lambda: self._upstream(model, messages), cancel=cancel)
+        
+        parts = []
+        for chunk in stream:
+            record_chunk_meta(result, chunk)
+            if chunk.choices and chunk.choices[0].delta.content:
+                content = chunk.choices[0].delta.content
+                parts.append(content)
+                yield content
+        
+        # Abgebrochene (unvollständige) Antworten nicht cachen
+        if key and parts and not (result is not None and result.truncated):
+            self.cache.set(key, "".join(parts))
+    
     def simple_chat(self, message: str) -> str:
         """Shortcut for chat without system prompt."""
         return self.chat(message)
@@ -76,43 +329,88 @@ class KimiClient:
         messages.append({"role": "user", "content": message})
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            return response.choices[0].message.content
+            return self._complete(messages)
             
         except Exception as e:
             raise Exception(f"Chat-Fehler: {str(e)}")
     
-    def chat_stream(self, messages: List[Dict[str, str]]) -> Iterator[str]:
+    def chat_many(self, prompts: List[str], concurrency: Optional[int] = None, system_prompt: Optional[str] = None,
+                  on_progress: Optional[ProgressCallback] = None) -> List[Dict[str, Any]]:
+        """
+        Viele unabhängige Chat-Nachrichten parallel senden
+
+        Args:
+            prompts: Liste von User-Nachrichten
+            concurrency: Maximale Anzahl gleichzeitiger Anfragen (Standard: 4, mit adaptivem
+                Limiter dessen max_limit - das aktuelle Limit regelt dann der Limiter)
+            system_prompt: Optional system prompt für alle Nachrichten
+            on_progress: Optional callback(erledigt, gesamt, ergebnis)
+
+        Returns:
+            Liste von Dicts (index, input, result, error) in Eingabereihenfolge
+        """
+        if concurrency is None:
+            concurrency = self.concurrency.max_limit if self.concurrency is not None else 4
+        return run_batch(lambda prompt: self.chat(prompt, system_prompt), prompts,
+                         concurrency=concurrency, on_progress=on_progress)
+    
+    def document_pipeline(self, chunk_tokens: Optional[int] = None, concurrency: Optional[int] = None,
+                          system_prompt: Optional[str] = None) -> MapReduce:
+        """
+        Map-Reduce-Pipeline für Dokumente größer als das Kontextfenster
+        
+        Args:
+            chunk_tokens: Tokens pro Abschnitt (Standard: halbes Kontextfenster abzüglich max_tokens, höchstens 24000)
+            concurrency: Maximale Anzahl gleichzeitiger Anfragen (Standard wie chat_many)
+            system_prompt: Optional system prompt für alle Aufrufe
+            
+        Returns:
+            MapReduce - run() mit Callback oder stream() für Fortschritts-Events
+        """
+        if chunk_tokens is None:
+            chunk_tokens = chunk_budget(context_window_for(self.model), self.max_tokens)
+        if concurrency is None:
+            concurrency = self.concurrency.max_limit if self.concurrency is not None else 4
+        return MapReduce(lambda prompt: self.chat(prompt, system_prompt), chunk_tokens=chunk_tokens,
+                         concurrency=concurrency)
+    
+    def map_reduce(self, text: str, task: str, kind: str = "text", name: str = "Dokument",
+                   on_progress: Optional[Callable[[ProgressEvent], None]] = None) -> Dict[str, Any]:
+        """
+        Großes Dokument oder Quellcode in Abschnitten bearbeiten und Ergebnisse zusammenführen
+        
+        Args:
+            text: Dokument oder Quellcode
+            task: Aufgabe, z.B. "Fasse zusammen" oder "Finde Bugs"
+            kind: "code" (Grenzen an Definitionen) oder "text" (Absätze, Überschriften)
+            name: Dateiname/Titel für die Prompts
+            on_progress: Optional callback(event) - stage "split", "map", "reduce"
+            
+        Returns:
+            Dict mit result, chunks, map_calls, reduce_calls, levels und elapsed
+        """
+        return self.document_pipeline().run(text, task, kind, name, on_progress)
+    
+    def chat_stream(self, messages: List[Dict[str, str]], cancel: Optional[CancelToken] = None) -> StreamResult:
         """
         Streaming Chat - Antwort wird Stück für Stück geliefert
         
         Args:
             messages: Liste von Chat-Nachrichten
+            cancel: Optional CancelToken (alternativ StreamResult.cancel())
             
-        Yields:
-            Einzelne Text-Chunks der AI-Antwort
+        Returns:
+            StreamResult - liefert beim Iterieren die Text-Chunks der AI-Antwort,
+            danach .text und Latenz-Metriken; cancel() schließt die Verbindung
         """
-        try:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                stream=True
-            )
-            
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    yield chunk.choices[0].delta.content
-                    
-        except Exception as e:
-            yield f"❌ Stream-Fehler: {str(e)}"
+        def _chunks(result: StreamResult) -> Iterator[str]:
+            try:
+                yield from self._stream(messages, result)
+                        
+            except Exception as e:
+                yield f"❌ Stream-Fehler: {str(e)}"
+        
+        return StreamResult(_chunks, cancel)
     
     def conversation_chat(self, message: str, system_prompt: Optional[str] = None) -> str:
         """
@@ -129,18 +427,12 @@ class KimiClient:
         if system_prompt and not self.conversation_history:
             self.conversation_history.append({"role": "system", "content": system_prompt})
         
-        # User-Nachricht hinzufügen
+        # User-Nachricht hinzufügen und Verlauf auf das Token-Budget kürzen
         self.conversation_history.append({"role": "user", "content": message})
+        self.history_window.fit(self.conversation_history, self.model, self.max_tokens)
         
         try:
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens
-            )
-            
-            ai_response = response.choices[0].message.content
+            ai_response = self._complete(self.conversation_history)
             
             # AI-Antwort zum Verlauf hinzufügen
             self.conversation_history.append({"role": "assistant", "content": ai_response})
@@ -150,46 +442,65 @@ class KimiClient:
         except Exception as e:
             raise Exception(f"Conversation-Chat-Fehler: {str(e)}")
     
-    def conversation_stream(self, message: str, system_prompt: Optional[str] = None) -> Iterator[str]:
+    def conversation_stream(self, message: str, system_prompt: Optional[str] = None,
+                            cancel: Optional[CancelToken] = None) -> StreamResult:
         """
         Streaming Chat mit Verlauf
         
         Args:
             message: User-Nachricht
             system_prompt: Optional system prompt (nur beim ersten Aufruf)
+            cancel: Optional CancelToken (alternativ StreamResult.cancel())
             
-        Yields:
-            Einzelne Text-Chunks der AI-Antwort
+        Returns:
+            StreamResult - liefert beim Iterieren die Text-Chunks der AI-Antwort,
+            danach .text und Latenz-Metriken; bei Abbruch wird die Teilantwort
+            als abgebrochen markiert im Verlauf gespeichert
         """
-        # System-Prompt nur beim ersten Mal hinzufügen
-        if system_prompt and not self.conversation_history:
-            self.conversation_history.append({"role": "system", "content": system_prompt})
+        def _chunks(result: StreamResult) -> Iterator[str]:
+            # System-Prompt nur beim ersten Mal hinzufügen
+            if system_prompt and not self.conversation_history:
+                self.conversation_history.append({"role": "system", "content": system_prompt})
+            
+            # User-Nachricht hinzufügen und Verlauf auf das Token-Budget kürzen
+            self.conversation_history.append({"role": "user", "content": message})
+            self.history_window.fit(self.conversation_history, self.model, self.max_tokens)
+            
+            try:
+                yield from self._stream(self.conversation_history, result)
+                
+                # AI-Antwort zum Verlauf hinzufügen (abgebrochene Teilantwort markiert)
+                if result.chunks:
+                    content = result.text + TRUNCATED_MARKER if result.truncated else result.text
+                    self.conversation_history.append({"role": "assistant", "content": content})
+                        
+            except Exception as e:
+                yield f"❌ Conversation-Stream-Fehler: {str(e)}"
         
-        # User-Nachricht hinzufügen
-        self.conversation_history.append({"role": "user", "content": message})
+        return StreamResult(_chunks, cancel)
+    
+    def upload_file(self, path: str, with_info: bool = False) -> Any:
+        """
+        Datei über die Files API hochladen und als System-Nachricht liefern
         
-        try:
-            stream = self.client.chat.completions.create(
-                model=self.model,
-                messages=self.conversation_history,
-                temperature=self.temperature,
-                max_tokens=self.max_tokens,
-                stream=True
-            )
-            
-            full_response = ""
-            for chunk in stream:
-                if chunk.choices[0].delta.content is not None:
-                    content = chunk.choices[0].delta.content
-                    full_response += content
-                    yield content
+        Gleicher Inhalt wird nur einmal hochgeladen und extrahiert. Die Nachricht
+        gehört an den Anfang des Verlaufs (nach dem System-Prompt) - mit Context
+        Caching wird der Text dann nur einmal gesendet.
+        
+        Args:
+            path: Pfad zur Datei
+            with_info: Zusätzlich die Upload-Infos liefern (id, reused, ...)
             
-            # Vollständige AI-Antwort zum Verlauf hinzufügen
-            if full_response:
-                self.conversation_history.append({"role": "assistant", "content": full_response})
-                    
-        except Exception as e:
-            yield f"❌ Conversation-Stream-Fehler: {str(e)}"
+        Returns:
+            {"role": "system", "content": "[FILE name]:\n<extrahierter Text>"},
+            bei with_info ein Tupel (Nachricht, Infos aus FileStore.extract)
+        """
+        with open(path, "rb") as f:
+            data = f.read()
+        filename = os.path.basename(path)
+        info = self.file_store.extract(self.client, filename, data)
+        message = file_message(filename, info.pop("content"))
+        return (message, info) if with_info else message
     
     def clear_conversation(self):
         """Conversation-Verlauf löschen"""
@@ -227,7 +538,21 @@ class KimiClient:
             "temperature": self.temperature,
             "max_tokens": self.max_tokens,
             "api_provider": "Moonshot AI",
-            "conversation_length": len(self.conversation_history)
+            "base_url": self.base_url,
+            "conversation_length": len(self.conversation_history),
+            "history_tokens": self.history_window.count(self.conversation_history),
+            "request_stats": self.request_stats.as_dict(),
+            "single_flight": self.single_flight.get_stats(),
+            "prewarm": self.prewarm.as_dict() if self.prewarm else None,
+            "hedging": self.hedge.get_stats() if self.hedge else None,
+            "raw_sse": self.raw_sse,
+            "compact_json": self.compact_json,
+            "wire": self.wire.as_dict(),
+            "key_pool": self.key_pool.get_stats() if self.key_pool else None,
+            "concurrency": self.concurrency.get_stats() if self.concurrency else None,
+            "circuit_breakers": self.breakers.get_stats() if self.breakers else None,
+            "context_cache": self.context_cache.get_stats() if self.context_cache else None,
+            "files": self.file_store.get_stats(),
         }
 
 # Utility-Funktionen
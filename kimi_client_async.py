@@ -0,0 +1,339 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Instruct Client - asyncio-Variante
+Asynchroner Client für Kimi K2 über die Moonshot AI API (AsyncOpenAI)
+"""
+
+import os
+import asyncio
+import weakref
+from typing import TYPE_CHECKING, AsyncIterator, List, Dict, Any, Optional, Tuple
+from kimi_context import ConversationWindow, estimate_request_tokens
+from kimi_ratelimit import RequestStats, call_with_retry_async, get_shared_limiter
+from kimi_lazy import load_env
+
+if TYPE_CHECKING:
+    from openai import AsyncOpenAI
+
+MOONSHOT_BASE_URL = "https://api.moonshot.ai/v1"
+
+# Geteilte Connection-Pools: pro Event-Loop ein AsyncOpenAI je (api_key, base_url)
+_SHARED_CLIENTS: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Tuple[str, str], AsyncOpenAI]]" = weakref.WeakKeyDictionary()
+
+
+def _shared_client(api_key: str, base_url: str) -> "AsyncOpenAI":
+    """AsyncOpenAI-Client (und damit Connection-Pool) für den laufenden Event-Loop abrufen"""
+    from openai import AsyncOpenAI
+
+    loop = asyncio.get_running_loop()
+    clients = _SHARED_CLIENTS.setdefault(loop, {})
+    key = (api_key, base_url)
+    if key not in clients:
+        clients[key] = AsyncOpenAI(api_key=api_key, base_url=base_url, max_retries=0)
+    return clients[key]
+
+
+async def close_shared_clients():
+    """Alle geteilten Connection-Pools des laufenden Event-Loops schließen"""
+    clients = _SHARED_CLIENTS.pop(asyncio.get_running_loop(), {})
+    for client in clients.values():
+        await client.close()
+
+
+class AsyncKimiClient:
+    """
+    Asynchroner Kimi K2 Client
+
+    Gegenstück zu KimiClient / KimiMoonshotClient für asyncio:
+    - Coroutines statt blockierender Aufrufe
+    - Async-Generatoren für Streaming
+    - Ein geteilter Connection-Pool für alle Instanzen eines Event-Loops
+    - Gleiche Conversation-History-Semantik wie die synchronen Clients
+    """
+
+    def __init__(self, api_key: Optional[str] = None, model: Optional[str] = None,
+                 history_window: Optional[ConversationWindow] = None, base_url: Optional[str] = None):
+        """
+        Initialisiere asynchronen Kimi K2 Client
+
+        Args:
+            api_key: Moonshot AI API Key (optional, wird aus .env geladen)
+            model: Modell-Name (optional, Standard aus KIMI_MODEL)
+            history_window: Token-Budget für den Verlauf (Standard: 90% des Kontextfensters)
+            base_url: API-Endpoint (optional, Standard aus MOONSHOT_BASE_URL oder api.moonshot.ai)
+        """
+        load_env()
+        self.api_key = api_key or os.getenv("MOONSHOT_API_KEY")
+        if not self.api_key or self.api_key in ["sk-demo_key_please_replace", "your_moonshot_api_key_here"]:
+            raise ValueError("MOONSHOT_API_KEY ist erforderlich. Bitte in .env-Datei konfigurieren.")
+
+        self.base_url = base_url or os.getenv("MOONSHOT_BASE_URL", MOONSHOT_BASE_URL)
+
+        # Standard-Konfiguration
+        self.model = model or os.getenv("KIMI_MODEL", "moonshot-v1-128k")
+        self.temperature = float(os.getenv("TEMPERATURE", "0.6"))
+        self.max_tokens = int(os.getenv("MAX_TOKENS", "4096"))
+
+        # Conversation State
+        self.conversation_history: List[Dict[str, str]] = []
+        self.history_window = history_window or ConversationWindow()
+
+        # Geteilter Rate-Limiter (auch mit den synchronen Clients)
+        self.rate_limiter = get_shared_limiter()
+        self.request_stats = RequestStats()
+
+    @property
+    def client(self) -> "AsyncOpenAI":
+        """Geteilter AsyncOpenAI-Client des laufenden Event-Loops"""
+        return _shared_client(self.api_key, self.base_url)
+
+    async def _create(self, **kwargs):
+        """chat.completions.create über den geteilten Rate-Limiter mit Retry/Backoff"""
+        tokens = estimate_request_tokens(kwargs["messages"], kwargs.get("tools")) + kwargs.get("max_tokens", 0)
+        return await call_with_retry_async(lambda: self.client.chat.completions.create(**kwargs),
+                                           limiter=self.rate_limiter, tokens=tokens, stats=self.request_stats)
+
+    async def chat(self, message: str, system_prompt: Optional[str] = None) -> str:
+        """
+        Einzelne Chat-Nachricht senden
+
+        Args:
+            message: User-Nachricht
+            system_prompt: Optional system prompt
+
+        Returns:
+            AI-Antwort als String
+        """
+        messages = []
+
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": message})
+
+        try:
+            response = await self._create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+
+            return response.choices[0].message.content
+
+        except Exception as e:
+            raise Exception(f"Async Chat-Fehler: {str(e)}")
+
+    async def chat_stream(self, messages: List[Dict[str, str]]) -> AsyncIterator[str]:
+        """
+        Streaming Chat - Antwort wird Stück für Stück geliefert
+
+        Args:
+            messages: Liste von Chat-Nachrichten
+
+        Yields:
+            Einzelne Text-Chunks der AI-Antwort
+        """
+        try:
+            stream = await self._create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    yield chunk.choices[0].delta.content
+
+        except Exception as e:
+            yield f"❌ Async Stream-Fehler: {str(e)}"
+
+    async def conversation_chat(self, message: str, system_prompt: Optional[str] = None) -> str:
+        """
+        Chat mit Verlauf (Conversation Memory)
+
+        Args:
+            message: User-Nachricht
+            system_prompt: Optional system prompt (nur beim ersten Aufruf)
+
+        Returns:
+            AI-Antwort als String
+        """
+        # System-Prompt nur beim ersten Mal hinzufügen
+        if system_prompt and not self.conversation_history:
+            self.conversation_history.append({"role": "system", "content": system_prompt})
+
+        # User-Nachricht hinzufügen und Verlauf auf das Token-Budget kürzen
+        self.conversation_history.append({"role": "user", "content": message})
+        self.history_window.fit(self.conversation_history, self.model, self.max_tokens)
+
+        try:
+            response = await self._create(
+                model=self.model,
+                messages=self.conversation_history,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens
+            )
+
+            ai_response = response.choices[0].message.content
+
+            # AI-Antwort zum Verlauf hinzufügen
+            self.conversation_history.append({"role": "assistant", "content": ai_response})
+
+            return ai_response
+
+        except Exception as e:
+            raise Exception(f"Async Conversation-Chat-Fehler: {str(e)}")
+
+    async def conversation_stream(self, message: str, system_prompt: Optional[str] = None) -> AsyncIterator[str]:
+        """
+        Streaming Chat mit Verlauf
+
+        Args:
+            message: User-Nachricht
+            system_prompt: Optional system prompt (nur beim ersten Aufruf)
+
+        Yields:
+            Einzelne Text-Chunks der AI-Antwort
+        """
+        # System-Prompt nur beim ersten Mal hinzufügen
+        if system_prompt and not self.conversation_history:
+            self.conversation_history.append({"role": "system", "content": system_prompt})
+
+        # User-Nachricht hinzufügen und Verlauf auf das Token-Budget kürzen
+        self.conversation_history.append({"role": "user", "content": message})
+        self.history_window.fit(self.conversation_history, self.model, self.max_tokens)
+
+        try:
+            stream = await self._create(
+                model=self.model,
+                messages=self.conversation_history,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                stream=True
+            )
+
+            parts = []
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content is not None:
+                    content = chunk.choices[0].delta.content
+                    parts.append(content)
+                    yield content
+
+            # Vollständige AI-Antwort zum Verlauf hinzufügen
+            if parts:
+                self.conversation_history.append({"role": "assistant", "content": "".join(parts)})
+
+        except Exception as e:
+            yield f"❌ Async Conversation-Stream-Fehler: {str(e)}"
+
+    async def tool_call(self, message: str, tools: List[Dict[str, Any]], system_prompt: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Tool Calling - Kimi K2 kann Tools verwenden
+
+        Args:
+            message: User-Nachricht
+            tools: Liste von verfügbaren Tools (OpenAI Format)
+            system_prompt: Optional system prompt
+
+        Returns:
+            Dict mit tool_calls oder finale Antwort
+        """
+        messages = []
+
+        if system_prompt:
+            messages.append({"role": "system", "content": system_prompt})
+
+        messages.append({"role": "user", "content": message})
+
+        try:
+            response = await self._create(
+                model=self.model,
+                messages=messages,
+                temperature=self.temperature,
+                max_tokens=self.max_tokens,
+                tools=tools,
+                tool_choice="auto"
+            )
+
+            choice = response.choices[0]
+
+            result = {
+                "finish_reason": choice.finish_reason,
+                "message": choice.message.content
+            }
+
+            if choice.finish_reason == "tool_calls":
+                result["tool_calls"] = choice.message.tool_calls
+
+            return result
+
+        except Exception as e:
+            return {"error": f"Tool Call Fehler: {str(e)}"}
+
+    def clear_conversation(self):
+        """Conversation-Verlauf löschen"""
+        self.conversation_history = []
+
+    def get_conversation_history(self) -> List[Dict[str, str]]:
+        """Conversation-Verlauf abrufen"""
+        return self.conversation_history.copy()
+
+    def set_model(self, model: str):
+        """Model ändern"""
+        self.model = model
+
+    def set_temperature(self, temperature: float):
+        """Temperature ändern"""
+        if 0.0 <= temperature <= 2.0:
+            self.temperature = temperature
+        else:
+            raise ValueError("Temperature muss zwischen 0.0 und 2.0 liegen")
+
+    def get_model_info(self) -> Dict[str, Any]:
+        """Aktuelle Model-Information"""
+        return {
+            "model": self.model,
+            "temperature": self.temperature,
+            "max_tokens": self.max_tokens,
+            "api_provider": "Moonshot AI",
+            "base_url": self.base_url,
+            "conversation_length": len(self.conversation_history),
+            "history_tokens": self.history_window.count(self.conversation_history),
+            "request_stats": self.request_stats.as_dict(),
+            "mode": "asyncio"
+        }
+
+
+async def _demo():
+    """Mehrere Anfragen parallel über einen Event-Loop"""
+    clients = [AsyncKimiClient() for _ in range(3)]
+    questions = ["Was ist 2+2?", "Nenne eine Primzahl.", "Sag Hallo auf Deutsch."]
+    try:
+        answers = await asyncio.gather(*(c.chat(q) for c, q in zip(clients, questions)))
+        for question, answer in zip(questions, answers):
+            print(f"❓ {question}\n🌙 {answer}\n")
+    finally:
+        await close_shared_clients()
+
+
+def main():
+    """Test-Hauptfunktion"""
+    print("🌙 Async Kimi K2 Client - Test")
+    print("=" * 50)
+
+    try:
+        asyncio.run(_demo())
+        print("✅ Async Test erfolgreich!")
+    except Exception as e:
+        print(f"❌ Fehler: {e}")
+        print("\n🔧 Lösungsvorschläge:")
+        print("1. Überprüfen Sie Ihren MOONSHOT_API_KEY in der .env-Datei")
+        print("2. Registrieren Sie sich bei: https://platform.moonshot.ai")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Adaptive Nebenläufigkeit
+AIMD-Limiter: mehr parallele Anfragen, solange Latenz und Fehlerrate gesund sind - halbieren bei 429/5xx
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from kimi_ratelimit import is_retryable
+
+
+class AdaptiveConcurrency:
+    """
+    Nebenläufigkeits-Limit mit Additive Increase / Multiplicative Decrease
+
+    - Erfolg mit normaler Latenz: Limit steigt um ``increase`` pro vollem
+      Fenster (d.h. +increase, nachdem ``limit`` Anfragen erfolgreich waren)
+    - 429, 5xx, Verbindungsfehler oder Latenz über ``latency_factor`` x
+      Basislatenz: Limit wird mit ``decrease`` multipliziert - höchstens
+      einmal pro ``cooldown`` Sekunden, damit gleichzeitig laufende
+      Anfragen derselben Überlast das Limit nicht mehrfach halbieren
+    - Eine Instanz kann von Batch, Agent und Fan-out geteilt werden
+      (siehe get_shared_concurrency)
+    """
+
+    def __init__(self, initial: int = 4, min_limit: int = 1, max_limit: int = 32, increase: float = 1.0,
+                 decrease: float = 0.5, latency_factor: float = 3.0, min_spike: float = 0.1,
+                 cooldown: float = 1.0):
+        """
+        Args:
+            initial: Start-Limit
+            min_limit: Untergrenze
+            max_limit: Obergrenze
+            increase: Additive Erhöhung pro Fenster erfolgreicher Anfragen
+            decrease: Faktor bei Überlast (0 < decrease < 1)
+            latency_factor: Latenz-Spitze = Latenz > latency_factor x Basislatenz
+            min_spike: Latenzen unter diesem Wert (Sekunden) gelten nie als Spitze
+            cooldown: Mindestabstand zweier Reduktionen in Sekunden
+        """
+        if not 0 < decrease < 1:
+            raise ValueError("decrease muss zwischen 0 und 1 liegen")
+        self.min_limit = max(1, min_limit)
+        self.max_limit = max(self.min_limit, max_limit)
+        self.increase = increase
+        self.decrease = decrease
+        self.latency_factor = latency_factor
+        self.min_spike = min_spike
+        self.cooldown = cooldown
+        self._limit = float(min(self.max_limit, max(self.min_limit, initial)))
+        self._in_flight = 0
+        # Basislatenz getrennt nach Art: ganze Anfrage bzw. erster Chunk eines Streams
+        self._baselines: Dict[str, Optional[float]] = {"request": None, "stream": None}
+        self._last_decrease = float("-inf")
+        self._cond = threading.Condition()
+        self._stats = {"requests": 0, "increases": 0, "decreases": 0, "overloads": 0, "latency_spikes": 0,
+                       "queue_wait_total": 0.0}
+        self._peak = int(self._limit)
+
+    @property
+    def limit(self) -> int:
+        """Aktuelles Limit gleichzeitiger Anfragen"""
+        return int(self._limit)
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def acquire(self) -> float:
+        """Blockierend warten, bis ein Platz frei ist; liefert die Wartezeit"""
+        start = time.perf_counter()
+        with self._cond:
+            while self._in_flight >= int(self._limit):
+                self._cond.wait()
+            self._in_flight += 1
+            waited = time.perf_counter() - start
+            self._stats["requests"] += 1
+            self._stats["queue_wait_total"] += waited
+        return waited
+
+    def release(self, latency: Optional[float] = None, overloaded: bool = False, stream: bool = False):
+        """
+        Platz freigeben und Limit anpassen
+
+        Args:
+            latency: Dauer der Anfrage bzw. bei Streams Zeit bis zum ersten Chunk in Sekunden (None = nicht bewerten)
+            overloaded: 429/5xx oder Verbindungsfehler
+            stream: latency gegen die eigene Basislatenz der Streams bewerten
+        """
+        with self._cond:
+            self._in_flight -= 1
+            if overloaded:
+                self._stats["overloads"] += 1
+                self._reduce()
+            elif latency is not None:
+                kind = "stream" if stream else "request"
+                baseline = self._baselines[kind]
+                if baseline is not None and latency > max(self.latency_factor * baseline, self.min_spike):
+                    self._stats["latency_spikes"] += 1
+                    self._reduce()
+                else:
+                    # Basislatenz als gleitender Mittelwert gesunder Anfragen
+                    self._baselines[kind] = latency if baseline is None else 0.9 * baseline + 0.1 * latency
+                    self._grow()
+            self._cond.notify_all()
+
+    def _grow(self):
+        if self._limit >= self.max_limit:
+            return
+        before = int(self._limit)
+        self._limit = min(float(self.max_limit), self._limit + self.increase / self._limit)
+        if int(self._limit) > before:
+            self._stats["increases"] += 1
+            self._peak = max(self._peak, int(self._limit))
+
+    def _reduce(self):
+        now = time.monotonic()
+        if now - self._last_decrease < self.cooldown:
+            return
+        self._last_decrease = now
+        self._limit = max(float(self.min_limit), self._limit * self.decrease)
+        self._stats["decreases"] += 1
+
+    def call(self, func: Callable[[], Any], stream: bool = False) -> Any:
+        """
+        func mit einem Platz im Limit ausführen; Fehler und Latenz fließen ins Limit ein
+
+        Mit stream=True liefert func einen Stream: der Platz bleibt belegt, bis er
+        vollständig gelesen oder geschlossen ist. Bewertet wird die Zeit bis zum
+        ersten Chunk - die Länge der Antwort sagt nichts über die Last aus.
+        """
+        self.acquire()
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            # Nur Überlast-Fehler senken das Limit (400/401 sagen nichts über die Last aus)
+            self.release(overloaded=is_retryable(e))
+            raise
+        if stream:
+            return _SlotStream(result, self, start)
+        self.release(time.perf_counter() - start)
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Aktuelles Limit, laufende Anfragen und Anpassungen"""
+        with self._cond:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["limit"] = int(self._limit)
+            stats["peak_limit"] = self._peak
+            stats["in_flight"] = self._in_flight
+            for name, kind in (("baseline_latency", "request"), ("baseline_first_chunk", "stream")):
+                baseline = self._baselines[kind]
+                stats[name] = round(baseline, 4) if baseline is not None else None
+        stats["queue_wait_total"] = round(stats["queue_wait_total"], 4)
+        stats["min_limit"] = self.min_limit
+        stats["max_limit"] = self.max_limit
+        return stats
+
+
+class _SlotStream:
+    """Stream, der seinen Platz im Limit bis zum Ende oder bis close() belegt"""
+
+    def __init__(self, stream: Any, limiter: AdaptiveConcurrency, start: float):
+        self._stream = stream
+        self._limiter = limiter
+        self._start = start
+        self._released = False
+        self._lock = threading.Lock()
+
+    def _release(self, latency: Optional[float] = None, overloaded: bool = False):
+        with self._lock:
+            if self._released:
+                return
+            self._released = True
+        self._limiter.release(latency, overloaded, stream=True)
+
+    def __iter__(self):
+        first_chunk: Optional[float] = None
+        try:
+            for chunk in self._stream:
+                if first_chunk is None:
+                    first_chunk = time.perf_counter() - self._start
+                yield chunk
+        except Exception as e:
+            self._release(overloaded=is_retryable(e))
+            raise
+        finally:
+            # Streams ohne Chunk (z.B. vorzeitig geschlossen) bewerten die Latenz nicht
+            self._release(first_chunk)
+
+    def close(self):
+        try:
+            close = getattr(self._stream, "close", None)
+            if close is not None:
+                close()
+        finally:
+            self._release()
+
+    def __getattr__(self, name: str) -> Any:
+        # response, Metadaten usw. des SDK- bzw. SSE-Streams
+        return getattr(self.__dict__["_stream"], name)
+
+    def __del__(self):
+        if "_lock" in self.__dict__:
+            self._release()
+
+
+def adaptive_concurrency_enabled(enabled: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_ADAPTIVE_CONCURRENCY)"""
+    if enabled is not None:
+        return enabled
+    return os.getenv("KIMI_ADAPTIVE_CONCURRENCY", "0").lower() in ("1", "true", "yes")
+
+
+_shared_concurrency: Optional[AdaptiveConcurrency] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_concurrency() -> AdaptiveConcurrency:
+    """Prozessweiten Limiter abrufen (konfiguriert über KIMI_MIN/MAX/INITIAL_CONCURRENCY)"""
+    global _shared_concurrency
+    with _shared_lock:
+        if _shared_concurrency is None:
+            _shared_concurrency = AdaptiveConcurrency(
+                initial=int(os.getenv("KIMI_INITIAL_CONCURRENCY", "4")),
+                min_limit=int(os.getenv("KIMI_MIN_CONCURRENCY", "1")),
+                max_limit=int(os.getenv("KIMI_MAX_CONCURRENCY", "32")),
+            )
+        return _shared_concurrency
+
+
+def set_shared_concurrency(limiter: Optional[AdaptiveConcurrency]):
+    """Prozessweiten Limiter ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_concurrency
+    with _shared_lock:
+        _shared_concurrency = limiter
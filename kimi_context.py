@@ -0,0 +1,250 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Kontext-Verwaltung
+Token-Budget für den Conversation-Verlauf mit inkrementeller Token-Schätzung
+"""
+
+import json
+import re
+from typing import Any, Dict, List, Optional
+
+# Kontextfenster der Moonshot-Modelle (Tokens)
+CONTEXT_WINDOWS = {
+    "8k": 8 * 1024,
+    "32k": 32 * 1024,
+    "128k": 128 * 1024,
+}
+DEFAULT_CONTEXT_WINDOW = 128 * 1024
+
+# Pauschaler Overhead pro Nachricht (Rolle, Trennzeichen)
+MESSAGE_OVERHEAD = 4
+
+FOLD_MARKER = "[Gekürzter Verlauf]"
+
+_CJK = re.compile(r"[\u3000-\u9fff\uac00-\ud7af\uff00-\uffef]")
+
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """
+    Tokens grob schätzen (ohne Tokenizer)
+
+    ~4 Zeichen pro Token für lateinische Schrift, ~1 Token pro CJK-Zeichen.
+    """
+    if not text:
+        return 0
+    cjk = len(_CJK.findall(text))
+    return cjk + (len(text) - cjk + 3) // 4
+
+
+def estimate_message_tokens(message: Dict[str, Any]) -> int:
+    """Tokens einer Chat-Nachricht inklusive Overhead schätzen"""
+    tokens = MESSAGE_OVERHEAD + estimate_tokens(message.get("content") if isinstance(message.get("content"), str) else None)
+    for call in message.get("tool_calls") or []:
+        function = call.get("function", {}) if isinstance(call, dict) else getattr(call, "function", None)
+        if isinstance(function, dict):
+            tokens += estimate_tokens(function.get("name")) + estimate_tokens(function.get("arguments"))
+        elif function is not None:
+            tokens += estimate_tokens(function.name) + estimate_tokens(function.arguments)
+    return tokens
+
+
+def context_window_for(model: str) -> int:
+    """Kontextfenster eines Modells anhand des Namens bestimmen"""
+    name = model.lower()
+    for suffix, size in CONTEXT_WINDOWS.items():
+        if name.endswith(suffix) or f"-{suffix}-" in name:
+            return size
+    return DEFAULT_CONTEXT_WINDOW
+
+
+# Moonshot-Modelle nach Kontextgröße (kleinstes zuerst)
+MOONSHOT_TIERS = ["moonshot-v1-8k", "moonshot-v1-32k", "moonshot-v1-128k"]
+
+
+def estimate_request_tokens(messages: List[Dict[str, Any]], tools: Optional[List[Dict[str, Any]]] = None) -> int:
+    """Tokens einer kompletten Anfrage (Nachrichten und Tool-Definitionen) schätzen"""
+    tokens = sum(estimate_message_tokens(m) for m in messages)
+    if tools:
+        tokens += estimate_tokens(json.dumps(tools, ensure_ascii=False))
+    return tokens
+
+
+def select_model_tier(prompt_tokens: int, max_tokens: int, tiers: Optional[List[str]] = None,
+                      safety_margin: float = 1.1) -> str:
+    """
+    Kleinstes Modell wählen, dessen Kontextfenster Prompt und Antwort fasst
+
+    Args:
+        prompt_tokens: Geschätzte Prompt-Tokens
+        max_tokens: Reserve für die Antwort
+        tiers: Modelle nach Kontextgröße aufsteigend (Standard: MOONSHOT_TIERS)
+        safety_margin: Aufschlag auf die (grobe) Schätzung
+
+    Returns:
+        Modell-Name (größtes Modell, falls keines passt)
+    """
+    tiers = tiers or MOONSHOT_TIERS
+    needed = int(prompt_tokens * safety_margin) + max_tokens
+    for model in tiers:
+        if needed <= context_window_for(model):
+            return model
+    return tiers[-1]
+
+
+class ConversationWindow:
+    """
+    Token-Budget für einen Conversation-Verlauf
+
+    - Token-Schätzungen werden pro Nachricht gecacht und nur für neue
+      Nachrichten berechnet (der Verlauf wird als append-only angenommen)
+    - Der System-Prompt am Anfang bleibt immer erhalten
+    - Bei Überschreitung werden die ältesten Turns verworfen ("drop") oder
+      zu einer kurzen Notiz zusammengefaltet ("fold")
+    """
+
+    def __init__(self, budget_ratio: float = 0.9, max_budget: Optional[int] = None,
+                 strategy: str = "drop", fold_chars: int = 120):
+        """
+        Initialisiere Conversation-Window
+
+        Args:
+            budget_ratio: Anteil des Modell-Kontextfensters, der genutzt werden darf
+            max_budget: Optional absolute Obergrenze in Tokens
+            strategy: "drop" (verwerfen) oder "fold" (zusammenfalten)
+            fold_chars: Zeichen pro Nachricht in der Faltnotiz
+        """
+        if strategy not in ("drop", "fold"):
+            raise ValueError("strategy muss 'drop' oder 'fold' sein")
+        if not 0.0 < budget_ratio <= 1.0:
+            raise ValueError("budget_ratio muss zwischen 0.0 und 1.0 liegen")
+
+        self.budget_ratio = budget_ratio
+        self.max_budget = max_budget
+        self.strategy = strategy
+        self.fold_chars = fold_chars
+
+        self._history_id: Optional[int] = None
+        self._estimates: List[int] = []
+        self._total = 0
+        self.dropped_messages = 0
+
+    def budget_for(self, model: str, max_tokens: int) -> int:
+        """Token-Budget für den Verlauf (Kontextfenster abzüglich Antwort-Reserve)"""
+        budget = int(context_window_for(model) * self.budget_ratio) - max_tokens
+        if self.max_budget is not None:
+            budget = min(budget, self.max_budget)
+        return max(budget, 0)
+
+    def _sync(self, history: List[Dict[str, Any]]):
+        """Gecachte Schätzungen an den aktuellen Verlauf angleichen"""
+        if self._history_id != id(history) or len(history) < len(self._estimates):
+            self._history_id = id(history)
+            self._estimates = []
+            self._total = 0
+        for message in history[len(self._estimates):]:
+            tokens = estimate_message_tokens(message)
+            self._estimates.append(tokens)
+            self._total += tokens
+
+    def count(self, history: List[Dict[str, Any]]) -> int:
+        """Geschätzte Tokens des Verlaufs"""
+        self._sync(history)
+        return self._total
+
+    def fit(self, history: List[Dict[str, Any]], model: str, max_tokens: int) -> List[Dict[str, Any]]:
+        """
+        Verlauf in-place auf das Budget kürzen
+
+        Args:
+            history: Conversation-Verlauf (wird direkt verändert)
+            model: Modell-Name (bestimmt das Kontextfenster)
+            max_tokens: Reserve für die Antwort
+
+        Returns:
+            Der (gekürzte) Verlauf
+        """
+        self._sync(history)
+        budget = self.budget_for(model, max_tokens)
+        if self._total <= budget:
+            return history
+
+        start = self._first_droppable(history)
+        dropped: List[Dict[str, Any]] = []
+
+        # Beim Falten Platz für die Notiz lassen
+        target = budget - self._fold_limit(budget) if self.strategy == "fold" else budget
+
+        # Ganze Turns (User-Nachricht samt Antworten) entfernen, die letzte User-Nachricht bleibt
+        while self._total > target:
+            end = self._turn_end(history, start)
+            if end >= len(history):
+                break
+            for _ in range(start, end):
+                dropped.append(history.pop(start))
+                self._total -= self._estimates.pop(start)
+            self.dropped_messages += end - start
+
+        if dropped and self.strategy == "fold":
+            self._fold(history, dropped, budget)
+        return history
+
+    def _first_droppable(self, history: List[Dict[str, Any]]) -> int:
+        """Index der ersten Nachricht nach System-Prompt und Faltnotiz"""
+        index = 0
+        while index < len(history) and history[index].get("role") == "system":
+            index += 1
+        return index
+
+    @staticmethod
+    def _turn_end(history: List[Dict[str, Any]], start: int) -> int:
+        """Ende des Turns, der bei start beginnt (nächste User-Nachricht)"""
+        end = start + 1
+        while end < len(history) and history[end].get("role") != "user":
+            end += 1
+        return end
+
+    @staticmethod
+    def _fold_limit(budget: int) -> int:
+        """Maximale Größe der Faltnotiz (10% des Budgets)"""
+        return max(budget // 10, 1)
+
+    def _fold(self, history: List[Dict[str, Any]], dropped: List[Dict[str, Any]], budget: int):
+        """Verworfene Nachrichten als kurze Notiz hinter dem System-Prompt ablegen"""
+        lines = []
+        for message in dropped:
+            content = message.get("content")
+            if message.get("role") in ("user", "assistant") and isinstance(content, str) and content:
+                lines.append(f"- {message['role']}: {content[:self.fold_chars].strip()}")
+
+        index = self._first_droppable(history)
+        existing = None
+        if index > 0 and str(history[index - 1].get("content", "")).startswith(FOLD_MARKER):
+            index -= 1
+            existing = history.pop(index)
+            self._total -= self._estimates.pop(index)
+        if existing:
+            lines = existing["content"].splitlines()[1:] + lines
+
+        # Notiz selbst auf einen kleinen Teil des Budgets begrenzen
+        limit = self._fold_limit(budget) - MESSAGE_OVERHEAD - estimate_tokens(FOLD_MARKER)
+        while lines and estimate_tokens("\n".join(lines)) > limit:
+            lines.pop(0)
+        if not lines:
+            return
+
+        note = {"role": "system", "content": "\n".join([FOLD_MARKER] + lines)}
+        history.insert(index, note)
+        tokens = estimate_message_tokens(note)
+        self._estimates.insert(index, tokens)
+        self._total += tokens
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Status des Fensters"""
+        return {
+            "history_tokens": self._total,
+            "history_messages": len(self._estimates),
+            "dropped_messages": self.dropped_messages,
+            "strategy": self.strategy,
+        }
@@ -0,0 +1,249 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Context Caching
+Stabilen Präfix (System-Prompt, Referenzdateien) einmal registrieren und per Cache-ID referenzieren
+"""
+
+import hashlib
+import json
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, List, Optional
+
+from kimi_context import estimate_request_tokens
+
+logger = logging.getLogger("kimi.context_cache")
+
+# Moonshot cached für die ganze moonshot-v1-Familie (8k/32k/128k)
+DEFAULT_CACHE_MODEL = "moonshot-v1"
+
+_CACHE_ROLE = "cache"
+
+
+def is_cache_miss(exc: Exception) -> bool:
+    """Fehler durch eine abgelaufene oder verdrängte Cache-ID?"""
+    return getattr(exc, "status_code", None) in (400, 404) and "cache" in str(exc).lower()
+
+
+def uses_cache(messages: List[Dict[str, Any]]) -> bool:
+    """Beginnt die Anfrage mit einer Cache-Referenz?"""
+    return bool(messages) and messages[0].get("role") == _CACHE_ROLE
+
+
+def stable_prefix_length(messages: List[Dict[str, Any]]) -> int:
+    """Anzahl führender System-Nachrichten (System-Prompt, eingebundene Dateien)"""
+    count = 0
+    for message in messages:
+        if message.get("role") != "system":
+            break
+        count += 1
+    return count
+
+
+class _CacheEntry:
+    __slots__ = ("id", "tokens", "ready", "expires_at", "hits")
+
+    def __init__(self, cache_id: str, tokens: int, ready: bool, expires_at: float):
+        self.id = cache_id
+        self.tokens = tokens
+        self.ready = ready
+        self.expires_at = expires_at
+        self.hits = 0
+
+
+class ContextCache:
+    """
+    Präfix-Cache über die Moonshot Context-Caching-API (/v1/caching)
+
+    - Führende System-Nachrichten ab ``min_tokens`` werden beim ersten
+      Auftreten registriert und danach als ``{"role": "cache", ...}``
+      referenziert - jede Referenz setzt die TTL zurück (reset_ttl)
+    - Lokal abgelaufene Einträge werden vor der Nutzung neu registriert
+    - Ist der Cache serverseitig verdrängt, geht dieselbe Anfrage mit dem
+      vollen Präfix erneut raus; beim nächsten Aufruf wird neu registriert
+    - Schlägt die Registrierung fehl, wird ``retry_after_failure`` Sekunden
+      lang ohne Cache gesendet
+    - Nur Anfragen an Modelle der ``cache_model``-Familie nutzen den Cache
+      (None = mit dem Modell der Anfrage registrieren)
+    - Caches gelten pro API-Key: Registrierung und Referenz müssen mit
+      demselben Key gesendet werden
+    """
+
+    def __init__(self, ttl: int = 3600, min_tokens: int = 1024, cache_model: Optional[str] = DEFAULT_CACHE_MODEL,
+                 max_entries: int = 64, retry_after_failure: float = 60.0):
+        """
+        Args:
+            ttl: Lebensdauer eines Caches in Sekunden (wird bei jeder Nutzung erneuert)
+            min_tokens: Kleinere Präfixe werden normal gesendet
+            cache_model: Modell(familie) für die Registrierung (None = Modell der Anfrage)
+            max_entries: Anzahl lokal gemerkter Caches (älteste fallen heraus)
+            retry_after_failure: Pause nach einer fehlgeschlagenen Registrierung
+        """
+        self.ttl = ttl
+        self.min_tokens = min_tokens
+        self.cache_model = cache_model
+        self.max_entries = max_entries
+        self.retry_after_failure = retry_after_failure
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._failed_until: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._stats = {"created": 0, "hits": 0, "refreshed": 0, "evicted": 0, "errors": 0, "skipped": 0,
+                       "other_model": 0, "cached_tokens": 0}
+
+    @staticmethod
+    def make_key(base_url: str, prefix: List[Dict[str, Any]], api_key: str = "", model: str = "") -> str:
+        payload = json.dumps(prefix, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(f"{base_url}\n{api_key}\n{model}\n{payload}".encode("utf-8")).hexdigest()
+
+    def supports(self, model: str) -> bool:
+        """Gehört das Modell zur Familie, für die registriert wird?"""
+        family = self.cache_model
+        return family is None or model == family or model.startswith(f"{family}-")
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _register(self, client: Any, prefix: List[Dict[str, Any]], tokens: int, model: str) -> _CacheEntry:
+        response = client.post("/caching", cast_to=object, body={
+            "model": self.cache_model or model, "messages": prefix, "ttl": self.ttl,
+        })
+        return _CacheEntry(response["id"], int(response.get("tokens") or tokens),
+                           response.get("status", "ready") == "ready", time.monotonic() + self.ttl)
+
+    def _poll(self, client: Any, entry: _CacheEntry):
+        """Status eines noch nicht bereiten Caches abfragen"""
+        response = client.get(f"/caching/{entry.id}", cast_to=object)
+        entry.ready = response.get("status") == "ready"
+
+    def _entry(self, client: Any, prefix: List[Dict[str, Any]], model: str) -> Optional[_CacheEntry]:
+        """Bereiten Cache für den Präfix liefern (registriert bei Bedarf), sonst None"""
+        key = self.make_key(str(client.base_url), prefix, getattr(client, "api_key", "") or "",
+                            self.cache_model or model)
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+            if self._failed_until.get(key, 0.0) > now:
+                return None
+        if entry is not None and entry.expires_at <= now:
+            self._count("refreshed")
+            entry = None
+        if entry is None:
+            tokens = estimate_request_tokens(prefix)
+            if tokens < self.min_tokens:
+                self._count("skipped")
+                return None
+            try:
+                entry = self._register(client, prefix, tokens, model)
+            except Exception as e:
+                logger.warning("Context Cache konnte nicht registriert werden: %s", e)
+                with self._lock:
+                    self._stats["errors"] += 1
+                    self._failed_until[key] = now + self.retry_after_failure
+                return None
+            with self._lock:
+                self._stats["created"] += 1
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+        elif not entry.ready:
+            try:
+                self._poll(client, entry)
+            except Exception as e:
+                logger.debug("Context-Cache-Status nicht abrufbar: %s", e)
+        return entry if entry.ready else None
+
+    def _forget(self, entry: _CacheEntry):
+        with self._lock:
+            for key, known in list(self._entries.items()):
+                if known is entry:
+                    del self._entries[key]
+            self._stats["evicted"] += 1
+
+    def reference(self, entry: _CacheEntry) -> Dict[str, str]:
+        """Cache-Nachricht, die den Präfix ersetzt (erneuert die TTL)"""
+        return {"role": _CACHE_ROLE, "content": f"cache_id={entry.id};reset_ttl={self.ttl}"}
+
+    def call(self, client: Any, kwargs: Dict[str, Any], send: Callable[[Dict[str, Any]], Any]) -> Any:
+        """
+        Anfrage mit Cache-Referenz statt Präfix senden
+
+        Args:
+            client: OpenAI-Client für /v1/caching (base_url und API-Key bestimmen den Cache-Schlüssel)
+            kwargs: Parameter für chat.completions.create
+            send: Sendet die (ggf. umgeschriebenen) Parameter - mit einer Cache-Referenz
+                (uses_cache) über denselben Key wie ``client``
+        """
+        messages = kwargs["messages"]
+        length = stable_prefix_length(messages)
+        if not length or length == len(messages):
+            return send(kwargs)
+        if not self.supports(kwargs["model"]):
+            # Fremde Modellfamilie: eine Referenz würde abgelehnt und erneut gesendet
+            self._count("other_model")
+            return send(kwargs)
+        entry = self._entry(client, messages[:length], kwargs["model"])
+        if entry is None:
+            return send(kwargs)
+
+        try:
+            result = send(dict(kwargs, messages=[self.reference(entry)] + messages[length:]))
+        except Exception as e:
+            if not is_cache_miss(e):
+                raise
+            # Verdrängt: diese Anfrage mit vollem Präfix, beim nächsten Mal neu registrieren
+            logger.info("Context Cache %s nicht mehr vorhanden, sende vollen Präfix", entry.id)
+            self._forget(entry)
+            return send(kwargs)
+        entry.expires_at = time.monotonic() + self.ttl
+        with self._lock:
+            entry.hits += 1
+            self._stats["hits"] += 1
+            self._stats["cached_tokens"] += entry.tokens
+        return result
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Registrierte Caches, Treffer, Verdrängungen und eingesparte Präfix-Tokens"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["entries"] = len(self._entries)
+        stats["ttl"] = self.ttl
+        stats["min_tokens"] = self.min_tokens
+        return stats
+
+
+def context_cache_enabled(enabled: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_CONTEXT_CACHE)"""
+    if enabled is not None:
+        return enabled
+    return os.getenv("KIMI_CONTEXT_CACHE", "0").lower() in ("1", "true", "yes")
+
+
+_shared_context_cache: Optional[ContextCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_context_cache() -> ContextCache:
+    """Prozessweiten Context Cache (KIMI_CONTEXT_CACHE_TTL, KIMI_CONTEXT_CACHE_MIN_TOKENS)"""
+    global _shared_context_cache
+    with _shared_lock:
+        if _shared_context_cache is None:
+            _shared_context_cache = ContextCache(
+                ttl=int(os.getenv("KIMI_CONTEXT_CACHE_TTL", "3600")),
+                min_tokens=int(os.getenv("KIMI_CONTEXT_CACHE_MIN_TOKENS", "1024")),
+            )
+        return _shared_context_cache
+
+
+def set_shared_context_cache(cache: Optional[ContextCache]):
+    """Prozessweiten Context Cache ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_context_cache
+    with _shared_lock:
+        _shared_context_cache = cache
@@ -0,0 +1,214 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Files API
+Dateien über /v1/files hochladen - Inhalts-Hash -> file_id, damit keine Datei zweimal hochgeladen wird
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Moonshot extrahiert Text aus PDF, Office-Dokumenten, Code usw.
+DEFAULT_PURPOSE = "file-extract"
+
+
+def file_sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def extracted_text(raw: str) -> str:
+    """Text aus der Antwort von /files/{id}/content (JSON mit "content" oder reiner Text)"""
+    try:
+        payload = json.loads(raw)
+    except ValueError:
+        return raw
+    if isinstance(payload, dict) and isinstance(payload.get("content"), str):
+        return payload["content"]
+    return raw
+
+
+class FileStore:
+    """
+    Upload-Cache für die Moonshot Files API
+
+    - Schlüssel: SHA-256 des Inhalts + base_url + Account (Hash des API-Keys) -
+      gleicher Inhalt unter anderem Namen wird nicht erneut hochgeladen, file_ids
+      eines anderen Accounts werden nie verwendet
+    - Der extrahierte Text wird mitgespeichert (In-Memory LRU, optional SQLite)
+    - Ist eine gemerkte file_id beim Provider gelöscht, wird neu hochgeladen
+    - Der extrahierte Text kommt als System-Nachricht in den Verlauf; mit
+      Context Caching (kimi_context_cache.py) wird er nur einmal gesendet
+    """
+
+    def __init__(self, db_path: Optional[str] = None, purpose: str = DEFAULT_PURPOSE, max_entries: int = 64):
+        """
+        Args:
+            db_path: Pfad zur SQLite-Datei (None = nur In-Memory, Standard aus KIMI_FILE_CACHE)
+            purpose: Upload-Zweck der Files API
+            max_entries: Extrahierte Texte im Speicher
+        """
+        self.purpose = purpose
+        self.max_entries = max_entries
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"uploads": 0, "reused": 0, "reuploads": 0, "content_fetches": 0, "bytes_uploaded": 0,
+                       "bytes_saved": 0}
+
+        db_path = db_path or os.getenv("KIMI_FILE_CACHE")
+        self._db: Optional[sqlite3.Connection] = None
+        if db_path:
+            self._db = sqlite3.connect(os.path.expanduser(db_path), check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS files ("
+                "key TEXT PRIMARY KEY, file_id TEXT NOT NULL, filename TEXT, bytes INTEGER, content TEXT, "
+                "created REAL NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def make_key(base_url: str, sha256: str, api_key: str = "") -> str:
+        # Nur ein Hash des Keys landet im Schlüssel (und damit in der SQLite-Datei)
+        account = hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:16]
+        return f"{base_url}#{account}#{sha256}"
+
+    def _count(self, name: str, amount: int = 1):
+        with self._lock:
+            self._stats[name] += amount
+
+    def _lookup(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                self._memory.move_to_end(key)
+                return entry
+            if self._db is None:
+                return None
+            row = self._db.execute("SELECT file_id, filename, bytes, content FROM files WHERE key = ?",
+                                   (key,)).fetchone()
+        if row is None:
+            return None
+        entry = {"id": row[0], "filename": row[1], "bytes": row[2], "content": row[3]}
+        self._remember(key, entry, persist=False)
+        return entry
+
+    def _remember(self, key: str, entry: Dict[str, Any], persist: bool = True):
+        with self._lock:
+            self._memory[key] = entry
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+            if persist and self._db is not None:
+                self._db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                                 (key, entry["id"], entry["filename"], entry["bytes"], entry.get("content"),
+                                  time.time()))
+                self._db.commit()
+
+    def _forget(self, key: str):
+        with self._lock:
+            self._memory.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM files WHERE key = ?", (key,))
+                self._db.commit()
+
+    def _upload(self, client: Any, key: str, filename: str, data: bytes) -> Dict[str, Any]:
+        uploaded = client.files.create(file=(filename, data), purpose=self.purpose)
+        with self._lock:
+            self._stats["uploads"] += 1
+            self._stats["bytes_uploaded"] += len(data)
+        entry = {"id": uploaded.id, "filename": filename, "bytes": len(data), "content": None}
+        self._remember(key, entry)
+        return entry
+
+    def _resolve(self, client: Any, filename: str, data: bytes):
+        sha256 = file_sha256(data)
+        key = self.make_key(str(client.base_url), sha256, getattr(client, "api_key", None) or "")
+        entry = self._lookup(key)
+        reused = entry is not None
+        if reused:
+            with self._lock:
+                self._stats["reused"] += 1
+                self._stats["bytes_saved"] += len(data)
+        else:
+            entry = self._upload(client, key, filename, data)
+        info = {"id": entry["id"], "filename": filename, "bytes": len(data), "sha256": sha256, "reused": reused}
+        return key, entry, info
+
+    def upload(self, client: Any, filename: str, data: bytes) -> Dict[str, Any]:
+        """
+        Datei hochladen - oder die file_id eines früheren Uploads mit gleichem Inhalt liefern
+
+        Returns:
+            Dict mit id, filename, bytes, sha256 und reused
+        """
+        return self._resolve(client, filename, data)[2]
+
+    def content(self, client: Any, filename: str, data: bytes) -> str:
+        """Extrahierten Text einer Datei (Upload und Abruf nur beim ersten Mal)"""
+        return self.extract(client, filename, data)["content"]
+
+    def extract(self, client: Any, filename: str, data: bytes) -> Dict[str, Any]:
+        """
+        Wie content(), liefert aber auch, ob der Cache getroffen wurde
+
+        Returns:
+            Dict mit content, id, filename, bytes, sha256 und reused
+            (reused: kein Upload für diesen Aufruf - unabhängig von parallelen Uploads)
+        """
+        key, entry, info = self._resolve(client, filename, data)
+        if entry.get("content") is not None:
+            return dict(info, content=entry["content"])
+        try:
+            text = extracted_text(client.files.content(file_id=entry["id"]).text)
+        except Exception as e:
+            if getattr(e, "status_code", None) != 404 or not info["reused"]:
+                raise
+            # Beim Provider gelöscht: neu hochladen
+            self._forget(key)
+            self._count("reuploads")
+            entry = self._upload(client, key, filename, data)
+            info = dict(info, id=entry["id"], reused=False)
+            text = extracted_text(client.files.content(file_id=entry["id"]).text)
+        self._count("content_fetches")
+        entry["content"] = text
+        self._remember(key, entry)
+        return dict(info, content=text)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Uploads, wiederverwendete Dateien und eingesparte Bytes"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["cached_files"] = len(self._memory)
+        stats["persistent"] = self._db is not None
+        return stats
+
+
+def file_message(filename: str, content: str) -> Dict[str, str]:
+    """System-Nachricht mit dem extrahierten Text einer Datei"""
+    return {"role": "system", "content": f"[FILE {filename}]:\n{content}"}
+
+
+_shared_file_store: Optional[FileStore] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_file_store() -> FileStore:
+    """Prozessweiten Upload-Cache abrufen (SQLite-Datei aus KIMI_FILE_CACHE)"""
+    global _shared_file_store
+    with _shared_lock:
+        if _shared_file_store is None:
+            _shared_file_store = FileStore()
+        return _shared_file_store
+
+
+def set_shared_file_store(store: Optional[FileStore]):
+    """Prozessweiten Upload-Cache ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_file_store
+    with _shared_lock:
+        _shared_file_store = store
@@ -13,14 +13,15 @@ import json
 import os
 from datetime import datetime
 from kimi_client import KimiClient
-from dotenv import load_dotenv
+from kimi_stream import TRUNCATED_MARKER
 
-load_dotenv()
+# .env lädt KimiClient bei der Initialisierung
 
 class KimiGUI:
     def __init__(self, root):
         self.root = root
         self.kimi = None
+        self.active_stream = None
         self.setup_ui()
         self.setup_client()
         
@@ -113,9 +114,12 @@ class KimiGUI:
         self.send_button = ttk.Button(button_frame, text="Senden", command=self.send_message)
         self.send_button.grid(row=0, column=0, pady=(0, 5))
         
-        ttk.Button(button_frame, text="Löschen", command=self.clear_chat).grid(row=1, column=0, pady=(0, 5))
-        ttk.Button(button_frame, text="Speichern", command=self.save_chat).grid(row=2, column=0, pady=(0, 5))
-        ttk.Button(button_frame, text="Laden", command=self.load_chat).grid(row=3, column=0)
+        self.stop_button = ttk.Button(button_frame, text="Stopp", command=self.stop_response, state="disabled")
+        self.stop_button.grid(row=1, column=0, pady=(0, 5))
+        
+        ttk.Button(button_frame, text="Löschen", command=self.clear_chat).grid(row=2, column=0, pady=(0, 5))
+        ttk.Button(button_frame, text="Speichern", command=self.save_chat).grid(row=3, column=0, pady=(0, 5))
+        ttk.Button(button_frame, text="Laden", command=self.load_chat).grid(row=4, column=0)
         
         # Status Bar
         self.status_var = tk.StringVar(value="Bereit")
@@ -124,12 +128,13 @@ class KimiGUI:
         
         # Keyboard Bindings
         self.input_text.bind('<Control-Return>', lambda e: self.send_message())
+        self.root.bind('<Escape>', lambda e: self.stop_response())
         self.root.bind('<F1>', lambda e: self.show_help())
         
     def setup_client(self):
         """Initialisiert den Kimi Client"""
         try:
-            self.kimi = KimiClient()
+            self.kimi = KimiClient(prewarm=True)
             self.status_var.set("✅ Kimi K2 Client bereit")
             self.add_to_chat("System", "Kimi K2 Instruct Client initialisiert!", "system")
         except Exception as e:
@@ -215,10 +220,14 @@ class KimiGUI:
                     messages.append({"role": "system", "content": system_prompt})
                 messages.append({"role": "user", "content": message})
                 
-                full_response = ""
-                for chunk in self.kimi.chat_stream(messages):
-                    full_response += chunk
+                stream = self.kimi.chat_stream(messages)
+                self.active_stream = stream
+                self.root.after(0, lambda: self.stop_button.configure(state="normal"))
+                # Gebündelt: ein root.after() pro ~30 ms statt pro Token
+                for chunk in stream.coalesce():
                     self.root.after(0, lambda c=chunk: self.append_to_last_message(c))
+                if stream.truncated:
+                    self.root.after(0, lambda: self.append_to_last_message(TRUNCATED_MARKER))
                 
             else:
                 # Normaler Modus
@@ -228,6 +237,7 @@ class KimiGUI:
         except Exception as e:
             self.root.after(0, lambda: self.add_to_chat("Fehler", f"Fehler beim Senden: {e}", "error"))
         finally:
+            self.active_stream = None
             self.root.after(0, self.enable_send_button)
     
     def append_to_last_message(self, chunk):
@@ -240,16 +250,24 @@ class KimiGUI:
     def enable_send_button(self):
         """Aktiviert den Senden-Button wieder"""
         self.send_button.configure(state="normal")
+        self.stop_button.configure(state="disabled")
         self.status_var.set("✅ Bereit")
     
+    def stop_response(self):
+        """Bricht die laufende Antwort ab (schließt die Verbindung sofort)"""
+        if self.active_stream is not None:
+            self.active_stream.cancel()
+            self.status_var.set("⏹️ Antwort abgebrochen")
+    
     def clear_chat(self):
         """Löscht den Chat"""
         if messagebox.askyesno("Chat löschen", "Möchten Sie den Chat wirklich löschen?"):
+            self.stop_response()
             self.chat_display.configure(state=tk.NORMAL)
             self.chat_display.delete("1.0", tk.END)
             self.chat_display.configure(state=tk.DISABLED)
             if self.kimi:
-                self.kimi.clear_history()
+                self.kimi.clear_conversation()
             self.add_to_chat("System", "Chat gelöscht", "system")
     
     def save_chat(self):
@@ -13,25 +13,27 @@ import queue
 import json
 import os
 import tempfile
-import requests
-import playsound
 from typing import Optional
 from datetime import datetime
 from kimi_client import KimiClient
-from dotenv import load_dotenv
+from kimi_context_cache import stable_prefix_length
+from kimi_files import file_message
+from kimi_context import context_window_for, estimate_tokens
+from kimi_mapreduce import chunk_budget
+from kimi_stream import TRUNCATED_MARKER
+from kimi_lazy import lazy_import, load_env, module_available
 
-# TTS/STT Imports
-try:
-    import pyttsx3
-    import speech_recognition as sr
-    TTS_AVAILABLE = True
-    STT_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
-    STT_AVAILABLE = False
-    print("⚠️  TTS/STT nicht verfügbar. Installieren Sie: pip install pyttsx3 speechrecognition pyaudio")
+# Schwere Abhängigkeiten erst bei der ersten Verwendung importieren
+requests = lazy_import("requests")
+playsound = lazy_import("playsound")
 
-load_dotenv()
+# TTS/STT Imports (Verfügbarkeit prüfen, ohne zu importieren)
+pyttsx3 = lazy_import("pyttsx3")
+sr = lazy_import("speech_recognition")
+TTS_AVAILABLE = module_available("pyttsx3")
+STT_AVAILABLE = module_available("speech_recognition")
+if not (TTS_AVAILABLE and STT_AVAILABLE):
+    print("⚠️  TTS/STT nicht verfügbar. Installieren Sie: pip install pyttsx3 speechrecognition pyaudio")
 
 
 def play_elevenlabs_tts(text: str, voice_id: str, api_key: str) -> bool:
@@ -55,6 +57,7 @@ def play_elevenlabs_tts(text: str, voice_id: str, api_key: str) -> bool:
 
 class ModernKimiGUI:
     def __init__(self):
+        load_env()
         self.root = tk.Tk()
         self.setup_window()
         self.setup_styling()
@@ -65,6 +68,7 @@ class ModernKimiGUI:
         # Chat-Verlauf
         self.chat_history = []
         self.current_conversation = []
+        self.active_stream = None
         
         # Status
         self.is_recording = False
@@ -246,6 +250,7 @@ class ModernKimiGUI:
         self.input_text.bind('<Return>', lambda e: self.send_message() or "break")
         self.input_text.bind('<Shift-Return>', lambda e: None)  # Neue Zeile mit Shift
         self.input_text.bind('<Control-Return>', lambda e: self.send_message() or "break")
+        self.root.bind('<Escape>', lambda e: self.stop_response())
         
         # Button-Leiste
         button_frame = tk.Frame(input_frame, bg=self.colors['bg_primary'])
@@ -263,6 +268,18 @@ class ModernKimiGUI:
                            pady=8)
         send_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        # Stopp-Button (bricht die laufende Antwort ab)
+        stop_btn = tk.Button(button_frame,
+                           text="⏹️ Stopp (Esc)",
+                           command=self.stop_response,
+                           bg=self.colors['bg_secondary'],
+                           fg=self.colors['text_secondary'],
+                           font=('Segoe UI', 12),
+                           relief=tk.FLAT,
+                           padx=15,
+                           pady=8)
+        stop_btn.pack(side=tk.LEFT, padx=5)
+        
         # TTS-Button (immer anzeigen)
         tts_text = "🔊 Sprechen" if TTS_AVAILABLE else "🔊 TTS (nicht verfügbar)"
         tts_color = self.colors['success'] if TTS_AVAILABLE else self.colors['bg_secondary']
@@ -361,14 +378,26 @@ class ModernKimiGUI:
     def setup_client(self):
         """Kimi-Client initialisieren"""
         try:
-            self.client = KimiClient()
+            # Context Caching (KIMI_CONTEXT_CACHE=1): hochgeladene Dateien nur einmal senden, danach per Cache-ID
+            self.client = KimiClient(prewarm=True)
             self.update_status("Kimi K2 Client initialisiert")
         except Exception as e:
             self.add_message("error", f"❌ Fehler beim Initialisieren: {str(e)}\n")
             self.client = None
             
     def setup_tts_stt(self):
-        """TTS und STT initialisieren"""
+        """TTS und STT vorbereiten - Engines werden erst bei der ersten Verwendung geladen"""
+        self.tts_engine = None
+        self.recognizer = None
+        self.microphone = None
+        self._tts_initialized = False
+        self._stt_initialized = False
+        
+    def _ensure_tts(self):
+        """TTS-Engine initialisieren (pyttsx3 wird erst hier importiert)"""
+        if self._tts_initialized:
+            return
+        self._tts_initialized = True
         if TTS_AVAILABLE:
             try:
                 self.tts_engine = pyttsx3.init()
@@ -390,6 +419,11 @@ class ModernKimiGUI:
                 print(f"TTS Fehler: {e}")
                 self.tts_engine = None
         
+    def _ensure_stt(self):
+        """Mikrofon und Spracherkennung initialisieren (speech_recognition wird erst hier importiert)"""
+        if self._stt_initialized:
+            return
+        self._stt_initialized = True
         if STT_AVAILABLE:
             try:
                 self.recognizer = sr.Recognizer()
@@ -441,8 +475,9 @@ class ModernKimiGUI:
         self.current_conversation.append({"role": "user", "content": user_input})
         files_to_send = self.uploaded_files
         self.uploaded_files = []
-        for f in files_to_send:
-            self.current_conversation.append({"role": "user", "content": f"[FILE {f['name']}]:\n{f['content']}"})
+        # Dateien als System-Nachrichten an den Anfang - stabiler Präfix für das Context Caching
+        position = stable_prefix_length(self.current_conversation)
+        self.current_conversation[position:position] = files_to_send
         
         # In Thread senden (UI nicht blockieren)
         threading.Thread(target=self._send_message_thread, args=(user_input,), daemon=True).start()
@@ -450,22 +485,37 @@ class ModernKimiGUI:
         
     def _send_message_thread(self, user_input):
         """Nachricht in separatem Thread senden"""
+        # Wird der Chat währenddessen geleert, landet die Antwort nicht im neuen Verlauf
+        conversation = self.current_conversation
         try:
             # Client konfigurieren
             self.client.model = self.model_var.get()
             self.client.temperature = self.temp_var.get()
             
-            # Stream-Response verarbeiten
-            response_content = ""
+            # Placeholder für Response - Chunks landen an dessen Marke, auch wenn danach
+            # weitere Nachrichten (Status, Fehler, Datei-Uploads) angehängt werden
+            mark = f"stream-{threading.get_ident()}"
+            self.root.after(0, self._add_streaming_placeholder, mark)
             
-            for chunk in self.client.chat_stream(self.current_conversation):
+            # Stream-Response verarbeiten (abbrechbar über stop_response)
+            stream = self.client.chat_stream(conversation)
+            self.active_stream = stream
+            # Gebündelt: ein root.after() pro ~30 ms statt pro Token
+            for chunk in stream.coalesce():
                 if chunk:
-                    response_content += chunk
                     # UI in Main-Thread aktualisieren
-                    self.root.after(0, self._update_streaming_response, response_content)
+                    self.root.after(0, self._update_streaming_response, chunk, mark)
+            response_content = stream.text
+            
+            if stream.truncated:
+                # Teilantwort als abgebrochen markiert behalten
+                if response_content:
+                    conversation.append({"role": "assistant", "content": response_content + TRUNCATED_MARKER})
+                self.root.after(0, self.update_status, "Antwort abgebrochen")
+                return
             
             # Vollständige Antwort zum Verlauf hinzufügen
-            self.current_conversation.append({"role": "assistant", "content": response_content})
+            conversation.append({"role": "assistant", "content": response_content})
             
             # TTS abspielen (falls aktiviert)
             if hasattr(self, 'tts_enabled') and self.tts_enabled and (self.tts_engine or self.voice_var.get().strip()):
@@ -477,35 +527,30 @@ class ModernKimiGUI:
             error_msg = f"❌ Fehler: {str(e)}\n"
             self.root.after(0, self.add_message, "error", error_msg)
             self.root.after(0, self.update_status, "Fehler aufgetreten")
+        finally:
+            self.active_stream = None
+            self.root.after(0, self.chat_text.mark_unset, mark)
+    
+    def stop_response(self):
+        """Laufende Antwort abbrechen - schließt die Verbindung, es werden keine Tokens mehr erzeugt"""
+        stream = self.active_stream
+        if stream is not None:
+            stream.cancel()
+            self.update_status("Antwort abgebrochen")
             
-    def _update_streaming_response(self, content):
-        """Streaming-Response in Echtzeit anzeigen"""
-        # Letzte AI-Nachricht finden und aktualisieren
+    def _add_streaming_placeholder(self, mark):
+        """Leere Kimi-Nachricht anlegen und die Einfügeposition als Marke merken"""
+        self.add_message("assistant", "")
+        # Vor den abschließenden Leerzeilen; "right": die Marke wandert hinter jeden eingefügten Chunk
+        self.chat_text.mark_set(mark, "end-3c")
+        self.chat_text.mark_gravity(mark, "right")
+        
+    def _update_streaming_response(self, chunk, mark):
+        """Streaming-Chunk in Echtzeit an die AI-Nachricht des Streams anhängen"""
         self.chat_text.config(state=tk.NORMAL)
         
-        # Text-Widget Inhalt analysieren
-        full_text = self.chat_text.get("1.0", tk.END)
-        
-        # Prüfen ob bereits eine AI-Antwort gestartet wurde
-        if "🤖 Kimi [" in full_text and full_text.count("🤖 Kimi [") > 0:
-            # Letzte AI-Nachricht finden und ersetzen
-            lines = full_text.split('\n')
-            last_ai_index = -1
-            for i in range(len(lines) - 1, -1, -1):
-                if lines[i].startswith("🤖 Kimi ["):
-                    last_ai_index = i
-                    break
-            
-            if last_ai_index >= 0:
-                # Alles nach der letzten AI-Nachricht löschen
-                line_count = last_ai_index + 2  # Header + eine Zeile
-                self.chat_text.delete(f"{line_count}.0", tk.END)
-                self.chat_text.insert(tk.END, f"{content}\n\n")
-        else:
-            # Erste AI-Antwort - neue hinzufügen
-            timestamp = datetime.now().strftime("%H:%M")
-            self.chat_text.insert(tk.END, f"🤖 Kimi [{timestamp}]:\n", "assistant")
-            self.chat_text.insert(tk.END, f"{content}\n\n")
+        # An der Marke des Placeholders einfügen - nicht relativ zum Ende des Chats
+        self.chat_text.insert(mark, chunk)
         
         self.chat_text.config(state=tk.DISABLED)
         self.chat_text.see(tk.END)
@@ -516,6 +561,7 @@ class ModernKimiGUI:
             self.add_message("error", "❌ Speech-to-Text nicht verfügbar!\n💡 Installieren Sie: pip3 install speechrecognition pyaudio\n")
             return
             
+        self._ensure_stt()
         if not self.recognizer or not self.microphone:
             self.add_message("error", "❌ Mikrofon nicht verfügbar\n")
             return
@@ -591,6 +637,7 @@ class ModernKimiGUI:
         self.tts_enabled = not self.tts_enabled
         
         if self.tts_enabled:
+            self._ensure_tts()
             self.tts_btn.configure(text="🔇 Stumm", bg=self.colors['error'])
             self.update_status("TTS aktiviert")
         else:
@@ -628,28 +675,73 @@ class ModernKimiGUI:
                 self.tts_queue.task_done()
 
     def upload_file(self):
-        """Allow user to select a file and store its content"""
+        """Datei auswählen und über die Files API hochladen (gleicher Inhalt nur einmal)"""
         filepath = filedialog.askopenfilename(title="Datei auswählen")
         if not filepath:
             return
+        self.update_status(f"Lade {os.path.basename(filepath)} hoch...")
+        threading.Thread(target=self._upload_file_thread, args=(filepath,), daemon=True).start()
+        
+    def _upload_file_thread(self, filepath):
+        """Upload in separatem Thread - die UI bleibt bedienbar"""
+        name = os.path.basename(filepath)
         try:
-            with open(filepath, 'rb') as f:
-                data = f.read()
-            try:
-                text = data.decode('utf-8')
-            except Exception:
-                text = ''
-            self.uploaded_files.append({
-                "name": os.path.basename(filepath),
-                "content": text,
-            })
-            self.add_message("system", f"📁 Datei hochgeladen: {os.path.basename(filepath)} ({len(data)} Bytes)\n")
+            if not self.client:
+                raise RuntimeError("Kein Kimi-Client verfügbar")
+            message, info = self.client.upload_file(filepath, with_info=True)
+            if info["reused"]:
+                note = "bereits hochgeladen, wiederverwendet"
+            else:
+                note = f"{len(message['content'])} Zeichen extrahiert"
         except Exception as e:
-            messagebox.showerror("Upload-Fehler", f"Datei konnte nicht hochgeladen werden: {e}")
+            # Files API nicht erreichbar: Textdatei lokal einlesen
+            try:
+                with open(filepath, 'rb') as f:
+                    data = f.read()
+                message = file_message(name, data.decode('utf-8'))
+                note = f"lokal eingelesen, Files API nicht verfügbar: {e}"
+            except Exception as local_error:
+                self.root.after(0, messagebox.showerror, "Upload-Fehler",
+                                f"Datei konnte nicht hochgeladen werden: {local_error}")
+                return
+        if self.client and estimate_tokens(message["content"]) > chunk_budget(context_window_for(self.client.model),
+                                                                        self.client.max_tokens):
+            # Größer als das Kontextfenster erlaubt: in Abschnitten zusammenfassen (Map-Reduce)
+            try:
+                message, note = self._summarize_file(name, message["content"]), f"{note}, zusammengefasst"
+            except Exception as e:
+                self.root.after(0, self.add_message, "error", f"❌ Zusammenfassung fehlgeschlagen: {e}\n")
+                self.root.after(0, self.update_status, "Bereit")
+                return
+        # Liste nur im Tk-Thread ändern - send_message tauscht sie dort aus
+        self.root.after(0, self._add_uploaded_file, message)
+        self.root.after(0, self.add_message, "system", f"📁 Datei hochgeladen: {name} ({note})\n")
+        self.root.after(0, self.update_status, "Bereit")
+        
+    def _add_uploaded_file(self, message):
+        """Hochgeladene Datei für die nächste Nachricht vormerken (Tk-Thread)"""
+        self.uploaded_files.append(message)
+        
+    def _summarize_file(self, name, content):
+        """Große Datei per Map-Reduce zusammenfassen - Fortschritt in der Statusleiste"""
+        kind = "code" if os.path.splitext(name)[1] in (".py", ".js", ".ts", ".java", ".cs", ".go", ".rs", ".cpp", ".c") else "text"
+        
+        def _progress(event):
+            if event["stage"] == "map":
+                self.root.after(0, self.update_status, f"Analysiere {name}: Abschnitt {event['done']}/{event['total']}")
+            elif event["stage"] == "reduce":
+                self.root.after(0, self.update_status, f"Fasse {name} zusammen (Ebene {event['level']})")
+        
+        summary = self.client.map_reduce(
+            content, "Fasse den Inhalt ausführlich zusammen. Behalte Zahlen, Namen, Definitionen und Struktur bei, "
+                     "damit später Fragen dazu beantwortet werden können.",
+            kind=kind, name=name, on_progress=_progress)
+        return file_message(f"{name} (Zusammenfassung aus {summary['chunks']} Abschnitten)", summary["result"])
                 
     def clear_chat(self):
         """Chat leeren"""
         if messagebox.askyesno("Chat leeren", "Möchten Sie den Chat-Verlauf wirklich löschen?"):
+            self.stop_response()
             self.chat_text.config(state=tk.NORMAL)
             self.chat_text.delete("1.0", tk.END)
             self.chat_text.config(state=tk.DISABLED)
@@ -712,6 +804,7 @@ class ModernKimiGUI:
 def main():
     """Hauptfunktion"""
     print("🚀 Starte Moderne Kimi K2 GUI...")
+    load_env()
     
     # API-Key prüfen
     api_key = os.getenv("MOONSHOT_API_KEY", "")
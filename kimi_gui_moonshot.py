@@ -13,25 +13,19 @@ import json
 import os
 from datetime import datetime
 from kimi_client_moonshot import KimiMoonshotClient
-from dotenv import load_dotenv
+from kimi_stream import TRUNCATED_MARKER
+from kimi_lazy import lazy_import, load_env, module_available
 
-# TTS/STT Imports
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
+# TTS/STT Imports (Verfügbarkeit prüfen, Import erst bei der ersten Verwendung)
+pyttsx3 = lazy_import("pyttsx3")
+TTS_AVAILABLE = module_available("pyttsx3")
 
-try:
-    import speech_recognition as sr
-    STT_AVAILABLE = True
-except ImportError:
-    STT_AVAILABLE = False
-
-load_dotenv()
+sr = lazy_import("speech_recognition")
+STT_AVAILABLE = module_available("speech_recognition")
 
 class ModernKimiMoonshotGUI:
     def __init__(self):
+        load_env()
         self.root = tk.Tk()
         self.root.title("🌙 Kimi K2 Instruct - Moonshot AI")
         self.root.geometry("1400x900")
@@ -51,6 +45,7 @@ class ModernKimiMoonshotGUI:
         
         # Variablen
         self.current_conversation = []
+        self.active_stream = None
         self.tts_enabled = False
         self.is_recording = False
         
@@ -140,6 +135,7 @@ class ModernKimiMoonshotGUI:
         # Tastenkürzel - Enter soll senden!
         self.input_text.bind('<Return>', lambda e: self.send_message() or "break")
         self.input_text.bind('<Shift-Return>', lambda e: None)  # Neue Zeile mit Shift
+        self.root.bind('<Escape>', lambda e: self.stop_response())
         
         # Button-Bereich
         button_frame = tk.Frame(input_frame, bg=self.colors['bg_secondary'])
@@ -158,6 +154,19 @@ class ModernKimiMoonshotGUI:
                            cursor='hand2')
         send_btn.pack(side=tk.LEFT, padx=(0, 10))
         
+        # Stopp-Button (bricht die laufende Antwort ab)
+        stop_btn = tk.Button(button_frame,
+                           text="⏹️ Stopp (Esc)",
+                           command=self.stop_response,
+                           bg=self.colors['error'],
+                           fg='white',
+                           font=('Segoe UI', 12),
+                           relief=tk.FLAT,
+                           padx=20,
+                           pady=10,
+                           cursor='hand2')
+        stop_btn.pack(side=tk.LEFT, padx=5)
+        
         # TTS-Button (immer sichtbar)
         self.tts_btn = tk.Button(button_frame,
                                text="🔊 Sprechen" if TTS_AVAILABLE else "🔊 TTS (nicht verfügbar)",
@@ -226,7 +235,7 @@ class ModernKimiMoonshotGUI:
         self.model_var = tk.StringVar(value="kimi-k2-instruct")
         model_combo = ttk.Combobox(model_frame,
                                   textvariable=self.model_var,
-                                  values=["kimi-k2-instruct", "kimi-k2-base", "moonshot-v1-128k"],
+                                  values=["kimi-k2-instruct", "kimi-k2-base", "moonshot-v1-128k", "auto"],
                                   state="readonly",
                                   font=('Segoe UI', 11))
         model_combo.pack(fill=tk.X, pady=5)
@@ -286,7 +295,7 @@ class ModernKimiMoonshotGUI:
     def setup_client(self):
         """Moonshot AI Kimi-Client initialisieren"""
         try:
-            self.client = KimiMoonshotClient()
+            self.client = KimiMoonshotClient(prewarm=True)
             self.update_status("✅ Moonshot AI Client initialisiert")
             self.api_status.configure(text="API: Moonshot AI verbunden", fg=self.colors['success'])
         except Exception as e:
@@ -295,7 +304,15 @@ class ModernKimiMoonshotGUI:
             self.api_status.configure(text="API: Fehler", fg=self.colors['error'])
             
     def setup_tts_stt(self):
-        """TTS und STT initialisieren"""
+        """TTS und STT vorbereiten - Engines werden erst bei der ersten Verwendung geladen"""
+        self._tts_initialized = False
+        self._stt_initialized = False
+        
+    def _ensure_tts(self):
+        """TTS-Engine initialisieren (pyttsx3 wird erst hier importiert)"""
+        if self._tts_initialized:
+            return
+        self._tts_initialized = True
         if TTS_AVAILABLE:
             try:
                 self.tts_engine = pyttsx3.init()
@@ -314,6 +331,11 @@ class ModernKimiMoonshotGUI:
                 print(f"TTS Fehler: {e}")
                 self.tts_engine = None
         
+    def _ensure_stt(self):
+        """Mikrofon und Spracherkennung initialisieren (speech_recognition wird erst hier importiert)"""
+        if self._stt_initialized:
+            return
+        self._stt_initialized = True
         if STT_AVAILABLE:
             try:
                 self.recognizer = sr.Recognizer()
@@ -370,25 +392,37 @@ class ModernKimiMoonshotGUI:
         
     def _send_message_thread(self, user_input):
         """Nachricht in separatem Thread senden"""
+        # Wird der Chat währenddessen gelöscht, landet die Antwort nicht im neuen Verlauf
+        conversation = self.current_conversation
         try:
             # Client konfigurieren
             self.client.model = self.model_var.get()
             self.client.temperature = self.temp_var.get()
             
-            # Stream-Response verarbeiten
-            response_content = ""
+            # Placeholder für Response - Chunks landen an dessen Marke, auch wenn danach
+            # weitere Nachrichten (Status, Fehler, Datei-Uploads) angehängt werden
+            mark = f"stream-{threading.get_ident()}"
+            self.root.after(0, self._add_streaming_placeholder, mark)
             
-            # Placeholder für Response
-            self.root.after(0, lambda: self.add_message("assistant", ""))
-            
-            for chunk in self.client.chat_stream(self.current_conversation):
+            # Stream-Response verarbeiten (abbrechbar über stop_response)
+            stream = self.client.chat_stream(conversation)
+            self.active_stream = stream
+            # Gebündelt: ein root.after() pro ~30 ms statt pro Token
+            for chunk in stream.coalesce():
                 if chunk:
-                    response_content += chunk
                     # UI in Main-Thread aktualisieren
-                    self.root.after(0, self._update_streaming_response, response_content)
+                    self.root.after(0, self._update_streaming_response, chunk, mark)
+            response_content = stream.text
+            
+            if stream.truncated:
+                # Teilantwort als abgebrochen markiert behalten
+                if response_content:
+                    conversation.append({"role": "assistant", "content": response_content + TRUNCATED_MARKER})
+                self.root.after(0, self.update_status, "⏹️ Abgebrochen")
+                return
             
             # Vollständige Antwort zum Verlauf hinzufügen
-            self.current_conversation.append({"role": "assistant", "content": response_content})
+            conversation.append({"role": "assistant", "content": response_content})
             
             # TTS abspielen (falls aktiviert)
             if self.tts_enabled and self.tts_engine and response_content:
@@ -399,27 +433,30 @@ class ModernKimiMoonshotGUI:
         except Exception as e:
             self.root.after(0, lambda: self.add_message("error", f"❌ Fehler: {str(e)}\n"))
             self.root.after(0, self.update_status, "❌ Fehler")
+        finally:
+            self.active_stream = None
+            self.root.after(0, self.chat_text.mark_unset, mark)
     
-    def _update_streaming_response(self, content):
-        """Streaming-Response im Chat aktualisieren"""
+    def stop_response(self):
+        """Laufende Antwort abbrechen - schließt die Verbindung, es werden keine Tokens mehr erzeugt"""
+        stream = self.active_stream
+        if stream is not None:
+            stream.cancel()
+            self.update_status("⏹️ Abgebrochen")
+    
+    def _add_streaming_placeholder(self, mark):
+        """Leere Kimi-Nachricht anlegen und die Einfügeposition als Marke merken"""
+        self.add_message("assistant", "")
+        # Vor den abschließenden Leerzeilen; "right": die Marke wandert hinter jeden eingefügten Chunk
+        self.chat_text.mark_set(mark, "end-3c")
+        self.chat_text.mark_gravity(mark, "right")
+    
+    def _update_streaming_response(self, chunk, mark):
+        """Streaming-Chunk an die Kimi-Nachricht des Streams anhängen"""
         self.chat_text.config(state=tk.NORMAL)
         
-        # Letzte assistant-Nachricht finden und aktualisieren
-        text_content = self.chat_text.get("1.0", tk.END)
-        lines = text_content.split('\n')
-        
-        # Finde die letzte Kimi-Nachricht und ersetze sie
-        for i in range(len(lines)-1, -1, -1):
-            if lines[i].startswith("🌙 Kimi ["):
-                # Alles nach dieser Zeile löschen
-                line_start = text_content.find(lines[i])
-                char_pos = f"1.0+{line_start}c"
-                self.chat_text.delete(char_pos, tk.END)
-                
-                # Neue Antwort einfügen
-                timestamp = datetime.now().strftime("%H:%M")
-                self.chat_text.insert(tk.END, f"🌙 Kimi [{timestamp}]:\n{content}\n\n")
-                break
+        # An der Marke des Placeholders einfügen - nicht relativ zum Ende des Chats
+        self.chat_text.insert(mark, chunk)
         
         self.chat_text.config(state=tk.DISABLED)
         self.chat_text.see(tk.END)
@@ -433,6 +470,7 @@ class ModernKimiMoonshotGUI:
         self.tts_enabled = not self.tts_enabled
         
         if self.tts_enabled:
+            self._ensure_tts()
             self.tts_btn.configure(text="🔇 Stumm", bg=self.colors['error'])
             self.update_status("🔊 TTS aktiviert")
         else:
@@ -445,6 +483,7 @@ class ModernKimiMoonshotGUI:
             self.add_message("error", "❌ Speech-to-Text nicht verfügbar!\n💡 Installieren Sie: pip3 install speechrecognition pyaudio\n")
             return
             
+        self._ensure_stt()
         if not self.recognizer or not self.microphone:
             self.add_message("error", "❌ Mikrofon nicht verfügbar\n")
             return
@@ -505,6 +544,7 @@ class ModernKimiMoonshotGUI:
     
     def clear_chat(self):
         """Chat löschen"""
+        self.stop_response()
         self.chat_text.config(state=tk.NORMAL)
         self.chat_text.delete("1.0", tk.END)
         self.chat_text.config(state=tk.DISABLED)
@@ -529,6 +569,7 @@ def main():
     """Hauptfunktion"""
     
     # API-Key-Check
+    load_env()
     api_key = os.getenv("MOONSHOT_API_KEY", "")
     if not api_key or api_key == "sk-demo_key_please_replace":
         print("⚠️  Demo-API-Key erkannt. Bitte konfigurieren Sie einen echten API-Key in der .env-Datei:")
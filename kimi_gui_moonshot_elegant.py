@@ -13,25 +13,19 @@ import json
 import os
 from datetime import datetime
 from kimi_client_moonshot import KimiMoonshotClient
-from dotenv import load_dotenv
+from kimi_stream import TRUNCATED_MARKER
+from kimi_lazy import lazy_import, load_env, module_available
 
-# TTS/STT Imports
-try:
-    import pyttsx3
-    TTS_AVAILABLE = True
-except ImportError:
-    TTS_AVAILABLE = False
+# TTS/STT Imports (Verfügbarkeit prüfen, Import erst bei der ersten Verwendung)
+pyttsx3 = lazy_import("pyttsx3")
+TTS_AVAILABLE = module_available("pyttsx3")
 
-try:
-    import speech_recognition as sr
-    STT_AVAILABLE = True
-except ImportError:
-    STT_AVAILABLE = False
-
-load_dotenv()
+sr = lazy_import("speech_recognition")
+STT_AVAILABLE = module_available("speech_recognition")
 
 class ElegantKimiMoonshotGUI:
     def __init__(self):
+        load_env()
         self.root = tk.Tk()
         self.root.title("🌙 Kimi K2 Instruct - Moonshot AI")
         self.root.geometry("1600x1000")
@@ -81,6 +75,7 @@ class ElegantKimiMoonshotGUI:
         
         # Variablen
         self.current_conversation = []
+        self.active_stream = None
         self.tts_enabled = False
         self.is_recording = False
         
@@ -270,7 +265,7 @@ class ElegantKimiMoonshotGUI:
         
         self.model_var = tk.StringVar(value="moonshot-v1-128k")
         model_combo = ttk.Combobox(content, textvariable=self.model_var,
-                                  values=["moonshot-v1-128k", "moonshot-v1-32k", "moonshot-v1-8k"],
+                                  values=["moonshot-v1-128k", "moonshot-v1-32k", "moonshot-v1-8k", "auto"],
                                   state="readonly", style='Dark.TCombobox',
                                   font=self.fonts['body'])
         model_combo.pack(fill=tk.X, pady=(0, 12))
@@ -479,6 +474,13 @@ class ElegantKimiMoonshotGUI:
         )
         send_btn.pack(side=tk.RIGHT)
         
+        # Stop Button (bricht die laufende Antwort ab)
+        stop_btn = self.create_modern_button(
+            button_area, "⏹️ Stop", self.stop_response, style='secondary'
+        )
+        stop_btn.pack(side=tk.RIGHT, padx=(0, 8))
+        self.root.bind('<Escape>', lambda e: self.stop_response())
+        
         # Input Info
         info_label = tk.Label(button_area, 
                              text="Press Enter to send • Shift+Enter for new line",
@@ -568,7 +570,7 @@ Start chatting to experience the power of Kimi K2!"""
     def setup_client(self):
         """Moonshot AI Client initialisieren"""
         try:
-            self.client = KimiMoonshotClient()
+            self.client = KimiMoonshotClient(prewarm=True)
             self.update_api_status("✅ Connected", self.colors['success'])
             self.model_info_label.configure(text=f"Model: {self.client.model}")
             self.status_badge.configure(text="● Ready", fg=self.colors['success'])
@@ -577,7 +579,15 @@ Start chatting to experience the power of Kimi K2!"""
             self.add_chat_message("system", f"❌ Setup Required: {str(e)}\n\n💡 Please configure MOONSHOT_API_KEY in .env file\nRegistration: https://platform.moonshot.ai")
             
     def setup_tts_stt(self):
-        """TTS und STT initialisieren"""
+        """TTS und STT vorbereiten - Engines werden erst bei der ersten Verwendung geladen"""
+        self._tts_initialized = False
+        self._stt_initialized = False
+        
+    def _ensure_tts(self):
+        """TTS-Engine initialisieren (pyttsx3 wird erst hier importiert)"""
+        if self._tts_initialized:
+            return
+        self._tts_initialized = True
         if TTS_AVAILABLE:
             try:
                 self.tts_engine = pyttsx3.init()
@@ -591,7 +601,12 @@ Start chatting to experience the power of Kimi K2!"""
                 self.tts_engine.setProperty('volume', 0.8)
             except Exception as e:
                 print(f"TTS Error: {e}")
-                
+        
+    def _ensure_stt(self):
+        """Mikrofon und Spracherkennung initialisieren (speech_recognition wird erst hier importiert)"""
+        if self._stt_initialized:
+            return
+        self._stt_initialized = True
         if STT_AVAILABLE:
             try:
                 self.recognizer = sr.Recognizer()
@@ -625,18 +640,23 @@ Start chatting to experience the power of Kimi K2!"""
         
     def _send_message_thread(self, user_input):
         """Nachricht in separatem Thread senden"""
+        # Wird der Chat währenddessen gelöscht, landet die Antwort nicht im neuen Verlauf
+        conversation = self.current_conversation
         try:
             self.client.model = self.model_var.get()
             self.client.temperature = self.temp_var.get()
             
-            response_content = ""
+            stream = self.active_stream = self.client.chat_stream(conversation)
+            response_content = stream.consume().text
             
-            for chunk in self.client.chat_stream(self.current_conversation):
-                if chunk:
-                    response_content += chunk
+            if stream.truncated:
+                if response_content:
+                    conversation.append({"role": "assistant", "content": response_content + TRUNCATED_MARKER})
+                self.root.after(0, lambda: self.update_status("● Stopped"))
+                return
                     
             self.root.after(0, lambda: self.add_chat_message("assistant", response_content))
-            self.current_conversation.append({"role": "assistant", "content": response_content})
+            conversation.append({"role": "assistant", "content": response_content})
             
             if self.tts_enabled and self.tts_engine and response_content:
                 threading.Thread(target=self._speak_text, args=(response_content,), daemon=True).start()
@@ -646,6 +666,15 @@ Start chatting to experience the power of Kimi K2!"""
         except Exception as e:
             self.root.after(0, lambda: self.add_chat_message("error", f"❌ Error: {str(e)}"))
             self.root.after(0, lambda: self.update_status("● Error"))
+        finally:
+            self.active_stream = None
+    
+    def stop_response(self):
+        """Laufende Antwort abbrechen - schließt die Verbindung, es werden keine Tokens mehr erzeugt"""
+        stream = self.active_stream
+        if stream is not None:
+            stream.cancel()
+            self.update_status("● Stopped")
     
     def add_chat_message(self, role, content):
         """Nachricht zum Chat hinzufügen"""
@@ -682,6 +711,8 @@ Start chatting to experience the power of Kimi K2!"""
             return
             
         self.tts_enabled = not self.tts_enabled
+        if self.tts_enabled:
+            self._ensure_tts()
         status = "ON" if self.tts_enabled else "OFF"
         self.tts_btn.configure(text=f"🔊 TTS ({status})")
         
@@ -691,6 +722,7 @@ Start chatting to experience the power of Kimi K2!"""
             self.add_chat_message("error", "❌ Speech-to-Text not available! Install: pip3 install speechrecognition pyaudio")
             return
             
+        self._ensure_stt()
         if not self.is_recording:
             self.start_recording()
         else:
@@ -733,6 +765,7 @@ Start chatting to experience the power of Kimi K2!"""
             
     def clear_chat(self):
         """Chat löschen"""
+        self.stop_response()
         self.chat_text.config(state=tk.NORMAL)
         self.chat_text.delete("1.0", tk.END)
         self.chat_text.config(state=tk.DISABLED)
@@ -759,6 +792,7 @@ def main():
     """Hauptfunktion"""
     
     # API-Key Check
+    load_env()
     api_key = os.getenv("MOONSHOT_API_KEY", "")
     if not api_key or api_key == "sk-demo_key_please_replace":
         print("⚠️  Demo-API-Key detected. Please configure real API key in .env file:")
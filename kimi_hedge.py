@@ -0,0 +1,258 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Hedged Requests
+Kommt der erste Token zu spät, wird ein Duplikat gesendet - der schnellere Stream gewinnt
+"""
+
+import queue
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from kimi_context import estimate_request_tokens, select_model_tier
+from kimi_stream import abort_response
+
+# Öffnet einen Upstream-Stream (SDK-Chunks) für das angegebene Modell
+StreamOpener = Callable[[str], Iterator[Any]]
+
+
+def _has_token(chunk: Any) -> bool:
+    """Enthält der Chunk Inhalt (Text, Tool-Call oder Abschluss)?"""
+    choices = getattr(chunk, "choices", None) or []
+    if not choices:
+        return False
+    delta = getattr(choices[0], "delta", None)
+    return bool(getattr(delta, "content", None) or getattr(delta, "tool_calls", None)
+                or getattr(choices[0], "finish_reason", None))
+
+
+class HedgePolicy:
+    """
+    Hedging-Konfiguration mit gleitendem TTFT-Fenster und Statistik
+
+    Die Wartezeit bis zum Duplikat ist das ``percentile``-Perzentil der zuletzt
+    gemessenen Time-to-First-Token-Werte (begrenzt auf min_delay..max_delay).
+    Solange weniger als ``min_samples`` Messwerte vorliegen, gilt initial_delay.
+    Eine Instanz kann von mehreren Clients geteilt werden.
+    """
+
+    def __init__(self, percentile: float = 95.0, initial_delay: float = 2.0, min_delay: float = 0.05,
+                 max_delay: float = 10.0, window: int = 200, min_samples: int = 20,
+                 hedge_model: Optional[str] = None):
+        """
+        Args:
+            percentile: Perzentil der TTFT-Verteilung, ab dem gehedged wird
+            initial_delay: Wartezeit (Sekunden), solange zu wenige Messwerte vorliegen
+            min_delay: Untergrenze der Wartezeit
+            max_delay: Obergrenze der Wartezeit
+            window: Anzahl der berücksichtigten TTFT-Messwerte
+            min_samples: Mindestanzahl Messwerte für die Perzentil-Berechnung
+            hedge_model: Modell für das Duplikat (None = gleiches Modell,
+                "auto" = kleinstes passendes Moonshot-Tier)
+        """
+        self.percentile = percentile
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.max_delay = max_delay
+        self.min_samples = min_samples
+        self.hedge_model = hedge_model
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "hedged": 0, "primary_wins": 0, "hedge_wins": 0,
+                       "losers_closed": 0, "failures": 0}
+
+    def observe(self, ttft: float):
+        """Gemessene Time-to-First-Token aufnehmen"""
+        with self._lock:
+            self._samples.append(ttft)
+
+    @property
+    def delay(self) -> float:
+        """Aktuelle Wartezeit bis zum Duplikat in Sekunden"""
+        with self._lock:
+            samples = sorted(self._samples)
+        if len(samples) < self.min_samples:
+            return self.initial_delay
+        rank = (len(samples) - 1) * self.percentile / 100.0
+        low = int(rank)
+        high = min(low + 1, len(samples) - 1)
+        value = samples[low] + (samples[high] - samples[low]) * (rank - low)
+        return min(self.max_delay, max(self.min_delay, value))
+
+    def model_for(self, model: str, messages: List[Dict[str, Any]], max_tokens: int) -> str:
+        """Modell für das Duplikat bestimmen"""
+        if self.hedge_model is None:
+            return model
+        if self.hedge_model == "auto":
+            return select_model_tier(estimate_request_tokens(messages), max_tokens)
+        return self.hedge_model
+
+    def _count(self, name: str):
+        with self._lock:
+            self._stats[name] += 1
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Hedge-Rate, Gewinner-Verteilung und aktuelle Wartezeit"""
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            samples = len(self._samples)
+        stats["hedge_rate"] = round(stats["hedged"] / stats["requests"], 4) if stats["requests"] else 0.0
+        stats["hedge_win_rate"] = round(stats["hedge_wins"] / stats["hedged"], 4) if stats["hedged"] else 0.0
+        stats["current_delay"] = round(self.delay, 4)
+        stats["samples"] = samples
+        return stats
+
+    def stream(self, open_stream: StreamOpener, model: str, hedge_model: Optional[str] = None) -> Iterable[Any]:
+        """
+        Upstream-Stream mit Hedging öffnen
+
+        Args:
+            open_stream: Öffnet einen SDK-Stream für ein Modell
+            model: Modell der ersten Anfrage
+            hedge_model: Modell des Duplikats (Standard: model)
+
+        Returns:
+            Iterable der SDK-Chunks des Gewinner-Streams (mit close())
+        """
+        return _HedgedStream(self, open_stream, model, hedge_model or model)
+
+
+class _Attempt:
+    """Ein Upstream-Stream, der in einem eigenen Thread gelesen wird"""
+
+    def __init__(self, name: str, open_stream: StreamOpener, model: str, events: "queue.Queue"):
+        self.name = name
+        self.items: "queue.Queue" = queue.Queue()
+        self.started = time.perf_counter()
+        self.ttft: Optional[float] = None
+        self._open = open_stream
+        self._model = model
+        self._events = events
+        self._stream: Any = None
+        self._closed = threading.Event()
+        self._lock = threading.Lock()
+        threading.Thread(target=self._run, name=f"kimi-hedge-{name}", daemon=True).start()
+
+    def _run(self):
+        try:
+            stream = self._open(self._model)
+            with self._lock:
+                self._stream = stream
+            if self._closed.is_set():
+                self._close_stream()
+                return
+            for chunk in stream:
+                if self._closed.is_set():
+                    break
+                if self.ttft is None and _has_token(chunk):
+                    self.ttft = time.perf_counter() - self.started
+                    self._events.put((self, "token"))
+                self.items.put(("chunk", chunk))
+            if self.ttft is None:
+                self._events.put((self, "token"))
+        except Exception as e:
+            if not self._closed.is_set():
+                self.items.put(("error", e))
+                self._events.put((self, "error"))
+        finally:
+            self.items.put(("done", None))
+
+    def _close_stream(self):
+        with self._lock:
+            stream, self._stream = self._stream, None
+        if stream is not None:
+            abort_response(stream)
+
+    def close(self):
+        """HTTP-Response sofort schließen (auch wenn der Stream erst noch geöffnet wird)"""
+        self._closed.set()
+        self._close_stream()
+
+    def chunks(self) -> Iterator[Any]:
+        while True:
+            kind, value = self.items.get()
+            if kind == "chunk":
+                yield value
+            elif kind == "error":
+                raise value
+            else:
+                return
+
+
+class _HedgedStream:
+    """Iterierbarer Upstream mit threadsicherem close() (für Single-Flight und Abbruch)"""
+
+    def __init__(self, policy: HedgePolicy, open_stream: StreamOpener, model: str, hedge_model: str):
+        self._policy = policy
+        self._open = open_stream
+        self._model = model
+        self._hedge_model = hedge_model
+        self._events: "queue.Queue" = queue.Queue()
+        self._attempts: List[_Attempt] = []
+        self._lock = threading.Lock()
+        self._closed = False
+
+    def _start(self, name: str, model: str) -> bool:
+        with self._lock:
+            if self._closed:
+                return False
+            self._attempts.append(_Attempt(name, self._open, model, self._events))
+            return True
+
+    def close(self):
+        """Alle offenen Streams sofort schließen"""
+        with self._lock:
+            self._closed = True
+            attempts = list(self._attempts)
+        for attempt in attempts:
+            attempt.close()
+        self._events.put((None, "closed"))
+
+    def __iter__(self) -> Iterator[Any]:
+        policy = self._policy
+        policy._count("requests")
+        self._start("primary", self._model)
+        winner: Optional[_Attempt] = None
+        try:
+            failed = 0
+            deadline = time.perf_counter() + policy.delay
+            while winner is None:
+                timeout = None
+                if len(self._attempts) == 1:
+                    timeout = max(0.0, deadline - time.perf_counter())
+                try:
+                    attempt, kind = self._events.get(timeout=timeout)
+                except queue.Empty:
+                    # Kein Token innerhalb der Wartezeit: Duplikat senden
+                    if self._start("hedge", self._hedge_model):
+                        policy._count("hedged")
+                    continue
+                if kind == "closed" or attempt is None:
+                    return
+                if kind == "token":
+                    winner = attempt
+                    continue
+                failed += 1
+                # Fehler nach ausgeschöpften Retries: nur weiterreichen, wenn kein anderer Stream mehr läuft
+                if len(self._attempts) == 1 or failed == len(self._attempts):
+                    policy._count("failures")
+                    yield from attempt.chunks()
+                    return
+
+            for attempt in self._attempts:
+                if attempt is not winner:
+                    attempt.close()
+                    policy._count("losers_closed")
+            policy._count("primary_wins" if winner.name == "primary" else "hedge_wins")
+            if winner.ttft is not None:
+                # TTFT der Anfrage ab Start des Primärversuchs: gewinnt das Duplikat, zählt die
+                # schon verstrichene Wartezeit mit (Untergrenze für den abgebrochenen Primärversuch)
+                policy.observe(winner.started + winner.ttft - self._attempts[0].started)
+            yield from winner.chunks()
+        finally:
+            # Abbruch durch den Aufrufer oder Ende: alle offenen Streams schließen
+            for attempt in self._attempts:
+                attempt.close()
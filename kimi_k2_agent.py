@@ -7,9 +7,25 @@ from execution_toolkit import execute_shell_command, read_file, write_file, dele
 class KimiK2Agent:
     """Autonomous agent with direct execution capabilities."""
 
-    def __init__(self, api_key: Optional[str] = None):
+    def __init__(self, api_key: Optional[str] = None, response_timeout: Optional[float] = None):
         self.client = KimiClient(api_key=api_key)
         self.stop_requested = False
+        self.response_timeout = response_timeout
+        self.active_stream = None
+
+    def ask(self, prompt: str, timeout: Optional[float] = None) -> str:
+        """Ask Kimi; the stream is aborted on stop() or after the timeout (seconds)."""
+        stream = self.client.conversation_stream(prompt)
+        self.active_stream = stream
+        timeout = timeout if timeout is not None else self.response_timeout
+        if timeout:
+            stream.cancel_after(timeout)
+        if self.stop_requested:
+            stream.cancel()
+        try:
+            return stream.consume().text
+        finally:
+            self.active_stream = None
 
     def run_command(self, command: str) -> str:
         result = execute_shell_command(command)
@@ -23,6 +39,8 @@ class KimiK2Agent:
 
     def stop(self):
         self.stop_requested = True
+        if self.active_stream is not None:
+            self.active_stream.cancel()
 
     def run_plan(self, plan: str):
         """Simple loop executing shell commands from a plan string."""
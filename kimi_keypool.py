@@ -0,0 +1,298 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 API-Key-Pool
+Verteilt Anfragen auf mehrere API-Keys - jeder Key mit eigenem Rate-Limit und eigener Quarantäne
+"""
+
+import os
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional, Set
+
+from kimi_ratelimit import RateLimiter, retry_after
+
+# Ungültige oder gesperrte Keys (401/403) bleiben so lange außen vor
+DEFAULT_AUTH_QUARANTINE = 600.0
+
+# So viele 429 in Folge gelten als "Storm" und sperren den Key für quarantine Sekunden
+DEFAULT_STORM_THRESHOLD = 3
+
+_DURATION = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_reset(value: Optional[str]) -> Optional[float]:
+    """x-ratelimit-reset-* lesen ("20ms", "1s", "6m0s" oder Sekunden als Zahl)"""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    parts = _DURATION.findall(value)
+    if not parts:
+        return None
+    return sum(float(number) * _UNITS[unit] for number, unit in parts)
+
+
+class KeyPoolExhausted(Exception):
+    """
+    Kein Key ist gerade nutzbar
+
+    status_code 429 mit retry_after, wenn nur kurze 429-Sperren laufen (call_with_retry
+    wartet dann im Rahmen seines Backoffs), sonst None - in Quarantäne wird nicht gewartet.
+    """
+
+    def __init__(self, message: str, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+def mask_key(key: str) -> str:
+    """Key für Logs und Statistik kürzen (sk-...abcd)"""
+    return f"{key[:3]}...{key[-4:]}" if len(key) > 10 else "***"
+
+
+class _KeyState:
+    """Rate-Limit, Headroom und Zähler eines Keys"""
+
+    def __init__(self, key: str, limiter: RateLimiter):
+        self.key = key
+        self.label = mask_key(key)
+        self.limiter = limiter
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.quarantined = False
+        self.last_error: Optional[str] = None
+        self.consecutive_429 = 0
+        self.remaining_requests: Optional[int] = None
+        self.remaining_tokens: Optional[int] = None
+        self.headroom_reset = 0.0
+        self.stats = {"requests": 0, "successes": 0, "tokens": 0, "rate_limited": 0, "auth_errors": 0,
+                      "errors": 0, "quarantines": 0}
+
+
+class KeyPool:
+    """
+    Pool aus mehreren Moonshot API-Keys
+
+    - Jeder Key hat einen eigenen Token-Bucket (Requests/Tokens pro Minute),
+      der Gesamtdurchsatz wächst also mit der Anzahl der Keys
+    - Jede Anfrage geht an den Key mit dem meisten Headroom: keine Wartezeit
+      im Bucket, Rest laut x-ratelimit-Headern, wenigste laufende Anfragen
+    - 429 sperrt den Key bis Retry-After und die Anfrage geht sofort an den
+      nächsten Key; ab storm_threshold 429 in Folge kommt der Key in
+      Quarantäne, 401/403 (ungültiger Key) für auth_quarantine Sekunden
+    - Ist kein Key frei, wird nicht im Pool gewartet: KeyPoolExhausted geht
+      an den Aufrufer (bei kurzen 429-Sperren mit retry_after für das Backoff)
+    - ``get_stats`` liefert die Nutzung pro Key (Keys gekürzt)
+    """
+
+    def __init__(self, keys: List[str], requests_per_minute: Optional[float] = None,
+                 tokens_per_minute: Optional[float] = None, quarantine: float = 60.0,
+                 auth_quarantine: float = DEFAULT_AUTH_QUARANTINE, storm_threshold: int = DEFAULT_STORM_THRESHOLD):
+        """
+        Args:
+            keys: API-Keys (Duplikate werden entfernt)
+            requests_per_minute: Limit pro Key (Standard aus KIMI_RPM oder 200, 0 = aus)
+            tokens_per_minute: Limit pro Key (Standard aus KIMI_TPM, 0 = aus)
+            quarantine: Sperrzeit in Sekunden nach einem 429-Storm
+            auth_quarantine: Sperrzeit in Sekunden nach 401/403
+            storm_threshold: Anzahl 429 in Folge bis zur Quarantäne
+        """
+        keys = list(dict.fromkeys(key.strip() for key in keys if key and key.strip()))
+        if not keys:
+            raise ValueError("KeyPool benötigt mindestens einen API-Key")
+        if requests_per_minute is None:
+            requests_per_minute = float(os.getenv("KIMI_RPM", "200"))
+        if tokens_per_minute is None:
+            tokens_per_minute = float(os.getenv("KIMI_TPM", "0"))
+        self.quarantine = quarantine
+        self.auth_quarantine = auth_quarantine
+        self.storm_threshold = storm_threshold
+        self._lock = threading.Lock()
+        self._states: Dict[str, _KeyState] = {
+            key: _KeyState(key, RateLimiter(requests_per_minute, tokens_per_minute)) for key in keys
+        }
+
+    @classmethod
+    def from_env(cls) -> Optional["KeyPool"]:
+        """Pool aus MOONSHOT_API_KEYS (kommagetrennt), None wenn nicht gesetzt"""
+        value = os.getenv("MOONSHOT_API_KEYS", "")
+        keys = [key for key in value.replace(";", ",").split(",") if key.strip()]
+        return cls(keys) if keys else None
+
+    @property
+    def keys(self) -> List[str]:
+        return list(self._states)
+
+    def __len__(self) -> int:
+        return len(self._states)
+
+    def _available(self, now: float, exclude: Set[str]) -> List[_KeyState]:
+        return [state for key, state in self._states.items() if key not in exclude and state.blocked_until <= now]
+
+    def _score(self, state: _KeyState, tokens: int, now: float):
+        exhausted = state.headroom_reset > now and (state.remaining_requests == 0 or state.remaining_tokens == 0)
+        return (exhausted, state.limiter.peek(tokens), state.in_flight, state.stats["requests"])
+
+    def _exhausted(self, now: float, exclude: Set[str]) -> KeyPoolExhausted:
+        """Fehler, wenn alle Keys gesperrt sind (Aufruf mit gehaltenem Lock)"""
+        states = [state for key, state in self._states.items() if key not in exclude] or list(self._states.values())
+        blocked = [state for state in states if not state.quarantined]
+        if blocked:
+            wait = min(state.blocked_until for state in blocked) - now
+            return KeyPoolExhausted(f"Alle API-Keys rate-limitiert (frei in {wait:.1f}s)", 429, max(0.0, wait))
+        last = max(states, key=lambda state: state.blocked_until)
+        return KeyPoolExhausted(f"Alle API-Keys in Quarantäne - zuletzt: {last.last_error}")
+
+    def _choose(self, tokens: int, exclude: Set[str]) -> _KeyState:
+        """Freiesten Key wählen und die Anfrage bei ihm buchen"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._available(now, exclude)
+            if not candidates:
+                raise self._exhausted(now, exclude)
+            state = min(candidates, key=lambda state: self._score(state, tokens, now))
+            state.in_flight += 1
+            state.stats["requests"] += 1
+            state.stats["tokens"] += tokens
+            wait = state.limiter.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return state
+
+    def pick(self, tokens: int = 0) -> Optional[str]:
+        """Key, den call() gerade wählen würde (ohne Buchung, None = alle gesperrt)"""
+        with self._lock:
+            now = time.monotonic()
+            candidates = self._available(now, set())
+            if not candidates:
+                return None
+            return min(candidates, key=lambda state: self._score(state, tokens, now)).key
+
+    def call(self, func: Callable[[str], Any], tokens: int = 0, key: Optional[str] = None) -> Any:
+        """
+        func mit dem freiesten Key ausführen
+
+        Bei 429 oder 401/403 wird sofort mit dem nächsten freien Key wiederholt;
+        erst wenn kein Key mehr frei ist, geht der Fehler an den Aufrufer
+        (und damit an call_with_retry mit Backoff). Sind schon vor dem Aufruf
+        alle Keys gesperrt, kommt sofort KeyPoolExhausted.
+
+        Args:
+            func: Erhält den API-Key und sendet die Anfrage
+            tokens: Geschätzte Tokens der Anfrage (für Tokens/Minute)
+            key: Nur diesen Key verwenden (z.B. für eine Context-Cache-Referenz)
+        """
+        tried: Set[str] = set(self._states) - {key} if key is not None else set()
+        while True:
+            state = self._choose(tokens, tried)
+            try:
+                result = func(state.key)
+            except Exception as e:
+                status = getattr(e, "status_code", None)
+                self._failure(state, e, status, retry_after(e))
+                tried.add(state.key)
+                if status in (401, 403, 429) and self._available(time.monotonic(), tried):
+                    continue
+                raise
+            finally:
+                with self._lock:
+                    state.in_flight -= 1
+            self._success(state)
+            return result
+
+    def _success(self, state: _KeyState):
+        with self._lock:
+            state.stats["successes"] += 1
+            state.consecutive_429 = 0
+
+    def _failure(self, state: _KeyState, error: Exception, status: Optional[int], delay: Optional[float]):
+        now = time.monotonic()
+        with self._lock:
+            if status in (401, 403):
+                state.stats["auth_errors"] += 1
+                state.stats["quarantines"] += 1
+                state.blocked_until = now + self.auth_quarantine
+                state.quarantined = True
+                state.last_error = str(error)
+            elif status == 429:
+                state.stats["rate_limited"] += 1
+                state.consecutive_429 += 1
+                state.last_error = str(error)
+                if state.consecutive_429 >= self.storm_threshold:
+                    state.stats["quarantines"] += 1
+                    state.consecutive_429 = 0
+                    state.blocked_until = now + max(self.quarantine, delay or 0.0)
+                    state.quarantined = True
+                else:
+                    state.blocked_until = now + (delay if delay is not None else 1.0)
+                    state.quarantined = False
+            else:
+                state.stats["errors"] += 1
+
+    def observe(self, response: Any):
+        """
+        Rate-Limit-Header einer HTTP-Response dem Key zuordnen (httpx Event-Hook)
+
+        Der Key wird aus dem Authorization-Header der Anfrage gelesen, so kann
+        ein gemeinsamer HTTP-Client für alle Keys verwendet werden.
+        """
+        request = getattr(response, "request", None)
+        auth = request.headers.get("authorization", "") if request is not None else ""
+        state = self._states.get(auth[7:] if auth.lower().startswith("bearer ") else auth)
+        if state is None:
+            return
+        headers = response.headers
+        remaining_requests = headers.get("x-ratelimit-remaining-requests")
+        remaining_tokens = headers.get("x-ratelimit-remaining-tokens")
+        if remaining_requests is None and remaining_tokens is None:
+            return
+        reset = max(parse_reset(headers.get("x-ratelimit-reset-requests")) or 0.0,
+                    parse_reset(headers.get("x-ratelimit-reset-tokens")) or 0.0)
+        with self._lock:
+            try:
+                state.remaining_requests = int(remaining_requests) if remaining_requests is not None else None
+                state.remaining_tokens = int(remaining_tokens) if remaining_tokens is not None else None
+            except ValueError:
+                return
+            state.headroom_reset = time.monotonic() + (reset or 1.0)
+
+    def get_stats(self) -> Dict[str, Any]:
+        """Nutzung pro Key (gekürzt) und Anzahl aktiver Keys"""
+        now = time.monotonic()
+        with self._lock:
+            keys = {}
+            for state in self._states.values():
+                info: Dict[str, Any] = dict(state.stats)
+                info["in_flight"] = state.in_flight
+                info["quarantined"] = state.blocked_until > now
+                info["remaining_requests"] = state.remaining_requests
+                keys[state.label] = info
+            active = len(self._available(now, set()))
+        return {"keys": keys, "active_keys": active, "total_keys": len(self._states)}
+
+
+_shared_pool: Optional[KeyPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_key_pool() -> Optional[KeyPool]:
+    """Prozessweiten Pool abrufen (aus MOONSHOT_API_KEYS, None wenn nicht gesetzt)"""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            _shared_pool = KeyPool.from_env()
+        return _shared_pool
+
+
+def set_shared_key_pool(pool: Optional[KeyPool]):
+    """Prozessweiten Pool ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_pool
+    with _shared_lock:
+        _shared_pool = pool
@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Lazy Imports
+Schwere Abhängigkeiten erst bei der ersten Verwendung laden
+"""
+
+import importlib
+import importlib.util
+import threading
+from types import ModuleType
+from typing import Optional
+
+_env_lock = threading.Lock()
+_env_loaded = False
+
+
+class LazyModule:
+    """
+    Platzhalter für ein Modul, das erst beim ersten Attributzugriff importiert wird
+
+    Beispiel:
+        sr = LazyModule("speech_recognition")
+        ...
+        recognizer = sr.Recognizer()   # erst hier wird importiert
+    """
+
+    def __init__(self, name: str):
+        self._name = name
+        self._module: Optional[ModuleType] = None
+
+    def _load(self) -> ModuleType:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return self._module
+
+    @property
+    def loaded(self) -> bool:
+        """Wurde das Modul bereits importiert?"""
+        return self._module is not None
+
+    def __getattr__(self, attr: str):
+        return getattr(self._load(), attr)
+
+    def __repr__(self) -> str:
+        state = "geladen" if self._module is not None else "nicht geladen"
+        return f"<LazyModule {self._name} ({state})>"
+
+
+def lazy_import(name: str) -> LazyModule:
+    """Modul-Platzhalter erzeugen (Import beim ersten Attributzugriff)"""
+    return LazyModule(name)
+
+
+def module_available(name: str) -> bool:
+    """Prüfen, ob ein Modul installiert ist - ohne es zu importieren"""
+    try:
+        return importlib.util.find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def load_env():
+    """.env einmalig laden (python-dotenv wird erst hier importiert)"""
+    global _env_loaded
+    with _env_lock:
+        if _env_loaded:
+            return
+        from dotenv import load_dotenv
+        load_dotenv()
+        _env_loaded = True
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Map-Reduce
+Dokumente größer als das Kontextfenster: an Strukturgrenzen teilen, Abschnitte parallel
+bearbeiten, Teilergebnisse hierarchisch zusammenführen
+"""
+
+import queue
+import re
+import threading
+import time
+from typing import Any, Callable, Dict, Iterator, List, Optional
+
+from kimi_batch import run_batch
+from kimi_context import estimate_tokens
+
+ProgressEvent = Dict[str, Any]
+
+# Beginn einer Definition auf oberster Ebene oder direkt in einer Klasse (Python, JS/TS, Java, C#, Go, Rust, ...)
+_CODE_BOUNDARY = re.compile(
+    r"^(?: {4}|\t)?(?:@|def |async def |class |function |export |public |private |protected |internal |static |func |fn |"
+    r"pub |impl |interface |struct |enum |type |const |let |var |module |namespace |#{1,6} )"
+)
+_HEADING = re.compile(r"^(?:#{1,6} |[=-]{3,}\s*$)")
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s+")
+
+MAP_PROMPT = (
+    "Du bearbeitest Abschnitt {index} von {total} eines größeren Dokuments ({name}).\n"
+    "Aufgabe: {task}\n\n"
+    "Beantworte die Aufgabe nur für diesen Abschnitt. Nenne konkrete Fundstellen "
+    "(Namen, Zeilen, Zitate), damit die Teilergebnisse später zusammengeführt werden können. "
+    "Der Anfang kann sich mit dem vorherigen Abschnitt überschneiden.\n\n"
+    "--- Abschnitt {index}/{total} ---\n{chunk}"
+)
+
+REDUCE_PROMPT = (
+    "Die folgenden Teilergebnisse gehören zu einem größeren Dokument ({name}).\n"
+    "Aufgabe: {task}\n\n"
+    "Führe sie zu einem einzigen Ergebnis zusammen: Doppeltes entfernen, Widersprüche "
+    "auflösen, nichts Wesentliches weglassen.\n\n{partials}"
+)
+
+DIRECT_PROMPT = "Aufgabe: {task}\n\n--- {name} ---\n{chunk}"
+
+
+def _split_units(text: str, kind: str) -> List[str]:
+    """Text in Struktureinheiten zerlegen (Code: Top-Level-Definitionen, Text: Absätze/Überschriften)"""
+    units: List[str] = []
+    current: List[str] = []
+    previous_blank = True
+    for line in text.splitlines(keepends=True):
+        blank = not line.strip()
+        if kind == "code":
+            boundary = bool(_CODE_BOUNDARY.match(line)) and previous_blank
+        else:
+            # Überschriften bleiben beim folgenden Absatz
+            heading_only = all(_HEADING.match(part) or not part.strip() for part in current)
+            boundary = bool(_HEADING.match(line)) or (previous_blank and not blank and not heading_only)
+        if boundary and current and any(part.strip() for part in current):
+            units.append("".join(current))
+            current = []
+        current.append(line)
+        previous_blank = blank
+    if current:
+        units.append("".join(current))
+    return units
+
+
+def _split_oversized(unit: str, max_tokens: int) -> List[str]:
+    """Zu große Einheit in Zeilen bzw. Sätze und notfalls hart nach Zeichen teilen"""
+    if "\n" in unit.strip():
+        pieces, separator = unit.splitlines(keepends=True), ""
+    else:
+        pieces, separator = _SENTENCE_END.split(unit), " "
+    parts: List[str] = []
+    current = ""
+    for piece in pieces:
+        if estimate_tokens(piece) > max_tokens:
+            if current:
+                parts.append(current)
+                current = ""
+            # ~4 Zeichen pro Token; 3 lässt Luft für CJK-Anteile
+            step = max(1, max_tokens * 3)
+            parts.extend(piece[i:i + step] for i in range(0, len(piece), step))
+            continue
+        candidate = current + separator + piece if current else piece
+        if current and estimate_tokens(candidate) > max_tokens:
+            parts.append(current)
+            current = piece
+        else:
+            current = candidate
+    if current:
+        parts.append(current)
+    return parts
+
+
+def split_document(text: str, max_tokens: int, overlap_tokens: int = 0, kind: str = "text") -> List[str]:
+    """
+    Dokument an Strukturgrenzen in Abschnitte von höchstens max_tokens teilen
+
+    Args:
+        text: Dokument
+        max_tokens: Maximale Tokens pro Abschnitt (ohne Überlappung)
+        overlap_tokens: Ende des vorherigen Abschnitts, das jedem Abschnitt vorangestellt wird
+        kind: "code" (Top-Level-Definitionen) oder "text" (Absätze, Überschriften)
+
+    Returns:
+        Liste von Abschnitten in Dokumentreihenfolge
+    """
+    if max_tokens < 1:
+        raise ValueError("max_tokens muss mindestens 1 sein")
+    units: List[str] = []
+    for unit in _split_units(text, kind):
+        units.extend(_split_oversized(unit, max_tokens) if estimate_tokens(unit) > max_tokens else [unit])
+
+    chunks: List[List[str]] = []
+    current: List[str] = []
+    size = 0
+    for unit in units:
+        tokens = estimate_tokens(unit)
+        if current and size + tokens > max_tokens:
+            chunks.append(current)
+            current, size = [], 0
+        current.append(unit)
+        size += tokens
+    if current:
+        chunks.append(current)
+
+    result = []
+    for i, chunk in enumerate(chunks):
+        overlap: List[str] = []
+        if i and overlap_tokens:
+            # Ende des vorherigen Abschnitts: ganze Einheiten, danach ganze Zeilen
+            size = 0
+            for unit in reversed(chunks[i - 1]):
+                tokens = estimate_tokens(unit)
+                if size + tokens > overlap_tokens:
+                    for line in reversed(unit.splitlines(keepends=True)):
+                        size += estimate_tokens(line)
+                        if size > overlap_tokens:
+                            break
+                        overlap.insert(0, line)
+                    break
+                size += tokens
+                overlap.insert(0, unit)
+        result.append("".join(overlap + chunk))
+    return result
+
+
+def _truncate(text: str, max_tokens: int) -> str:
+    """Text auf höchstens max_tokens kürzen und die Kürzung markieren"""
+    if estimate_tokens(text) <= max_tokens:
+        return text
+    # ~4 Zeichen pro Token; 3 lässt Luft für CJK-Anteile
+    cut = text[:max(1, max_tokens * 3 - 8)]
+    while len(cut) > 1 and estimate_tokens(cut) > max_tokens - 2:
+        cut = cut[:len(cut) * 9 // 10]
+    return cut + " […]"
+
+
+class MapReduce:
+    """
+    Map-Reduce über einen Completion-Callable
+
+    - Map: jeder Abschnitt wird parallel bearbeitet (``concurrency``
+      gleichzeitige Aufrufe - über den Client gilt das geteilte Rate-Limit)
+    - Reduce: Teilergebnisse werden in Gruppen von höchstens ``fan_in``
+      bzw. ``reduce_tokens`` zusammengeführt, Ebene für Ebene, bis eines übrig ist
+    - Passt das Dokument in einen Abschnitt, gibt es nur einen direkten Aufruf
+    - Fortschritt als Events: stream() liefert sie als Iterator, run() per Callback
+    """
+
+    def __init__(self, complete: Callable[[str], str], chunk_tokens: int = 24000, overlap_tokens: int = 200,
+                 reduce_tokens: Optional[int] = None, fan_in: int = 8, concurrency: int = 4):
+        """
+        Args:
+            complete: Sendet einen Prompt und liefert die Antwort (z.B. lambda p: client.chat(p))
+            chunk_tokens: Maximale Tokens pro Abschnitt
+            overlap_tokens: Überlappung zwischen benachbarten Abschnitten
+            reduce_tokens: Maximale Tokens an Teilergebnissen pro Reduce-Aufruf (Standard: chunk_tokens)
+            fan_in: Maximale Anzahl Teilergebnisse pro Reduce-Aufruf
+            concurrency: Maximale Anzahl gleichzeitiger Aufrufe
+        """
+        if fan_in < 2:
+            raise ValueError("fan_in muss mindestens 2 sein")
+        self.complete = complete
+        self.chunk_tokens = chunk_tokens
+        self.overlap_tokens = overlap_tokens
+        self.reduce_tokens = reduce_tokens or chunk_tokens
+        self.fan_in = fan_in
+        self.concurrency = concurrency
+
+    def _batch(self, prompts: List[str], on_done: Callable[[int, int, Dict[str, Any]], None]) -> List[str]:
+        results = run_batch(self.complete, prompts, concurrency=self.concurrency, on_progress=on_done)
+        failed = [item for item in results if item["error"] is not None]
+        if failed:
+            raise RuntimeError(f"Map-Reduce: {len(failed)} von {len(prompts)} Aufrufen fehlgeschlagen: "
+                               f"{failed[0]['error']}")
+        return [item["result"] or "" for item in results]
+
+    def _groups(self, partials: List[str]) -> List[List[str]]:
+        """Teilergebnisse gruppieren - mindestens zwei pro Gruppe, damit jede Ebene die Anzahl verringert"""
+        groups: List[List[str]] = [[]]
+        size = 0
+        for partial in partials:
+            tokens = estimate_tokens(partial)
+            if len(groups[-1]) >= 2 and (len(groups[-1]) >= self.fan_in or size + tokens > self.reduce_tokens):
+                groups.append([])
+                size = 0
+            groups[-1].append(partial)
+            size += tokens
+        if len(groups) > 1 and len(groups[-1]) == 1 and len(groups[-2]) < self.fan_in:
+            groups[-2].extend(groups.pop())
+        # Zu große Gruppen kürzen: jedes Teilergebnis bekommt einen gleichen Anteil am Budget
+        share = max(1, self.reduce_tokens // max(len(group) for group in groups))
+        return [[_truncate(partial, share) for partial in group]
+                if sum(estimate_tokens(partial) for partial in group) > self.reduce_tokens else group
+                for group in groups]
+
+    def run(self, text: str, task: str, kind: str = "text", name: str = "Dokument",
+            on_progress: Optional[Callable[[ProgressEvent], None]] = None) -> Dict[str, Any]:
+        """
+        Pipeline ausführen
+
+        Args:
+            text: Dokument oder Quellcode
+            task: Aufgabe (z.B. "Fasse zusammen", "Finde Bugs")
+            kind: "code" oder "text" (bestimmt die Strukturgrenzen)
+            name: Dateiname/Titel für die Prompts
+            on_progress: Optional callback(event) - Events mit stage "split", "map", "reduce"
+
+        Returns:
+            Dict mit result, chunks, map_calls, reduce_calls, levels und elapsed
+        """
+        emit = on_progress or (lambda event: None)
+        start = time.perf_counter()
+        chunks = split_document(text, self.chunk_tokens, self.overlap_tokens, kind)
+        total = len(chunks)
+        emit({"stage": "split", "chunks": total, "tokens": estimate_tokens(text)})
+
+        if total <= 1:
+            prompts = [DIRECT_PROMPT.format(task=task, name=name, chunk=chunks[0] if chunks else "")]
+        else:
+            prompts = [MAP_PROMPT.format(index=i, total=total, name=name, task=task, chunk=chunk)
+                       for i, chunk in enumerate(chunks, 1)]
+        partials = self._batch(prompts, lambda done, count, item: emit(
+            {"stage": "map", "done": done, "total": count, "index": item["index"], "error": item["error"]}))
+        map_calls = len(prompts)
+
+        reduce_calls = levels = 0
+        while len(partials) > 1:
+            levels += 1
+            groups = self._groups(partials)
+            prompts = []
+            for group in groups:
+                numbered = "\n\n".join(f"--- Teilergebnis {i} ---\n{partial}" for i, partial in enumerate(group, 1))
+                prompts.append(REDUCE_PROMPT.format(name=name, task=task, partials=numbered))
+            if len(groups) >= len(partials):
+                raise RuntimeError(f"Map-Reduce: Ebene {levels} verringert die Anzahl der Teilergebnisse nicht")
+            partials = self._batch(prompts, lambda done, count, item, level=levels: emit(
+                {"stage": "reduce", "level": level, "done": done, "total": count, "error": item["error"]}))
+            reduce_calls += len(prompts)
+
+        return {
+            "result": partials[0] if partials else "",
+            "chunks": total,
+            "map_calls": map_calls,
+            "reduce_calls": reduce_calls,
+            "levels": levels,
+            "elapsed": round(time.perf_counter() - start, 4),
+        }
+
+    def stream(self, text: str, task: str, kind: str = "text", name: str = "Dokument") -> Iterator[ProgressEvent]:
+        """
+        Pipeline im Hintergrund ausführen und Fortschritt als Events liefern
+
+        Das letzte Event hat stage "done" mit dem Ergebnis-Dict aus run()
+        (bzw. stage "error" mit der Fehlermeldung).
+        """
+        events: "queue.Queue[Optional[ProgressEvent]]" = queue.Queue()
+
+        def _worker():
+            try:
+                summary = self.run(text, task, kind, name, on_progress=events.put)
+                events.put(dict(summary, stage="done"))
+            except Exception as e:
+                events.put({"stage": "error", "error": str(e)})
+            events.put(None)
+
+        threading.Thread(target=_worker, name="kimi-mapreduce", daemon=True).start()
+        while True:
+            event = events.get()
+            if event is None:
+                return
+            yield event
+
+
+def chunk_budget(context_window: int, max_tokens: int, limit: int = 24000) -> int:
+    """Abschnittsgröße für ein Modell: Platz für Prompt-Rahmen und Antwort lassen"""
+    return max(1000, min(limit, (context_window - max_tokens) // 2))
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Verbindungs-Vorwärmung
+Baut DNS, TCP/TLS und den HTTP-Client im Hintergrund auf, bevor die erste Nachricht gesendet wird
+"""
+
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+# Wie lange eine ungenutzte Verbindung im Pool offen bleibt (SDK-Standard: 5 s)
+DEFAULT_KEEPALIVE_EXPIRY = 120.0
+
+
+def pooled_http_client(keepalive_expiry: Optional[float] = None, wire: Optional[Any] = None,
+                       on_response: Optional[Callable[[Any], None]] = None) -> Optional[Any]:
+    """
+    HTTP-Client des openai-SDK mit längerer Keep-Alive-Zeit
+
+    Mit den SDK-Standardwerten wird eine vorgewärmte Verbindung nach 5 s
+    Leerlauf geschlossen - meist bevor die erste Nachricht getippt ist.
+
+    Args:
+        keepalive_expiry: Sekunden (Standard aus KIMI_KEEPALIVE oder 120)
+        wire: Optional WireOptions - Byte-Zählung per Event-Hook, Kompression als Transport-Schicht
+        on_response: Optional - wird mit jeder HTTP-Response aufgerufen (z.B. KeyPool.observe)
+
+    Returns:
+        http_client für OpenAI(...) oder None (dann gelten die SDK-Standardwerte)
+    """
+    if keepalive_expiry is None:
+        keepalive_expiry = float(os.getenv("KIMI_KEEPALIVE", str(DEFAULT_KEEPALIVE_EXPIRY)))
+    try:
+        import openai
+        from openai._constants import DEFAULT_CONNECTION_LIMITS
+    except ImportError:
+        return None
+    limits = type(DEFAULT_CONNECTION_LIMITS)(
+        max_connections=DEFAULT_CONNECTION_LIMITS.max_connections,
+        max_keepalive_connections=DEFAULT_CONNECTION_LIMITS.max_keepalive_connections,
+        keepalive_expiry=keepalive_expiry,
+    )
+    hooks: Dict[str, list] = {"request": [], "response": []}
+    if on_response is not None:
+        hooks["response"].append(on_response)
+    if wire is not None and not wire.compression:
+        # Ohne Kompression genügt ein Event-Hook zum Zählen der Bytes
+        hooks["request"].append(wire.observe_request)
+    http_client = openai.DefaultHttpxClient(limits=limits, event_hooks=hooks)
+    if wire is not None and wire.compression:
+        # Erst nach dem Aufbau umhüllen: ein transport=... schaltet die Proxy-Mounts aus HTTP(S)_PROXY ab
+        wire.install(http_client)
+    return http_client
+
+
+def warm_openai_client(client: Any):
+    """
+    OpenAI-Client vorwärmen: Verbindung im Pool und lazy geladene SDK-Teile
+
+    - GET /v1/models öffnet eine Verbindung (DNS, TCP/TLS) und lässt sie im Pool
+    - client.chat importiert die Chat-Ressourcen erst beim ersten Zugriff
+    - Die Response-Modelle bauen ihr pydantic-Schema erst beim ersten Chunk
+    """
+    client.models.list()
+    client.chat.completions
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+    for model in (ChatCompletion, ChatCompletionChunk):
+        rebuild = getattr(model, "model_rebuild", None)
+        if rebuild is not None:
+            rebuild()
+
+
+def prewarm_enabled(prewarm: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_PREWARM)"""
+    if prewarm is not None:
+        return prewarm
+    return os.getenv("KIMI_PREWARM", "0").lower() in ("1", "true", "yes")
+
+
+class Prewarm:
+    """
+    Nicht-blockierende Vorwärmung in einem Hintergrund-Thread
+
+    Beispiel:
+        warmup = Prewarm(lambda: client.models.list()).start()
+        ...
+        warmup.wait(2.0)   # optional, z.B. in Tests
+    """
+
+    def __init__(self, warm: Callable[[], Any]):
+        """
+        Args:
+            warm: Günstige Anfrage, die eine Verbindung im Pool hinterlässt
+        """
+        self._warm = warm
+        self._done = threading.Event()
+        self.error: Optional[str] = None
+        self.duration: Optional[float] = None
+        self._thread = threading.Thread(target=self._run, name="kimi-prewarm", daemon=True)
+
+    def start(self) -> "Prewarm":
+        self._thread.start()
+        return self
+
+    def _run(self):
+        start = time.perf_counter()
+        try:
+            self._warm()
+        except Exception as e:
+            # Vorwärmen ist optional - Fehler zeigen sich spätestens bei der ersten Anfrage
+            self.error = str(e)
+        finally:
+            self.duration = time.perf_counter() - start
+            self._done.set()
+
+    @property
+    def done(self) -> bool:
+        return self._done.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Auf das Ende der Vorwärmung warten; True, wenn abgeschlossen"""
+        return self._done.wait(timeout)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "done": self.done,
+            "duration": round(self.duration, 4) if self.duration is not None else None,
+            "error": self.error,
+        }
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Rate-Limiting
+Prozessweiter Token-Bucket (Requests/Minute und Tokens/Minute) mit Retry/Backoff
+"""
+
+import email.utils
+import os
+import random
+import sys
+import threading
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+# asyncio und openai werden nicht beim Modul-Laden importiert (Startzeit der CLI/GUIs)
+
+# HTTP-Status-Codes, bei denen ein erneuter Versuch sinnvoll ist
+RETRY_STATUS = {408, 409, 429, 500, 502, 503, 504}
+
+
+class TokenBucket:
+    """
+    Token-Bucket mit Reservierung
+
+    ``reserve`` blockiert nicht, sondern bucht die Menge sofort (der Stand darf
+    negativ werden) und liefert die Wartezeit, bis die Reservierung gedeckt ist.
+    So funktioniert derselbe Bucket für Threads (time.sleep) und asyncio
+    (asyncio.sleep), und Wartende werden in Ankunftsreihenfolge bedient.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        """
+        Args:
+            rate_per_minute: Nachfüllrate pro Minute
+            capacity: Maximale Burst-Größe (Standard: eine Minute)
+        """
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity if capacity is not None else rate_per_minute
+        self._available = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float = 1.0) -> float:
+        """Menge buchen und Wartezeit in Sekunden zurückgeben"""
+        with self._lock:
+            now = time.monotonic()
+            self._available = min(self.capacity, self._available + (now - self._updated) * self.rate)
+            self._updated = now
+            # Einzelne Anfragen größer als der Bucket dürfen ihn nicht dauerhaft blockieren
+            self._available -= min(amount, self.capacity)
+            if self._available >= 0:
+                return 0.0
+            return -self._available / self.rate
+
+    def peek(self, amount: float = 1.0) -> float:
+        """Wartezeit für amount, ohne zu buchen (z.B. um den freiesten Bucket zu wählen)"""
+        with self._lock:
+            available = min(self.capacity, self._available + (time.monotonic() - self._updated) * self.rate)
+            available -= min(amount, self.capacity)
+            return 0.0 if available >= 0 else -available / self.rate
+
+
+class RateLimiter:
+    """
+    Prozessweiter Rate-Limiter für Requests/Minute und Tokens/Minute
+
+    Wird von allen Client-Instanzen gemeinsam genutzt (siehe get_shared_limiter).
+    Ein Wert von 0 bzw. None deaktiviert das jeweilige Limit.
+    """
+
+    def __init__(self, requests_per_minute: Optional[float] = None, tokens_per_minute: Optional[float] = None):
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+
+    def reserve(self, tokens: int = 0) -> float:
+        """Anfrage mit geschätzten Tokens buchen und Wartezeit zurückgeben"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.reserve(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.reserve(tokens))
+        return wait
+
+    def peek(self, tokens: int = 0) -> float:
+        """Wartezeit einer Anfrage, ohne zu buchen"""
+        wait = 0.0
+        if self.requests is not None:
+            wait = max(wait, self.requests.peek(1))
+        if self.tokens is not None and tokens:
+            wait = max(wait, self.tokens.peek(tokens))
+        return wait
+
+    def acquire(self, tokens: int = 0) -> float:
+        """Blockierend warten, bis die Anfrage gesendet werden darf; liefert die Wartezeit"""
+        wait = self.reserve(tokens)
+        if wait > 0:
+            time.sleep(wait)
+        return wait
+
+    async def acquire_async(self, tokens: int = 0) -> float:
+        """Wie acquire, aber ohne den Event-Loop zu blockieren"""
+        import asyncio
+
+        wait = self.reserve(tokens)
+        if wait > 0:
+            await asyncio.sleep(wait)
+        return wait
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter() -> RateLimiter:
+    """Prozessweiten Limiter abrufen (konfiguriert über KIMI_RPM und KIMI_TPM)"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(
+                requests_per_minute=float(os.getenv("KIMI_RPM", "200")),
+                tokens_per_minute=float(os.getenv("KIMI_TPM", "0")),
+            )
+        return _shared_limiter
+
+
+def set_shared_limiter(limiter: Optional[RateLimiter]):
+    """Prozessweiten Limiter ersetzen (None = beim nächsten Zugriff neu aus .env)"""
+    global _shared_limiter
+    with _shared_lock:
+        _shared_limiter = limiter
+
+
+def is_retryable(exc: Exception) -> bool:
+    """Prüfen, ob ein Fehler vorübergehend ist (429, 5xx, Verbindungsfehler)"""
+    # openai nicht importieren: ist es noch nicht geladen, kann exc kein APIConnectionError sein
+    openai = sys.modules.get("openai")
+    if openai is not None and isinstance(exc, openai.APIConnectionError):
+        return True
+    return getattr(exc, "status_code", None) in RETRY_STATUS
+
+
+def retry_after(exc: Exception) -> Optional[float]:
+    """Retry-After (Sekunden oder HTTP-Datum) aus der Fehler-Response lesen"""
+    # Eigene Fehler (z.B. KeyPoolExhausted) bringen die Wartezeit direkt mit
+    if isinstance(getattr(exc, "retry_after", None), (int, float)):
+        return float(exc.retry_after)
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None)
+    if not headers:
+        return None
+
+    value = headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000.0
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        try:
+            return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+
+def backoff_delay(attempt: int, base_delay: float = 0.5, max_delay: float = 30.0) -> float:
+    """Exponentielles Backoff mit Full Jitter"""
+    return random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+
+
+class RequestStats:
+    """Zähler für Wartezeit im Limiter, Backoff-Pausen und Server-Latenz (getrennt)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.retries = 0
+        self.queue_wait_total = 0.0
+        self.backoff_total = 0.0
+        self.server_latency_total = 0.0
+        self.last_queue_wait = 0.0
+        self.last_server_latency = 0.0
+
+    def record(self, queue_wait: float = 0.0, server_latency: Optional[float] = None, backoff: Optional[float] = None):
+        """Einen Versuch verbuchen (backoff gesetzt = fehlgeschlagener Versuch mit Retry)"""
+        with self._lock:
+            self.queue_wait_total += queue_wait
+            self.last_queue_wait = queue_wait
+            if backoff is not None:
+                self.retries += 1
+                self.backoff_total += backoff
+            if server_latency is not None:
+                self.requests += 1
+                self.server_latency_total += server_latency
+                self.last_server_latency = server_latency
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "retries": self.retries,
+                "queue_wait_total": self.queue_wait_total,
+                "backoff_total": self.backoff_total,
+                "server_latency_total": self.server_latency_total,
+                "last_queue_wait": self.last_queue_wait,
+                "last_server_latency": self.last_server_latency,
+                "avg_server_latency": self.server_latency_total / self.requests if self.requests else None,
+            }
+
+
+def call_with_retry(func: Callable[[], Any], limiter: Optional[RateLimiter] = None, tokens: int = 0,
+                    stats: Optional[RequestStats] = None, max_retries: int = 4,
+                    base_delay: float = 0.5, max_delay: float = 30.0) -> Any:
+    """
+    API-Aufruf mit Rate-Limiting und Retry ausführen
+
+    Args:
+        func: Aufruf ohne Argumente (z.B. lambda: client.chat.completions.create(...))
+        limiter: Rate-Limiter (None = kein Limit)
+        tokens: Geschätzte Tokens der Anfrage (für Tokens/Minute)
+        stats: Optional RequestStats für Wartezeit und Latenz
+        max_retries: Maximale Anzahl Wiederholungen bei 429/5xx
+        base_delay: Basis für das exponentielle Backoff in Sekunden
+        max_delay: Obergrenze für eine einzelne Pause
+
+    Returns:
+        Rückgabewert von func
+    """
+    attempt = 0
+    while True:
+        waited = limiter.acquire(tokens) if limiter else 0.0
+        start = time.perf_counter()
+        try:
+            result = func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            delay = min(delay if delay is not None else backoff_delay(attempt, base_delay, max_delay), max_delay)
+            if stats:
+                stats.record(waited, backoff=delay)
+            time.sleep(delay)
+            attempt += 1
+            continue
+        if stats:
+            stats.record(waited, time.perf_counter() - start)
+        return result
+
+
+async def call_with_retry_async(func: Callable[[], Awaitable[Any]], limiter: Optional[RateLimiter] = None,
+                                tokens: int = 0, stats: Optional[RequestStats] = None, max_retries: int = 4,
+                                base_delay: float = 0.5, max_delay: float = 30.0) -> Any:
+    """Asynchrone Variante von call_with_retry"""
+    import asyncio
+
+    attempt = 0
+    while True:
+        waited = await limiter.acquire_async(tokens) if limiter else 0.0
+        start = time.perf_counter()
+        try:
+            result = await func()
+        except Exception as e:
+            if attempt >= max_retries or not is_retryable(e):
+                raise
+            delay = retry_after(e)
+            delay = min(delay if delay is not None else backoff_delay(attempt, base_delay, max_delay), max_delay)
+            if stats:
+                stats.record(waited, backoff=delay)
+            await asyncio.sleep(delay)
+            attempt += 1
+            continue
+        if stats:
+            stats.record(waited, time.perf_counter() - start)
+        return result
@@ -0,0 +1,213 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Single-Flight
+Identische, gleichzeitig laufende Anfragen teilen sich einen API-Aufruf
+"""
+
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+from kimi_stream import CancelToken, abort_response
+
+
+def flight_key(request_key: str, account: str) -> str:
+    """Schlüssel für den prozessweiten Single-Flight - nur Anfragen desselben Accounts teilen sich einen Aufruf"""
+    return hashlib.sha256(f"{request_key}\n{account}".encode("utf-8")).hexdigest()
+
+
+class _Call:
+    """Laufender (nicht-streamender) Aufruf"""
+
+    def __init__(self):
+        self.event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _Broadcast:
+    """Laufender Stream, dessen Chunks an alle Abonnenten verteilt werden"""
+
+    def __init__(self):
+        self.cond = threading.Condition()
+        self.items: List[Any] = []
+        self.done = False
+        self.error: Optional[BaseException] = None
+        self.subscribers = 0
+        self.abandoned = False
+        self.upstream: Any = None
+
+
+class SingleFlight:
+    """
+    Request-Coalescing für identische Anfragen
+
+    - ``do``: Der erste Aufrufer führt die Anfrage aus, alle weiteren mit
+      demselben Key warten auf dessen Ergebnis (oder Fehler)
+    - ``stream``: Ein Hintergrund-Thread liest den Upstream-Stream einmal und
+      verteilt jeden Chunk an alle Abonnenten; später hinzukommende
+      Abonnenten erhalten die bereits gelesenen Chunks zuerst
+    - Steigen alle Abonnenten eines Streams aus (oder brechen per CancelToken
+      ab), wird der Upstream sofort geschlossen
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[str, _Call] = {}
+        self._streams: Dict[str, _Broadcast] = {}
+        self._stats = {"upstream_calls": 0, "coalesced_calls": 0, "upstream_streams": 0, "coalesced_streams": 0}
+
+    def do(self, key: str, func: Callable[[], Any]) -> Any:
+        """
+        func ausführen oder auf einen identischen laufenden Aufruf warten
+
+        Args:
+            key: Eindeutiger Key der Anfrage
+            func: Der eigentliche API-Aufruf
+
+        Returns:
+            Ergebnis von func (geteilt zwischen allen Wartenden)
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+                self._stats["upstream_calls"] += 1
+            else:
+                self._stats["coalesced_calls"] += 1
+
+        if not leader:
+            call.event.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        try:
+            call.result = func()
+            return call.result
+        except BaseException as e:
+            call.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.event.set()
+
+    def stream(self, key: str, func: Callable[[], Iterable[Any]],
+               cancel: Optional[CancelToken] = None) -> Iterator[Any]:
+        """
+        Stream abonnieren - identische laufende Streams werden geteilt
+
+        Args:
+            key: Eindeutiger Key der Anfrage
+            func: Öffnet den Upstream-Stream (Iterable von Chunks)
+            cancel: Optional CancelToken - beendet dieses Abonnement sofort
+
+        Yields:
+            Alle Chunks des Upstream-Streams
+        """
+        with self._lock:
+            broadcast = self._streams.get(key)
+            if broadcast is not None:
+                with broadcast.cond:
+                    if broadcast.abandoned:
+                        broadcast = None
+                    else:
+                        broadcast.subscribers += 1
+            leader = broadcast is None
+            if leader:
+                broadcast = self._streams[key] = _Broadcast()
+                broadcast.subscribers = 1
+                self._stats["upstream_streams"] += 1
+            else:
+                self._stats["coalesced_streams"] += 1
+
+        if leader:
+            threading.Thread(target=self._pump, args=(key, broadcast, func), daemon=True).start()
+
+        return self._subscribe(broadcast, cancel)
+
+    def _pump(self, key: str, broadcast: _Broadcast, func: Callable[[], Iterable[Any]]):
+        """Upstream lesen und Chunks verteilen (Hintergrund-Thread)"""
+        upstream = None
+        try:
+            upstream = func()
+            with broadcast.cond:
+                broadcast.upstream = upstream
+                abandoned = broadcast.abandoned
+            for item in () if abandoned else upstream:
+                with broadcast.cond:
+                    if broadcast.abandoned:
+                        break
+                    broadcast.items.append(item)
+                    broadcast.cond.notify_all()
+        except BaseException as e:
+            broadcast.error = e
+        finally:
+            with self._lock:
+                if self._streams.get(key) is broadcast:
+                    del self._streams[key]
+            with broadcast.cond:
+                broadcast.done = True
+                broadcast.cond.notify_all()
+            if broadcast.abandoned and upstream is not None:
+                abort_response(upstream)
+
+    def _subscribe(self, broadcast: _Broadcast, cancel: Optional[CancelToken] = None) -> Iterator[Any]:
+        """Chunks eines geteilten Streams in eigener Geschwindigkeit lesen"""
+        index = 0
+        cancelled = False
+
+        def _wake():
+            nonlocal cancelled
+            with broadcast.cond:
+                cancelled = True
+                broadcast.cond.notify_all()
+
+        unregister = cancel.on_cancel(_wake) if cancel is not None else None
+        try:
+            while True:
+                with broadcast.cond:
+                    while index >= len(broadcast.items) and not broadcast.done and not cancelled:
+                        broadcast.cond.wait()
+                    if cancelled:
+                        return
+                    if index < len(broadcast.items):
+                        item = broadcast.items[index]
+                    elif broadcast.error is not None:
+                        raise broadcast.error
+                    else:
+                        return
+                index += 1
+                yield item
+        finally:
+            if unregister is not None:
+                unregister()
+            with broadcast.cond:
+                broadcast.subscribers -= 1
+                if broadcast.subscribers == 0 and not broadcast.done:
+                    broadcast.abandoned = True
+                upstream = broadcast.upstream if broadcast.abandoned else None
+            if upstream is not None:
+                # Verbindung sofort schließen - der Pump-Thread wartet evtl. noch auf den nächsten Chunk
+                abort_response(upstream)
+            if broadcast.abandoned:
+                # Abgebrochener Stream darf nicht mehr geteilt werden
+                with self._lock:
+                    for key, value in list(self._streams.items()):
+                        if value is broadcast:
+                            del self._streams[key]
+
+    def get_stats(self) -> Dict[str, int]:
+        """Zähler: Upstream-Aufrufe und eingesparte (geteilte) Aufrufe"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats["saved_calls"] = stats["coalesced_calls"] + stats["coalesced_streams"]
+        return stats
+
+
+# Prozessweite Instanz, von allen Clients geteilt
+shared_single_flight = SingleFlight()
@@ -0,0 +1,132 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 SSE-Fast-Path
+Liest Chat-Streams direkt als Server-Sent Events - ohne pydantic-Objekt pro Chunk
+"""
+
+import json
+import os
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from kimi_wire import create_chat_completion
+
+_DATA = "data:"
+_DONE = "[DONE]"
+
+
+def raw_sse_enabled(raw_sse: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_RAW_SSE)"""
+    if raw_sse is not None:
+        return raw_sse
+    return os.getenv("KIMI_RAW_SSE", "0").lower() in ("1", "true", "yes")
+
+
+class SSEDelta:
+    """Delta eines Chunks (role, content, tool_calls als rohe Dicts)"""
+
+    __slots__ = ("role", "content", "tool_calls")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.role = data.get("role")
+        self.content = data.get("content")
+        self.tool_calls = data.get("tool_calls")
+
+
+class SSEChoice:
+    __slots__ = ("index", "delta", "finish_reason", "usage")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.index = data.get("index", 0)
+        self.delta = SSEDelta(data.get("delta") or {})
+        self.finish_reason = data.get("finish_reason")
+        # Moonshot liefert usage im letzten Choice-Objekt
+        self.usage = data.get("usage")
+
+
+class SSEChunk:
+    """
+    Schlanker Ersatz für ChatCompletionChunk
+
+    Bietet dieselben Attribute, die die Clients lesen (choices[0].delta.content,
+    finish_reason, usage), ohne pydantic-Validierung.
+    """
+
+    __slots__ = ("id", "model", "choices", "usage")
+
+    def __init__(self, data: Dict[str, Any]):
+        self.id = data.get("id")
+        self.model = data.get("model")
+        self.choices: List[SSEChoice] = [SSEChoice(choice) for choice in data.get("choices") or ()]
+        self.usage = data.get("usage")
+
+
+def iter_sse_data(lines: Iterable[str]) -> Iterator[str]:
+    """
+    data-Felder eines SSE-Streams liefern (bis [DONE])
+
+    Mehrzeilige Events werden zusammengefügt; Kommentare und andere Felder
+    (event, id, retry) werden ignoriert.
+    """
+    parts: List[str] = []
+    for line in lines:
+        if not line:
+            if parts:
+                data = "\n".join(parts)
+                parts = []
+                if data == _DONE:
+                    return
+                yield data
+            continue
+        if line.startswith(_DATA):
+            value = line[len(_DATA):]
+            parts.append(value[1:] if value.startswith(" ") else value)
+    if parts:
+        data = "\n".join(parts)
+        if data != _DONE:
+            yield data
+
+
+def parse_chunk(data: str) -> SSEChunk:
+    """Ein data-Feld in einen SSEChunk umwandeln (Fehler-Events werden zu Exceptions)"""
+    payload = json.loads(data)
+    error = payload.get("error") if isinstance(payload, dict) else None
+    if error:
+        message = error.get("message") if isinstance(error, dict) else None
+        raise Exception(message or "An error occurred during streaming")
+    return SSEChunk(payload)
+
+
+class RawSSEStream:
+    """
+    Streaming-Antwort des openai-Clients, roh als SSE gelesen
+
+    Anfrage, Authentifizierung und Fehlerbehandlung (HTTP-Status) bleiben
+    beim SDK; nur das Parsen der Chunks wird ersetzt. Wie der SDK-Stream
+    bietet das Objekt ``response`` und ``close()``.
+    """
+
+    def __init__(self, client: Any, compact_json: bool = False, **kwargs):
+        """
+        Args:
+            client: OpenAI-Client
+            compact_json: Body vorab serialisieren (siehe kimi_wire.create_chat_completion)
+            **kwargs: Parameter für chat.completions.create (stream=True wird gesetzt)
+        """
+        kwargs["stream"] = True
+        if compact_json:
+            self._api_response = create_chat_completion(client, kwargs, raw_stream=True)
+        else:
+            self._api_response = client.chat.completions.with_streaming_response.create(**kwargs).__enter__()
+        self.response = self._api_response.http_response
+
+    def __iter__(self) -> Iterator[SSEChunk]:
+        try:
+            for data in iter_sse_data(self.response.iter_lines()):
+                yield parse_chunk(data)
+        finally:
+            self.close()
+
+    def close(self):
+        self._api_response.close()
@@ -0,0 +1,625 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Moonshot AI Stand-in Server
+Lokaler, OpenAI-kompatibler Ersatz für api.moonshot.ai - für Tests, Lasttests
+und Benchmarks ohne Netzwerk und ohne API-Key
+
+Starten:
+    python3 kimi_standin_server.py --port 8765 --ttft 0.2 --token-delay 0.01
+
+Clients verbinden:
+    MOONSHOT_BASE_URL=http://127.0.0.1:8765/v1
+"""
+
+import argparse
+import json
+import random
+import threading
+import time
+import uuid
+import zlib
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List, Optional
+
+STANDIN_MODELS = [
+    "moonshot-v1-8k",
+    "moonshot-v1-32k",
+    "moonshot-v1-128k",
+    "kimi-k2-0711-preview",
+    "kimi-k2-instruct",
+]
+
+
+class StandinConfig:
+    """Verhalten des Stand-in Servers (zur Laufzeit änderbar)"""
+
+    def __init__(self, ttft: float = 0.0, token_delay: float = 0.0, tokens_per_second: Optional[float] = None,
+                 response_tokens: int = 32, error_rate: float = 0.0, error_statuses: Optional[List[int]] = None,
+                 retry_after: Optional[float] = 1.0, chunk_tokens: int = 1, accept_compression: bool = True,
+                 invalid_keys: Optional[List[str]] = None, failing_models: Optional[List[str]] = None,
+                 model_ttft: Optional[Dict[str, float]] = None, tool_calls_per_turn: int = 1,
+                 tool_rounds: int = 1, prefill_delay: float = 0.0):
+        """
+        Args:
+            ttft: Verzögerung bis zum ersten Token (Sekunden)
+            token_delay: Pause zwischen zwei Stream-Chunks (Sekunden)
+            tokens_per_second: Alternative zu token_delay (überschreibt sie)
+            response_tokens: Anzahl Wörter/Tokens pro Antwort
+            error_rate: Wahrscheinlichkeit für einen injizierten Fehler (0.0-1.0)
+            error_statuses: HTTP-Status-Codes für injizierte Fehler
+            retry_after: Retry-After-Header bei 429 (None = kein Header)
+            chunk_tokens: Tokens pro Stream-Chunk
+            accept_compression: gzip/deflate-Bodies annehmen (sonst 415)
+            invalid_keys: API-Keys, die mit 401 abgelehnt werden
+            failing_models: Modelle, die immer mit 503 antworten (gestörtes Modell)
+            model_ttft: Verzögerung bis zum ersten Token pro Modell (überschreibt ttft)
+            tool_calls_per_turn: Parallele Tool-Calls pro Antwort (reihum über die Tools)
+            tool_rounds: Anzahl Tool-Runden, bevor eine Text-Antwort kommt
+            prefill_delay: Zusätzliche Verzögerung pro 1000 nicht gecachter Prompt-Tokens (Sekunden)
+        """
+        self.ttft = ttft
+        self.token_delay = token_delay
+        self.tokens_per_second = tokens_per_second
+        self.response_tokens = response_tokens
+        self.error_rate = error_rate
+        self.error_statuses = error_statuses or [429, 500, 503]
+        self.retry_after = retry_after
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.accept_compression = accept_compression
+        self.invalid_keys = set(invalid_keys or ())
+        self.failing_models = set(failing_models or ())
+        self.model_ttft = dict(model_ttft or {})
+        self.tool_calls_per_turn = max(1, tool_calls_per_turn)
+        self.tool_rounds = max(1, tool_rounds)
+        self.prefill_delay = prefill_delay
+
+    @property
+    def inter_chunk_delay(self) -> float:
+        if self.tokens_per_second:
+            return self.chunk_tokens / self.tokens_per_second
+        return self.token_delay
+
+
+class StandinState:
+    """Zähler und Fehler-Warteschlange des Servers"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.stats: Dict[str, int] = {"requests": 0, "streams": 0, "tool_calls": 0, "errors_injected": 0,
+                                      "models": 0, "connections": 0, "bytes_received": 0,
+                                      "compressed_requests": 0}
+        self.forced_errors: List[int] = []
+        self.forced_delays: List[float] = []
+        self.requests: List[Dict[str, Any]] = []
+        self.max_logged_requests = 100
+        # Context Caches: id -> {"messages", "tokens", "ttl", "expires_at"}
+        self.caches: Dict[str, Dict[str, Any]] = {}
+        # Files API: id -> {"filename", "data", "purpose", "created_at"}
+        self.files: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, body: Dict[str, Any]):
+        with self.lock:
+            self.stats["requests"] += 1
+            self.requests.append(body)
+            del self.requests[:-self.max_logged_requests]
+
+    def count(self, name: str, amount: int = 1):
+        with self.lock:
+            self.stats[name] = self.stats.get(name, 0) + amount
+
+
+def _words(messages: List[Dict[str, Any]], count: int) -> List[str]:
+    """Deterministische Antwort-Wörter aus der letzten User-Nachricht erzeugen"""
+    last = ""
+    for message in reversed(messages):
+        if message.get("role") == "user" and isinstance(message.get("content"), str):
+            last = message["content"]
+            break
+    seed = last.split()[:8] or ["Hallo"]
+    words = ["Stand-in-Antwort:"] + seed
+    while len(words) < count:
+        words.append(f"token{len(words)}")
+    return [w + " " for w in words[:count]]
+
+
+def _tool_arguments(tool: Dict[str, Any]) -> Dict[str, Any]:
+    """Platzhalter-Argumente anhand des JSON-Schemas eines Tools bauen"""
+    parameters = tool.get("function", {}).get("parameters", {}) or {}
+    properties = parameters.get("properties", {}) or {}
+    arguments = {}
+    for name in parameters.get("required", list(properties)):
+        schema = properties.get(name, {})
+        if schema.get("enum"):
+            arguments[name] = schema["enum"][0]
+        elif schema.get("type") in ("integer", "number"):
+            arguments[name] = 1
+        elif schema.get("type") == "boolean":
+            arguments[name] = True
+        elif name == "code":
+            arguments[name] = "print('stand-in')"
+        else:
+            arguments[name] = "stand-in"
+    return arguments
+
+
+def _tool_rounds_done(messages: List[Dict[str, Any]]) -> int:
+    """Assistant-Nachrichten mit Tool-Calls seit der letzten User-Nachricht"""
+    rounds = 0
+    for message in reversed(messages):
+        if message.get("role") == "user":
+            break
+        if message.get("role") == "assistant" and message.get("tool_calls"):
+            rounds += 1
+    return rounds
+
+
+def _estimate_prompt_tokens(messages: List[Dict[str, Any]]) -> int:
+    return sum(len(str(m.get("content") or "")) // 4 + 4 for m in messages)
+
+
+def _parse_multipart(content_type: str, raw: bytes) -> Dict[str, Any]:
+    """multipart/form-data lesen: Feldname -> str bzw. (filename, bytes) für Dateien"""
+    message = BytesParser(policy=HTTP).parsebytes(f"Content-Type: {content_type}\r\n\r\n".encode("latin-1") + raw)
+    fields: Dict[str, Any] = {}
+    for part in message.iter_parts():
+        name = part.get_param("name", header="content-disposition")
+        data = part.get_payload(decode=True) or b""
+        filename = part.get_filename()
+        fields[name] = (filename, data) if filename is not None else data.decode("utf-8")
+    return fields
+
+
+def _parse_cache_reference(content: str) -> Dict[str, str]:
+    """Inhalt einer Cache-Nachricht lesen: "cache_id=...;reset_ttl=3600" """
+    fields = {}
+    for part in str(content or "").split(";"):
+        if "=" in part:
+            name, value = part.split("=", 1)
+            fields[name.strip()] = value.strip()
+    return fields
+
+
+class StandinHandler(BaseHTTPRequestHandler):
+    """HTTP-Handler für /v1/models und /v1/chat/completions"""
+
+    server_version = "MoonshotStandin/1.0"
+    protocol_version = "HTTP/1.1"
+    # Header und Body werden getrennt geschrieben - ohne TCP_NODELAY kostet
+    # das Zusammenspiel von Nagle und Delayed-ACK ~40 ms pro Antwort
+    disable_nagle_algorithm = True
+
+    @property
+    def config(self) -> StandinConfig:
+        return self.server.config
+
+    @property
+    def state(self) -> StandinState:
+        return self.server.state
+
+    def setup(self):
+        super().setup()
+        # Neue TCP-Verbindung (Keep-Alive-Wiederverwendung zählt nicht)
+        self.state.count("connections")
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    # --- Hilfsfunktionen ---
+
+    def _send_json(self, status: int, payload: Dict[str, Any], headers: Optional[Dict[str, str]] = None):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        return self.rfile.read(length) if length else b""
+
+    def _injected_error(self) -> Optional[int]:
+        with self.state.lock:
+            if self.state.forced_errors:
+                return self.state.forced_errors.pop(0)
+        if self.config.error_rate and random.random() < self.config.error_rate:
+            return random.choice(self.config.error_statuses)
+        return None
+
+    def _send_error_status(self, status: int):
+        self.state.count("errors_injected")
+        headers = {}
+        if status == 429 and self.config.retry_after is not None:
+            headers["Retry-After"] = str(self.config.retry_after)
+        kind = "rate_limit_reached_error" if status == 429 else "server_error"
+        self._send_json(status, {"error": {"message": f"Stand-in Fehler {status}", "type": kind}}, headers)
+
+    # --- Endpoints ---
+
+    def _cache_object(self, cache_id: str, cache: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": cache_id, "object": "context_cache", "status": "ready", "tokens": cache["tokens"],
+                "ttl": cache["ttl"], "expired_at": int(time.time() + cache["expires_at"] - time.monotonic())}
+
+    def _live_cache(self, cache_id: str) -> Optional[Dict[str, Any]]:
+        with self.state.lock:
+            cache = self.state.caches.get(cache_id)
+            if cache is not None and cache["expires_at"] <= time.monotonic():
+                del self.state.caches[cache_id]
+                cache = None
+        return cache
+
+    def _create_cache(self, body: Dict[str, Any]):
+        messages = body.get("messages") or []
+        ttl = int(body.get("ttl") or 300)
+        cache_id = f"cache-{uuid.uuid4().hex[:16]}"
+        cache = {"messages": messages, "tokens": _estimate_prompt_tokens(messages), "ttl": ttl,
+                 "expires_at": time.monotonic() + ttl, "owner": self.headers.get("Authorization") or ""}
+        with self.state.lock:
+            self.state.caches[cache_id] = cache
+        self.state.count("caches_created")
+        self._send_json(200, self._cache_object(cache_id, cache))
+
+    def _expand_caches(self, messages: List[Dict[str, Any]]):
+        """Cache-Nachrichten durch den registrierten Präfix ersetzen; liefert (messages, cached_tokens) oder None
+
+        Wie beim Provider gehört ein Cache dem API-Key, der ihn registriert hat.
+        """
+        expanded: List[Dict[str, Any]] = []
+        cached_tokens = 0
+        for message in messages:
+            if message.get("role") != "cache":
+                expanded.append(message)
+                continue
+            fields = _parse_cache_reference(message.get("content"))
+            cache = self._live_cache(fields.get("cache_id", ""))
+            if cache is None or cache["owner"] != (self.headers.get("Authorization") or ""):
+                return None
+            if fields.get("reset_ttl"):
+                cache["expires_at"] = time.monotonic() + int(fields["reset_ttl"])
+            expanded.extend(cache["messages"])
+            cached_tokens += cache["tokens"]
+        return expanded, cached_tokens
+
+    def _file_object(self, file_id: str, stored: Dict[str, Any]) -> Dict[str, Any]:
+        return {"id": file_id, "object": "file", "bytes": len(stored["data"]), "created_at": stored["created_at"],
+                "filename": stored["filename"], "purpose": stored["purpose"], "status": "ok"}
+
+    def _create_file(self, raw: bytes):
+        try:
+            fields = _parse_multipart(self.headers.get("Content-Type") or "", raw)
+            filename, data = fields["file"]
+        except (KeyError, TypeError, ValueError):
+            self._send_json(400, {"error": {"message": "Feld file fehlt", "type": "invalid_request_error"}})
+            return
+        file_id = f"file-{uuid.uuid4().hex[:16]}"
+        stored = {"filename": filename, "data": data, "purpose": fields.get("purpose", "file-extract"),
+                  "created_at": int(time.time()), "owner": self.headers.get("Authorization") or ""}
+        with self.state.lock:
+            self.state.files[file_id] = stored
+        self.state.count("files_uploaded")
+        self._send_json(200, self._file_object(file_id, stored))
+
+    def _get_file(self, path: str):
+        parts = path.rstrip("/").split("/")
+        want_content = parts[-1] == "content"
+        file_id = parts[-2] if want_content else parts[-1]
+        with self.state.lock:
+            stored = self.state.files.get(file_id)
+        # Dateien gehören dem Account, der sie hochgeladen hat
+        if stored is None or stored["owner"] != (self.headers.get("Authorization") or ""):
+            self._send_json(404, {"error": {"message": f"file {file_id} not found", "type": "resource_not_found_error"}})
+        elif want_content:
+            # Wie Moonshot: extrahierter Text als JSON
+            self.state.count("file_content_requests")
+            self._send_json(200, {"content": stored["data"].decode("utf-8", errors="replace"),
+                                  "file_type": "text/plain", "filename": stored["filename"], "title": "",
+                                  "type": "file"})
+        else:
+            self._send_json(200, self._file_object(file_id, stored))
+
+    def do_GET(self):
+        if self.path.startswith("/v1/files/"):
+            self._get_file(self.path)
+            return
+        if self.path.startswith("/v1/caching/"):
+            cache_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+            cache = self._live_cache(cache_id)
+            if cache is None:
+                self._send_json(404, {"error": {"message": f"cache {cache_id} not found",
+                                                "type": "resource_not_found_error"}})
+            else:
+                self._send_json(200, self._cache_object(cache_id, cache))
+            return
+        if self.path.rstrip("/") in ("/v1/models", "/models"):
+            self.state.count("models")
+            self._send_json(200, {
+                "object": "list",
+                "data": [{"id": m, "object": "model", "created": 0, "owned_by": "moonshot"} for m in STANDIN_MODELS],
+            })
+        else:
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad: {self.path}", "type": "not_found"}})
+
+    def do_DELETE(self):
+        object_id = self.path.rstrip("/").rsplit("/", 1)[-1]
+        kind = "file" if self.path.startswith("/v1/files/") else "context_cache"
+        with self.state.lock:
+            store = self.state.files if kind == "file" else self.state.caches
+            found = store.pop(object_id, None) is not None
+        self._send_json(200 if found else 404, {"id": object_id, "object": kind, "deleted": found})
+
+    def do_POST(self):
+        if self.path.rstrip("/") not in ("/v1/chat/completions", "/chat/completions", "/v1/caching", "/v1/files"):
+            self._read_body()
+            self._send_json(404, {"error": {"message": f"Unbekannter Pfad: {self.path}", "type": "not_found"}})
+            return
+
+        raw = self._read_body()
+        self.state.count("bytes_received", len(raw))
+        auth = self.headers.get("Authorization") or ""
+        if auth.startswith("Bearer ") and auth[7:] in self.config.invalid_keys:
+            self.state.count("auth_errors")
+            self._send_json(401, {"error": {"message": "Invalid Authentication", "type": "invalid_authentication_error"}})
+            return
+        if self.path.rstrip("/") == "/v1/files":
+            self._create_file(raw)
+            return
+        encoding = (self.headers.get("Content-Encoding") or "").lower()
+        if encoding:
+            if encoding not in ("gzip", "deflate") or not self.config.accept_compression:
+                self._send_json(415, {"error": {"message": f"Content-Encoding {encoding} nicht unterstützt",
+                                                "type": "invalid_request_error"}})
+                return
+            self.state.count("compressed_requests")
+        try:
+            if encoding:
+                # wbits 47: gzip- und zlib-Header automatisch erkennen
+                raw = zlib.decompress(raw, 47)
+            body = json.loads(raw or b"{}")
+        except (ValueError, zlib.error):
+            self._send_json(400, {"error": {"message": "Ungültiges JSON", "type": "invalid_request_error"}})
+            return
+        if self.path.rstrip("/") == "/v1/caching":
+            self._create_cache(body)
+            return
+        self.state.record(body)
+
+        status = self._injected_error()
+        if not status and body.get("model") in self.config.failing_models:
+            status = 503
+        if status:
+            self._send_error_status(status)
+            return
+
+        messages = body.get("messages") or []
+        cached_tokens = 0
+        if any(message.get("role") == "cache" for message in messages):
+            expanded = self._expand_caches(messages)
+            if expanded is None:
+                self._send_json(404, {"error": {"message": "context cache not found or expired",
+                                                "type": "resource_not_found_error"}})
+                return
+            messages, cached_tokens = expanded
+            self.state.count("cache_hits")
+        model = body.get("model", "moonshot-v1-8k")
+        tools = body.get("tools") or []
+        count = min(self.config.response_tokens, int(body.get("max_tokens") or self.config.response_tokens))
+
+        tool_calls: List[Dict[str, Any]] = []
+        if tools and body.get("tool_choice") != "none" and _tool_rounds_done(messages) < self.config.tool_rounds:
+            for i in range(self.config.tool_calls_per_turn):
+                tool = tools[i % len(tools)]
+                tool_calls.append({
+                    "id": f"call_{uuid.uuid4().hex[:12]}",
+                    "type": "function",
+                    "function": {"name": tool["function"]["name"], "arguments": json.dumps(_tool_arguments(tool))},
+                })
+                self.state.count("tool_calls")
+
+        usage = {
+            "prompt_tokens": _estimate_prompt_tokens(messages),
+            "completion_tokens": 0 if tool_calls else count,
+        }
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        if cached_tokens:
+            usage["cached_tokens"] = cached_tokens
+
+        with self.state.lock:
+            if self.state.forced_delays:
+                ttft = self.state.forced_delays.pop(0)
+            else:
+                ttft = self.config.model_ttft.get(model, self.config.ttft)
+        # Prefill: nur nicht gecachte Prompt-Tokens kosten Zeit bis zum ersten Token
+        ttft += self.config.prefill_delay * (usage["prompt_tokens"] - cached_tokens) / 1000
+        if ttft:
+            time.sleep(ttft)
+
+        if body.get("stream"):
+            self.state.count("streams")
+            self._stream(model, messages, count, tool_calls, usage)
+        else:
+            self._complete(model, messages, count, tool_calls, usage)
+
+    def _complete(self, model: str, messages: List[Dict[str, Any]], count: int,
+                  tool_calls: List[Dict[str, Any]], usage: Dict[str, int]):
+        message: Dict[str, Any] = {"role": "assistant", "content": None if tool_calls else "".join(_words(messages, count)).strip()}
+        if tool_calls:
+            message["tool_calls"] = tool_calls
+        self._send_json(200, {
+            "id": f"chatcmpl-{uuid.uuid4().hex[:16]}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [{"index": 0, "message": message, "finish_reason": "tool_calls" if tool_calls else "stop"}],
+            "usage": usage,
+        })
+
+    def _stream(self, model: str, messages: List[Dict[str, Any]], count: int,
+                tool_calls: List[Dict[str, Any]], usage: Dict[str, int]):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Cache-Control", "no-cache")
+        self.send_header("Connection", "close")
+        self.end_headers()
+
+        completion_id = f"chatcmpl-{uuid.uuid4().hex[:16]}"
+        created = int(time.time())
+        delay = self.config.inter_chunk_delay
+
+        def send(delta: Dict[str, Any], finish_reason: Optional[str] = None, extra: Optional[Dict[str, Any]] = None):
+            choice: Dict[str, Any] = {"index": 0, "delta": delta, "finish_reason": finish_reason}
+            payload: Dict[str, Any] = {
+                "id": completion_id, "object": "chat.completion.chunk", "created": created,
+                "model": model, "choices": [choice],
+            }
+            if extra:
+                choice.update(extra)
+                payload.update(extra)
+            self.wfile.write(b"data: " + json.dumps(payload).encode("utf-8") + b"\n\n")
+            self.wfile.flush()
+
+        try:
+            send({"role": "assistant", "content": ""})
+            if tool_calls:
+                for index, tool_call in enumerate(tool_calls):
+                    arguments = tool_call["function"]["arguments"]
+                    send({"tool_calls": [{"index": index, "id": tool_call["id"], "type": "function",
+                                          "function": {"name": tool_call["function"]["name"], "arguments": ""}}]})
+                    step = max(1, len(arguments) // 4)
+                    for i in range(0, len(arguments), step):
+                        if delay:
+                            time.sleep(delay)
+                        send({"tool_calls": [{"index": index, "function": {"arguments": arguments[i:i + step]}}]})
+                send({}, "tool_calls", {"usage": usage})
+            else:
+                words = _words(messages, count)
+                size = self.config.chunk_tokens
+                for i in range(0, len(words), size):
+                    if i and delay:
+                        time.sleep(delay)
+                    send({"content": "".join(words[i:i + size])})
+                send({}, "stop", {"usage": usage})
+            self.wfile.write(b"data: [DONE]\n\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # Client hat den Stream abgebrochen
+            self.state.count("streams_aborted")
+        self.close_connection = True
+
+
+class _StandinHTTPServer(ThreadingHTTPServer):
+    daemon_threads = True
+    # Großer Backlog, damit Lasttests mit 100+ gleichzeitigen Verbindungen
+    # nicht an abgewiesenen Verbindungen scheitern
+    request_queue_size = 512
+
+
+class StandinServer:
+    """
+    Stand-in Server im Hintergrund-Thread
+
+    Beispiel:
+        with StandinServer(StandinConfig(ttft=0.1)) as server:
+            client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url)
+    """
+
+    def __init__(self, config: Optional[StandinConfig] = None, host: str = "127.0.0.1", port: int = 0,
+                 verbose: bool = False):
+        self.config = config or StandinConfig()
+        self.state = StandinState()
+        self.httpd = _StandinHTTPServer((host, port), StandinHandler)
+        self.httpd.config = self.config
+        self.httpd.state = self.state
+        self.httpd.verbose = verbose
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self.httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def fail_next(self, status: int, times: int = 1):
+        """Die nächsten Anfragen mit einem HTTP-Fehler beantworten"""
+        with self.state.lock:
+            self.state.forced_errors.extend([status] * times)
+
+    def slow_next(self, ttft: float, times: int = 1):
+        """Den ersten Token der nächsten Anfragen um ttft Sekunden verzögern (Tail-Latenz)"""
+        with self.state.lock:
+            self.state.forced_delays.extend([ttft] * times)
+
+    def delete_files(self):
+        """Alle hochgeladenen Dateien löschen (simuliert Aufräumen beim Provider)"""
+        with self.state.lock:
+            self.state.files.clear()
+
+    def evict_caches(self):
+        """Alle Context Caches verwerfen (simuliert Verdrängung beim Provider)"""
+        with self.state.lock:
+            self.state.caches.clear()
+
+    def get_stats(self) -> Dict[str, int]:
+        with self.state.lock:
+            return dict(self.state.stats)
+
+    @property
+    def requests(self) -> List[Dict[str, Any]]:
+        """Zuletzt empfangene Request-Bodies"""
+        with self.state.lock:
+            return list(self.state.requests)
+
+    def start(self) -> "StandinServer":
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self) -> "StandinServer":
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main():
+    """Stand-in Server im Vordergrund starten"""
+    parser = argparse.ArgumentParser(description="Lokaler Moonshot AI Stand-in Server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--ttft", type=float, default=0.0, help="Verzögerung bis zum ersten Token (s)")
+    parser.add_argument("--token-delay", type=float, default=0.0, help="Pause zwischen Chunks (s)")
+    parser.add_argument("--tokens-per-second", type=float, default=None, help="Durchsatz (überschreibt --token-delay)")
+    parser.add_argument("--response-tokens", type=int, default=32, help="Tokens pro Antwort")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Anteil injizierter Fehler (0.0-1.0)")
+    parser.add_argument("--error-status", type=int, action="append", help="Status-Code für Fehler (mehrfach möglich)")
+    parser.add_argument("--verbose", action="store_true")
+    args = parser.parse_args()
+
+    config = StandinConfig(ttft=args.ttft, token_delay=args.token_delay, tokens_per_second=args.tokens_per_second,
+                           response_tokens=args.response_tokens, error_rate=args.error_rate,
+                           error_statuses=args.error_status)
+    server = StandinServer(config, host=args.host, port=args.port, verbose=args.verbose)
+    print("🌙 Moonshot Stand-in Server")
+    print(f"   Base URL: {server.base_url}")
+    print(f"   export MOONSHOT_BASE_URL={server.base_url}")
+    try:
+        server.httpd.serve_forever()
+    except KeyboardInterrupt:
+        print("\n👋 Stand-in Server beendet")
+    finally:
+        server.httpd.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Startzeit-Benchmark
+Misst die Import-Zeit der CLI/GUI-Einstiegspunkte mit -X importtime und prüft ein Zeitbudget
+
+Jeder Einstiegspunkt wird mehrfach in einem frischen Interpreter importiert;
+gewertet wird der Median der kumulativen Import-Zeit. Zusätzlich darf keiner
+der schweren Abhängigkeiten (openai, pydantic, dotenv, requests, TTS/STT)
+schon beim Import geladen werden - sie werden erst bei der ersten Verwendung
+nachgeladen. Exit-Code 1, wenn ein Budget überschritten wird.
+
+Starten:
+    python3 kimi_startup_benchmark.py
+    python3 kimi_startup_benchmark.py --runs 10 --output benchmarks/startup.json
+"""
+
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional, Sequence
+
+# Budget (ms, kumulative Import-Zeit) je Einstiegspunkt
+STARTUP_BUDGETS_MS = {
+    "kimi_client": 150,
+    "kimi_client_moonshot": 150,
+    "kimi_client_async": 200,
+    "kimi_chat": 50,
+    "kimi_gui": 250,
+    "kimi_gui_modern": 250,
+    "kimi_gui_moonshot": 250,
+    "kimi_gui_moonshot_elegant": 250,
+}
+
+# Dürfen beim Import eines Einstiegspunkts nicht geladen werden
+HEAVY_MODULES = ("openai", "httpx", "pydantic", "dotenv", "requests", "playsound", "pyttsx3", "speech_recognition")
+
+_LINE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)\s*$")
+
+
+def parse_importtime(output: str, module: str) -> Optional[Dict[str, Any]]:
+    """
+    -X importtime Ausgabe für einen Top-Level-Import auswerten
+
+    Args:
+        output: stderr des Interpreters
+        module: Name des importierten Einstiegspunkts
+
+    Returns:
+        Dict mit cumulative_ms, imported (alle dabei geladenen Module) und
+        direct (direkte Imports, nach Zeit sortiert) - None, wenn nicht gefunden
+    """
+    children: List[tuple] = []
+    for line in output.splitlines():
+        match = _LINE.match(line)
+        if not match:
+            continue
+        cumulative, indent, name = int(match.group(2)), len(match.group(3)) - 1, match.group(4)
+        if indent > 0:
+            children.append((indent, name, cumulative))
+            continue
+        if name == module:
+            # Ausgabe ist post-order: alle Kinder stehen direkt vor dem Modul
+            direct = sorted(((n, c) for i, n, c in children if i == 2), key=lambda item: -item[1])
+            return {
+                "cumulative_ms": cumulative / 1000.0,
+                "imported": sorted({n for _, n, _ in children}),
+                "direct": [{"module": n, "ms": round(c / 1000.0, 2)} for n, c in direct],
+            }
+        children = []
+    return None
+
+
+def measure_import(module: str, runs: int = 5, python: str = sys.executable) -> Dict[str, Any]:
+    """
+    Import-Zeit eines Einstiegspunkts in frischen Interpretern messen
+
+    Returns:
+        Dict mit import_ms (Median), runs_ms, heavy_imports und slowest (direkte Imports)
+    """
+    cwd = os.path.dirname(os.path.abspath(__file__))
+    timings = []
+    parsed = None
+    for _ in range(runs):
+        proc = subprocess.run([python, "-X", "importtime", "-c", f"import {module}"],
+                              capture_output=True, text=True, cwd=cwd)
+        parsed = parse_importtime(proc.stderr, module)
+        if proc.returncode != 0 or parsed is None:
+            raise RuntimeError(f"Import von {module} fehlgeschlagen:\n{proc.stderr[-2000:]}")
+        timings.append(parsed["cumulative_ms"])
+
+    heavy = sorted({name.split(".")[0] for name in parsed["imported"]} & set(HEAVY_MODULES))
+    return {
+        "module": module,
+        "import_ms": round(statistics.median(timings), 2),
+        "runs_ms": [round(t, 2) for t in timings],
+        "heavy_imports": heavy,
+        "slowest": parsed["direct"][:5],
+    }
+
+
+def check_budgets(results: Sequence[Dict[str, Any]], budgets: Dict[str, float],
+                  scale: float = 1.0) -> List[str]:
+    """Verstöße gegen Zeitbudget und Lazy-Import-Regel als Text-Liste"""
+    violations = []
+    for result in results:
+        budget = budgets.get(result["module"])
+        if budget is not None and result["import_ms"] > budget * scale:
+            violations.append(f"{result['module']}: {result['import_ms']:.1f} ms > Budget {budget * scale:.0f} ms")
+        if result["heavy_imports"]:
+            violations.append(f"{result['module']}: lädt beim Import {', '.join(result['heavy_imports'])}")
+    return violations
+
+
+def main():
+    """Startzeit aller Einstiegspunkte messen und Budgets prüfen"""
+    parser = argparse.ArgumentParser(description="Startzeit-Benchmark der Kimi CLI/GUI-Einstiegspunkte")
+    parser.add_argument("modules", nargs="*", default=list(STARTUP_BUDGETS_MS), help="Einstiegspunkte (Module)")
+    parser.add_argument("--runs", type=int, default=5, help="Messungen pro Einstiegspunkt (Median zählt)")
+    parser.add_argument("--budget-scale", type=float, default=1.0, help="Budgets skalieren (z.B. 2.0 für langsame CI)")
+    parser.add_argument("--output", default=None, help="Ergebnisse als JSON speichern")
+    args = parser.parse_args()
+
+    print("🚀 Kimi K2 Startzeit-Benchmark (-X importtime)\n")
+    results = []
+    for module in args.modules:
+        result = measure_import(module, args.runs)
+        results.append(result)
+        budget = STARTUP_BUDGETS_MS.get(module)
+        budget_text = f"/ {budget * args.budget_scale:.0f} ms" if budget is not None else ""
+        slowest = ", ".join(f"{s['module']} {s['ms']:.1f}" for s in result["slowest"][:3])
+        print(f"   {module:<27} {result['import_ms']:>7.1f} ms {budget_text:<10} ({slowest})")
+
+    if args.output:
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"budgets_ms": STARTUP_BUDGETS_MS, "budget_scale": args.budget_scale, "results": results},
+                      f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Ergebnisse gespeichert: {args.output}")
+
+    violations = check_budgets(results, STARTUP_BUDGETS_MS, args.budget_scale)
+    if violations:
+        print("\n❌ Budget überschritten:")
+        for violation in violations:
+            print(f"   {violation}")
+        sys.exit(1)
+    print("\n✅ Alle Einstiegspunkte im Budget")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,346 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Streaming-Ergebnis
+Iterierbares Stream-Objekt mit Gesamttext und Latenz-Metriken
+"""
+
+import queue
+import socket
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional
+
+# Wird an eine abgebrochene Antwort im Conversation-Verlauf angehängt
+TRUNCATED_MARKER = " [abgebrochen]"
+
+# Zeitfenster für das Zusammenfassen von Chunks (~ein bis zwei Bildschirm-Frames)
+DEFAULT_COALESCE_INTERVAL = 0.03
+
+_END = object()
+
+
+def abort_response(stream: Any):
+    """
+    HTTP-Response eines SDK-Streams sofort schließen - auch aus einem anderen Thread
+
+    close() allein weckt einen Thread, der gerade auf den nächsten Chunk wartet,
+    erst beim nächsten Paket; shutdown() auf dem Socket beendet das Lesen sofort
+    und der Server bemerkt den Abbruch.
+    """
+    response = getattr(stream, "response", None)
+    network_stream = (getattr(response, "extensions", None) or {}).get("network_stream")
+    if network_stream is not None:
+        try:
+            sock = network_stream.get_extra_info("socket")
+            if sock is not None:
+                sock.shutdown(socket.SHUT_RDWR)
+        except (OSError, AttributeError):
+            pass
+    close = getattr(stream, "close", None)
+    if close is not None:
+        try:
+            close()
+        except Exception:
+            pass
+
+
+def coalesce_chunks(chunks: Iterable[str], interval: float = DEFAULT_COALESCE_INTERVAL,
+                    max_chars: Optional[int] = None, on_abandon: Optional[Callable[[], None]] = None) -> Iterator[str]:
+    """
+    Kleine Stream-Chunks zu größeren Stücken zusammenfassen
+
+    Der erste Chunk wird sofort geliefert (TTFT bleibt unverändert), danach
+    werden alle Chunks gesammelt, die innerhalb von ``interval`` Sekunden
+    eintreffen, bzw. bis ``max_chars`` Zeichen erreicht sind. Gelesen wird in
+    einem Hintergrund-Thread, damit ein gesammelter Rest auch dann pünktlich
+    ausgeliefert wird, wenn der Upstream gerade stockt.
+
+    Args:
+        chunks: Quelle der Text-Chunks
+        interval: Maximale Verzögerung eines Chunks in Sekunden
+        max_chars: Optional - früher ausliefern, sobald so viele Zeichen gesammelt sind
+        on_abandon: Wird aufgerufen, wenn der Aufrufer vorzeitig aussteigt
+
+    Yields:
+        Zusammengefasste Text-Chunks
+    """
+    items: "queue.Queue" = queue.Queue()
+
+    def _read():
+        try:
+            for chunk in chunks:
+                items.put(chunk)
+            items.put(_END)
+        except BaseException as e:
+            items.put(e)
+
+    threading.Thread(target=_read, name="kimi-coalesce", daemon=True).start()
+
+    finished = False
+    buffer: List[str] = []
+    size = 0
+    deadline = 0.0
+    first = True
+    try:
+        while True:
+            try:
+                item = items.get(timeout=max(0.0, deadline - time.perf_counter()) if buffer else None)
+            except queue.Empty:
+                yield "".join(buffer)
+                buffer, size = [], 0
+                continue
+            if item is _END:
+                finished = True
+                if buffer:
+                    yield "".join(buffer)
+                return
+            if isinstance(item, BaseException):
+                finished = True
+                raise item
+            if first:
+                first = False
+                yield item
+                continue
+            if not buffer:
+                deadline = time.perf_counter() + interval
+            buffer.append(item)
+            size += len(item)
+            if max_chars is not None and size >= max_chars:
+                yield "".join(buffer)
+                buffer, size = [], 0
+    finally:
+        if not finished and on_abandon is not None:
+            on_abandon()
+
+
+class CancelToken:
+    """
+    Threadsicheres Abbruch-Signal für laufende Streams
+
+    Beispiel:
+        token = CancelToken()
+        stream = client.chat_stream(messages, cancel=token)
+        ...
+        token.cancel()   # z.B. aus dem GUI-Thread ("Stop"-Button)
+    """
+
+    def __init__(self):
+        self._event = threading.Event()
+        self._lock = threading.Lock()
+        self._callbacks: List[Callable[[], None]] = []
+
+    @property
+    def cancelled(self) -> bool:
+        return self._event.is_set()
+
+    def cancel(self):
+        """Abbrechen - registrierte Callbacks (z.B. Verbindung schließen) laufen sofort"""
+        with self._lock:
+            if self._event.is_set():
+                return
+            self._event.set()
+            callbacks, self._callbacks = self._callbacks, []
+        for callback in callbacks:
+            callback()
+
+    def on_cancel(self, callback: Callable[[], None]) -> Callable[[], None]:
+        """
+        Callback für den Abbruch registrieren (sofort ausgeführt, falls schon abgebrochen)
+
+        Returns:
+            Funktion, die den Callback wieder entfernt
+        """
+        with self._lock:
+            if not self._event.is_set():
+                self._callbacks.append(callback)
+                return lambda: self._remove(callback)
+        callback()
+        return lambda: None
+
+    def _remove(self, callback: Callable[[], None]):
+        with self._lock:
+            if callback in self._callbacks:
+                self._callbacks.remove(callback)
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        return self._event.wait(timeout)
+
+
+class StreamResult:
+    """
+    Ergebnis eines Streaming-Aufrufs
+
+    Verhält sich wie der bisherige Chunk-Generator (``for chunk in result``)
+    und sammelt nebenbei die Chunks in einer Liste, sodass der Gesamttext
+    ohne wiederholtes String-Anhängen verfügbar ist:
+
+    - ``text``: vollständige Antwort
+    - ``usage`` / ``finish_reason``: aus den Stream-Chunks, falls geliefert
+    - ``time_to_first_token``, ``tokens_per_second``, ``chunk_count``
+    - ``cancel()``: Stream abbrechen (threadsicher), danach ``truncated``
+    - ``coalesce()``: Chunks zeitlich gebündelt lesen (weniger Callbacks)
+    """
+
+    def __init__(self, producer: Callable[["StreamResult"], Iterator[str]],
+                 cancel_token: Optional[CancelToken] = None):
+        """
+        Args:
+            producer: Erzeugt den Chunk-Generator; erhält dieses Objekt, um
+                usage und finish_reason zu setzen und cancel_token zu beachten
+            cancel_token: Optional geteiltes Abbruch-Signal (Standard: eigenes)
+        """
+        self._producer = producer
+        self.cancel_token = cancel_token or CancelToken()
+        self._started = False
+        self.chunks: List[str] = []
+        self.usage: Optional[Dict[str, Any]] = None
+        self.finish_reason: Optional[str] = None
+        self.done = False
+
+        self.start_time: Optional[float] = None
+        self.first_token_time: Optional[float] = None
+        self.end_time: Optional[float] = None
+        self._text: Optional[str] = None
+        self._timers: List[threading.Timer] = []
+
+    def __iter__(self) -> Iterator[str]:
+        if self._started:
+            raise RuntimeError("StreamResult kann nur einmal iteriert werden")
+        self._started = True
+        self.start_time = time.perf_counter()
+        try:
+            for chunk in self._producer(self):
+                if self.cancel_token.cancelled:
+                    # Producer beendet sich selbst (Verlauf, Cache) - nur nichts mehr ausliefern
+                    continue
+                if self.first_token_time is None:
+                    self.first_token_time = time.perf_counter()
+                self.chunks.append(chunk)
+                self._text = None
+                yield chunk
+            self.done = True
+        finally:
+            self.end_time = time.perf_counter()
+            # Timeouts aus cancel_after() werden nach dem Ende nicht mehr gebraucht
+            for timer in self._timers:
+                timer.cancel()
+
+    def cancel(self):
+        """Stream abbrechen - schließt die HTTP-Verbindung, Iteration endet sofort"""
+        self.cancel_token.cancel()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_token.cancelled
+
+    @property
+    def truncated(self) -> bool:
+        """Abgebrochen, bevor die Antwort vollständig war"""
+        return self.cancel_token.cancelled and self.finish_reason is None
+
+    def cancel_after(self, timeout: float) -> "StreamResult":
+        """Stream nach timeout Sekunden abbrechen (z.B. Agent-Timeouts) - endet er vorher, entfällt der Timer"""
+        if self.end_time is not None:
+            return self
+        timer = threading.Timer(timeout, self.cancel)
+        timer.daemon = True
+        self._timers.append(timer)
+        timer.start()
+        self.cancel_token.on_cancel(timer.cancel)
+        return self
+
+    def coalesce(self, interval: float = DEFAULT_COALESCE_INTERVAL,
+                 max_chars: Optional[int] = None) -> Iterator[str]:
+        """
+        Chunks zeitlich gebündelt lesen - weniger UI-Callbacks bzw. flush()-Aufrufe
+
+        Der erste Chunk kommt sofort, danach höchstens ein Stück pro interval.
+        Steigt der Aufrufer vorzeitig aus, wird der Stream abgebrochen.
+        ``text``, ``chunks`` und die Metriken beziehen sich weiter auf die
+        einzelnen Chunks.
+        """
+        return coalesce_chunks(self, interval, max_chars, on_abandon=self.cancel)
+
+    def consume(self) -> "StreamResult":
+        """Stream vollständig lesen (z.B. wenn nur der Gesamttext benötigt wird)"""
+        if not self._started:
+            for _ in self:
+                pass
+        return self
+
+    @property
+    def text(self) -> str:
+        """Bisher empfangener Gesamttext"""
+        if self._text is None:
+            self._text = "".join(self.chunks)
+        return self._text
+
+    @property
+    def chunk_count(self) -> int:
+        return len(self.chunks)
+
+    @property
+    def time_to_first_token(self) -> Optional[float]:
+        """Sekunden bis zum ersten Chunk"""
+        if self.start_time is None or self.first_token_time is None:
+            return None
+        return self.first_token_time - self.start_time
+
+    @property
+    def duration(self) -> Optional[float]:
+        """Gesamtdauer des Streams in Sekunden"""
+        if self.start_time is None:
+            return None
+        end = self.end_time if self.end_time is not None else time.perf_counter()
+        return end - self.start_time
+
+    @property
+    def completion_tokens(self) -> int:
+        """Anzahl erzeugter Tokens (laut usage, sonst Chunk-Anzahl als Näherung)"""
+        if self.usage and self.usage.get("completion_tokens"):
+            return self.usage["completion_tokens"]
+        return self.chunk_count
+
+    @property
+    def tokens_per_second(self) -> Optional[float]:
+        """Generierungsrate ab dem ersten Token"""
+        if self.first_token_time is None or self.end_time is None:
+            return None
+        elapsed = self.end_time - self.first_token_time
+        if elapsed <= 0:
+            return None
+        return self.completion_tokens / elapsed
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """Latenz-Metriken als Dict"""
+        return {
+            "time_to_first_token": self.time_to_first_token,
+            "duration": self.duration,
+            "tokens_per_second": self.tokens_per_second,
+            "chunk_count": self.chunk_count,
+            "finish_reason": self.finish_reason,
+            "truncated": self.truncated,
+            "usage": self.usage,
+        }
+
+    def __str__(self) -> str:
+        return self.text
+
+
+def record_chunk_meta(result: Optional[StreamResult], chunk: Any):
+    """usage und finish_reason aus einem SDK-Chunk übernehmen"""
+    if result is None:
+        return
+    choices = getattr(chunk, "choices", None) or []
+    if choices:
+        if getattr(choices[0], "finish_reason", None):
+            result.finish_reason = choices[0].finish_reason
+        # Moonshot liefert usage im letzten Choice-Objekt
+        usage = getattr(choices[0], "usage", None)
+        if usage:
+            result.usage = usage if isinstance(usage, dict) else dict(usage)
+    usage = getattr(chunk, "usage", None)
+    if usage:
+        result.usage = usage.model_dump() if hasattr(usage, "model_dump") else dict(usage)
@@ -0,0 +1,302 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Tool-Loop
+Mehrere Runden Tool Calling - alle Tool-Calls einer Runde laufen parallel in einem begrenzten Pool
+"""
+
+import json
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, List, Optional
+
+# Erhält die geparsten Argumente eines Tool-Calls; das Ergebnis geht als JSON zurück ans Modell
+ToolHandler = Callable[[Dict[str, Any]], Any]
+
+# Sendet den Verlauf (mit Tools) und liefert die ChatCompletion; zweites Argument: tool_choice
+ModelCall = Callable[[List[Dict[str, Any]], str], Any]
+
+
+def _call_field(call: Any, name: str) -> Any:
+    """Feld eines Tool-Calls lesen (SDK-Objekt oder Dict)"""
+    return call.get(name) if isinstance(call, dict) else getattr(call, name, None)
+
+
+def tool_call_to_dict(call: Any) -> Dict[str, Any]:
+    """Tool-Call als JSON-fertiges Dict für den Verlauf"""
+    function = _call_field(call, "function")
+    return {
+        "id": _call_field(call, "id"),
+        "type": "function",
+        "function": {"name": _call_field(function, "name"), "arguments": _call_field(function, "arguments") or ""},
+    }
+
+
+def tool_result_content(result: Any) -> str:
+    """Ergebnis eines Tools als Nachrichteninhalt (Strings unverändert, sonst JSON)"""
+    if isinstance(result, str):
+        return result
+    return json.dumps(result, ensure_ascii=False, default=str)
+
+
+class ToolCallAssembler:
+    """
+    Tool-Call-Fragmente aus einem Stream (delta.tool_calls) zusammensetzen
+
+    Ein Call gilt als vollständig, sobald seine Argumente ein gültiges
+    JSON-Objekt ergeben oder ein Call mit höherem Index beginnt - nicht
+    erst am Ende des Streams. Fragmente können SDK-Objekte oder Dicts
+    (SSE-Fast-Path) sein.
+    """
+
+    def __init__(self):
+        self._calls: Dict[int, Dict[str, Any]] = {}
+        self._emitted: set = set()
+
+    @property
+    def calls(self) -> List[Dict[str, Any]]:
+        """Alle bisher gesehenen Calls in Index-Reihenfolge"""
+        return [self._calls[index] for index in sorted(self._calls)]
+
+    def feed(self, fragments: Optional[List[Any]]) -> List[Dict[str, Any]]:
+        """Fragmente eines Chunks übernehmen; liefert die Calls, die dadurch vollständig wurden"""
+        ready = []
+        for fragment in fragments or []:
+            index = _call_field(fragment, "index") or 0
+            call = self._calls.get(index)
+            if call is None:
+                # Ein neuer Index schließt alle vorherigen Calls ab
+                ready.extend(self._emit(i) for i in sorted(self._calls) if i < index and i not in self._emitted)
+                call = self._calls[index] = {"id": None, "type": "function", "function": {"name": "", "arguments": ""}}
+            function = _call_field(fragment, "function")
+            if _call_field(fragment, "id"):
+                call["id"] = _call_field(fragment, "id")
+            if function is not None:
+                call["function"]["name"] += _call_field(function, "name") or ""
+                call["function"]["arguments"] += _call_field(function, "arguments") or ""
+            if index not in self._emitted and self._complete(call):
+                ready.append(self._emit(index))
+        return ready
+
+    def finish(self) -> List[Dict[str, Any]]:
+        """Stream-Ende: alle noch offenen Calls"""
+        return [self._emit(index) for index in sorted(self._calls) if index not in self._emitted]
+
+    def _emit(self, index: int) -> Dict[str, Any]:
+        self._emitted.add(index)
+        return self._calls[index]
+
+    @staticmethod
+    def _complete(call: Dict[str, Any]) -> bool:
+        arguments = call["function"]["arguments"].rstrip()
+        # Nur parsen, wenn das Objekt geschlossen sein könnte (sonst quadratischer Aufwand)
+        if not call["id"] or not arguments.endswith("}"):
+            return False
+        try:
+            return isinstance(json.loads(arguments), dict)
+        except ValueError:
+            return False
+
+
+class ToolStats:
+    """Latenz und Fehler pro Tool (threadsicher, über mehrere Läufe)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._tools: Dict[str, Dict[str, Any]] = {}
+
+    def record(self, name: str, latency: float, error: bool = False):
+        with self._lock:
+            stats = self._tools.setdefault(name, {"calls": 0, "errors": 0, "total_time": 0.0, "max_time": 0.0})
+            stats["calls"] += 1
+            stats["total_time"] += latency
+            stats["max_time"] = max(stats["max_time"], latency)
+            if error:
+                stats["errors"] += 1
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            tools = {name: dict(stats) for name, stats in self._tools.items()}
+        for stats in tools.values():
+            stats["avg_time"] = round(stats["total_time"] / stats["calls"], 4)
+            stats["total_time"] = round(stats["total_time"], 4)
+            stats["max_time"] = round(stats["max_time"], 4)
+        return tools
+
+
+class ToolLoop:
+    """
+    Tool-Loop: Modell fragen, Tool-Calls ausführen, Ergebnisse zurückgeben - bis keine Calls mehr kommen
+
+    - Alle Tool-Calls einer Runde laufen gleichzeitig (höchstens ``max_workers``)
+    - Jedes Ergebnis (auch Fehler, unbekannte Tools, ungültige Argumente)
+      geht als ``tool``-Nachricht an das Modell zurück
+    - Ende bei einer Antwort ohne Tool-Calls, nach ``max_rounds`` Runden
+      (dann eine letzte Anfrage mit tool_choice="none") oder wenn
+      ``time_budget`` Sekunden verbraucht sind
+    - ``stream=True``: model_call liefert Chunks; jeder Tool-Call startet,
+      sobald seine Argumente vollständig sind - während das Modell noch
+      weitere Calls oder Text sendet
+    """
+
+    def __init__(self, model_call: ModelCall, handlers: Dict[str, ToolHandler], max_workers: int = 4,
+                 max_rounds: int = 8, time_budget: Optional[float] = None, stats: Optional[ToolStats] = None,
+                 stream: bool = False):
+        """
+        Args:
+            model_call: Sendet den Verlauf an das Modell (siehe ModelCall)
+            handlers: Tool-Name -> Funktion(arguments)
+            max_workers: Maximale Anzahl gleichzeitig laufender Tools
+            max_rounds: Maximale Anzahl Tool-Runden
+            time_budget: Optional Gesamtzeit in Sekunden (Tools, die länger laufen, gelten als Timeout)
+            stats: Optional ToolStats, in die zusätzlich gezählt wird (z.B. des Clients)
+            stream: model_call liefert einen Stream; Tools starten schon während des Streams
+        """
+        if max_workers < 1:
+            raise ValueError("max_workers muss mindestens 1 sein")
+        self.model_call = model_call
+        self.handlers = handlers
+        self.max_workers = max_workers
+        self.max_rounds = max_rounds
+        self.time_budget = time_budget
+        self.stats = stats
+        self.stream = stream
+
+    def _execute(self, call: Dict[str, Any]) -> Dict[str, Any]:
+        """Einen Tool-Call ausführen (im Pool)"""
+        name = call["function"]["name"]
+        start = time.perf_counter()
+        error = None
+        try:
+            handler = self.handlers.get(name)
+            if handler is None:
+                raise KeyError(f"Unbekanntes Tool: {name}")
+            try:
+                arguments = json.loads(call["function"]["arguments"] or "{}")
+            except ValueError as e:
+                raise ValueError(f"Ungültige Argumente für {name}: {e}")
+            content = tool_result_content(handler(arguments))
+        except Exception as e:
+            error = str(e)
+            content = json.dumps({"error": error}, ensure_ascii=False)
+        return {"id": call["id"], "name": name, "content": content, "error": error,
+                "latency": time.perf_counter() - start}
+
+    def _read_stream(self, chunks: Any, pool: ThreadPoolExecutor, execute: bool):
+        """Stream lesen: Text sammeln, Tool-Calls zusammensetzen und vollständige sofort starten"""
+        assembler = ToolCallAssembler()
+        parts: List[str] = []
+        futures: Dict[Any, Dict[str, Any]] = {}
+        early = 0
+        for chunk in chunks:
+            if not chunk.choices:
+                continue
+            delta = chunk.choices[0].delta
+            if delta.content:
+                parts.append(delta.content)
+            for call in assembler.feed(delta.tool_calls):
+                if execute:
+                    futures[pool.submit(self._execute, call)] = call
+                    early += 1
+        for call in assembler.finish():
+            if execute:
+                futures[pool.submit(self._execute, call)] = call
+        return "".join(parts) or None, assembler.calls, futures, early
+
+    def _remaining(self, started: float) -> Optional[float]:
+        if self.time_budget is None:
+            return None
+        return self.time_budget - (time.perf_counter() - started)
+
+    def run(self, messages: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Loop ausführen
+
+        Args:
+            messages: Start-Verlauf (System-Prompt, User-Nachricht, ...) - wird nicht verändert
+
+        Returns:
+            Dict mit content, messages (kompletter Verlauf), rounds, stop_reason
+            ("stop", "max_rounds", "time_budget"), tool_calls (pro Call: round,
+            name, latency, error), model_time, tool_time (Warten auf Tools nach
+            der Modellantwort) und early_calls (vor Stream-Ende gestartete Calls)
+        """
+        messages = list(messages)
+        started = time.perf_counter()
+        records: List[Dict[str, Any]] = []
+        model_time = tool_time = 0.0
+        rounds = early_calls = 0
+        content = None
+        stop_reason = "stop"
+
+        pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="kimi-tool")
+        try:
+            while True:
+                tool_choice = "auto" if rounds < self.max_rounds else "none"
+                call_start = time.perf_counter()
+                response = self.model_call(messages, tool_choice)
+                futures = None
+                if self.stream:
+                    content, calls, futures, early = self._read_stream(response, pool, tool_choice != "none")
+                    early_calls += early
+                else:
+                    message = response.choices[0].message
+                    content = message.content
+                    calls = [tool_call_to_dict(call) for call in (message.tool_calls or [])]
+                model_time += time.perf_counter() - call_start
+                if not calls or tool_choice == "none":
+                    if tool_choice == "none":
+                        stop_reason = "max_rounds"
+                    messages.append({"role": "assistant", "content": content or ""})
+                    break
+
+                rounds += 1
+                messages.append({"role": "assistant", "content": content or "", "tool_calls": calls})
+                round_start = time.perf_counter()
+                if futures is None:
+                    futures = {pool.submit(self._execute, call): call for call in calls}
+                done, pending = wait(futures, timeout=self._remaining(started))
+                tool_time += time.perf_counter() - round_start
+
+                # Nach Position zuordnen: IDs kommen vom Modell und können fehlen oder doppelt sein
+                positions = {id(call): i for i, call in enumerate(calls)}
+                results: List[Dict[str, Any]] = [{}] * len(calls)
+                for future in done:
+                    results[positions[id(futures[future])]] = future.result()
+                for future in pending:
+                    call = futures[future]
+                    future.cancel()
+                    results[positions[id(call)]] = {
+                        "id": call["id"], "name": call["function"]["name"], "error": "Timeout",
+                        "content": json.dumps({"error": "Zeitbudget überschritten"}),
+                        "latency": time.perf_counter() - round_start}
+
+                # Ergebnisse in der Reihenfolge der Calls zurückgeben
+                for result in results:
+                    messages.append({"role": "tool", "tool_call_id": result["id"], "name": result["name"],
+                                     "content": result["content"]})
+                    records.append({"round": rounds, "name": result["name"], "id": result["id"],
+                                    "latency": round(result["latency"], 4), "error": result["error"]})
+                    if self.stats is not None:
+                        self.stats.record(result["name"], result["latency"], result["error"] is not None)
+
+                remaining = self._remaining(started)
+                if pending or (remaining is not None and remaining <= 0):
+                    stop_reason = "time_budget"
+                    break
+        finally:
+            # Nach Zeitüberschreitung nicht auf hängende Tools warten
+            pool.shutdown(wait=stop_reason != "time_budget", cancel_futures=True)
+
+        return {
+            "content": content or "",
+            "messages": messages,
+            "rounds": rounds,
+            "stop_reason": stop_reason,
+            "tool_calls": records,
+            "model_time": round(model_time, 4),
+            "tool_time": round(tool_time, 4),
+            "early_calls": early_calls,
+        }
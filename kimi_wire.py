@@ -0,0 +1,245 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Kimi K2 Wire-Format
+Kompakte Request-Bodies (optional orjson), gzip/deflate-Kompression und Byte-Zählung pro Anfrage
+"""
+
+import gzip
+import importlib
+import json
+import os
+import threading
+import zlib
+from typing import Any, Dict, Optional
+
+# Bodies unterhalb dieser Größe werden nicht komprimiert (Overhead > Ersparnis)
+DEFAULT_COMPRESSION_THRESHOLD = 16 * 1024
+
+# Level 3: ~80% der Ersparnis von Level 6 bei einem Drittel der CPU-Zeit
+DEFAULT_COMPRESSION_LEVEL = 3
+
+COMPRESSION_ENCODINGS = ("gzip", "deflate")
+
+try:
+    import orjson
+except ImportError:  # optional
+    orjson = None
+
+
+def _default(obj: Any) -> Any:
+    # SDK-Objekte im Verlauf (z.B. eine Assistant-Message mit tool_calls)
+    if hasattr(obj, "model_dump"):
+        return obj.model_dump(exclude_unset=True)
+    raise TypeError(f"Nicht JSON-serialisierbar: {type(obj).__name__}")
+
+
+def dumps(obj: Any) -> bytes:
+    """JSON ohne Leerzeichen und ohne ASCII-Escapes als UTF-8 (orjson, falls installiert)"""
+    if orjson is not None:
+        return orjson.dumps(obj, default=_default)
+    return json.dumps(obj, ensure_ascii=False, separators=(",", ":"), default=_default).encode("utf-8")
+
+
+def compact_json_enabled(compact_json: Optional[bool]) -> bool:
+    """Parameter auswerten (None = Umgebungsvariable KIMI_COMPACT_JSON)"""
+    if compact_json is not None:
+        return compact_json
+    return os.getenv("KIMI_COMPACT_JSON", "0").lower() in ("1", "true", "yes")
+
+
+def compression_setting(compression: Optional[str]) -> Optional[str]:
+    """
+    Parameter auswerten (None = Umgebungsvariable KIMI_COMPRESSION)
+
+    Returns:
+        "gzip", "deflate" oder None (keine Kompression)
+    """
+    if compression is None:
+        compression = os.getenv("KIMI_COMPRESSION", "")
+    compression = compression.strip().lower()
+    if compression in ("", "0", "off", "false", "no", "none"):
+        return None
+    if compression not in COMPRESSION_ENCODINGS:
+        raise ValueError(f"Unbekannte Kompression: {compression} (erlaubt: gzip, deflate)")
+    return compression
+
+
+def compress(body: bytes, encoding: str, level: int = DEFAULT_COMPRESSION_LEVEL) -> bytes:
+    """Body mit gzip oder deflate (zlib-Format, wie von HTTP erwartet) komprimieren"""
+    if encoding == "gzip":
+        return gzip.compress(body, compresslevel=level, mtime=0)
+    return zlib.compress(body, level)
+
+
+def create_chat_completion(client: Any, params: Dict[str, Any], raw_stream: bool = False):
+    """
+    chat.completions.create mit vorab serialisiertem Body
+
+    Das SDK prüft und wandelt jeden Parameter typgesteuert um, bevor es den
+    Body serialisiert - bei langen Verläufen kostet das ein Vielfaches der
+    eigentlichen Serialisierung. Die Parameter sind hier bereits JSON-fertige
+    Dicts und werden direkt (orjson bzw. kompakt) an POST /chat/completions
+    übergeben; Antwort- und Stream-Objekte sind dieselben wie bei create().
+
+    Args:
+        client: OpenAI-Client
+        params: Parameter wie bei chat.completions.create
+        raw_stream: Ungelesene APIResponse liefern (wie with_streaming_response)
+    """
+    from openai import Stream
+    from openai._constants import RAW_RESPONSE_HEADER
+    from openai.types.chat import ChatCompletion, ChatCompletionChunk
+    headers = {"Content-Type": "application/json"}
+    if raw_stream:
+        headers[RAW_RESPONSE_HEADER] = "stream"
+    return client.post(
+        "/chat/completions",
+        content=dumps(params),
+        cast_to=ChatCompletion,
+        options={"headers": headers},
+        stream=bool(params.get("stream")),
+        stream_cls=Stream[ChatCompletionChunk],
+    )
+
+
+class WireStats:
+    """Gesendete Request-Bodies: Bytes vor und nach der Kompression (threadsicher)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats = {"requests": 0, "compressed": 0, "body_bytes": 0, "wire_bytes": 0,
+                       "uncompressed_fallbacks": 0}
+        self._last: Optional[Dict[str, Any]] = None
+
+    def record(self, body_bytes: int, wire_bytes: int, encoding: Optional[str]):
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["body_bytes"] += body_bytes
+            self._stats["wire_bytes"] += wire_bytes
+            if encoding:
+                self._stats["compressed"] += 1
+            self._last = {"body_bytes": body_bytes, "wire_bytes": wire_bytes, "encoding": encoding}
+
+    def count_fallback(self):
+        with self._lock:
+            self._stats["uncompressed_fallbacks"] += 1
+
+    @property
+    def last_request(self) -> Optional[Dict[str, Any]]:
+        """Bytes der zuletzt gesendeten Anfrage"""
+        with self._lock:
+            return dict(self._last) if self._last else None
+
+    def as_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            stats: Dict[str, Any] = dict(self._stats)
+            stats["last_request"] = dict(self._last) if self._last else None
+        requests = stats["requests"]
+        stats["avg_wire_bytes"] = round(stats["wire_bytes"] / requests) if requests else 0
+        stats["saved_bytes"] = stats["body_bytes"] - stats["wire_bytes"]
+        stats["saving_ratio"] = round(stats["saved_bytes"] / stats["body_bytes"], 4) if stats["body_bytes"] else 0.0
+        return stats
+
+
+class WireOptions:
+    """
+    Kompressions-Einstellungen und Byte-Statistik eines Clients
+
+    Wird über pooled_http_client in den HTTP-Client des SDK eingehängt: mit
+    Kompression als Transport-Schicht, ohne nur als Event-Hook zum Zählen der Bytes.
+    """
+
+    def __init__(self, compression: Optional[str] = None, threshold: Optional[int] = None,
+                 level: int = DEFAULT_COMPRESSION_LEVEL):
+        """
+        Args:
+            compression: "gzip", "deflate" oder "off" (Standard aus KIMI_COMPRESSION, aus)
+            threshold: Mindestgröße des Bodies in Bytes (Standard aus KIMI_COMPRESSION_THRESHOLD oder 16 KiB)
+            level: zlib-Kompressionslevel (1-9)
+        """
+        self.compression = compression_setting(compression)
+        if threshold is None:
+            threshold = int(os.getenv("KIMI_COMPRESSION_THRESHOLD", str(DEFAULT_COMPRESSION_THRESHOLD)))
+        self.threshold = threshold
+        self.level = level
+        self.stats = WireStats()
+
+    def wrap(self, transport: Any) -> Any:
+        """HTTP-Transport des SDK mit Kompression und Byte-Zählung umhüllen"""
+        return _WireTransport(transport, self)
+
+    def install(self, http_client: Any):
+        """
+        Alle Transporte eines HTTP-Clients umhüllen - den Standard-Transport und
+        die Proxy-Mounts, die der Client aus HTTP(S)_PROXY/ALL_PROXY angelegt hat
+        """
+        http_client._transport = self.wrap(http_client._transport)
+        http_client._mounts = {pattern: transport if transport is None else self.wrap(transport)
+                               for pattern, transport in http_client._mounts.items()}
+
+    def observe_request(self, request: Any):
+        """Event-Hook ohne Kompression: gesendete Bytes zählen"""
+        if request.method in ("POST", "PUT", "PATCH"):
+            body = request.read()
+            if body:
+                self.stats.record(len(body), len(body), None)
+
+    def as_dict(self) -> Dict[str, Any]:
+        stats = self.stats.as_dict()
+        stats["compression"] = self.compression
+        stats["threshold"] = self.threshold
+        return stats
+
+
+def _http_module():
+    """HTTP-Bibliothek des openai-SDK (httpx oder ein kompatibler Fork)"""
+    import openai
+    return importlib.import_module(openai.DefaultHttpxClient.__mro__[1].__module__.split(".")[0])
+
+
+class _WireTransport:
+    """Komprimiert POST-Bodies ab dem Schwellwert und zählt Bytes"""
+
+    def __init__(self, transport: Any, options: WireOptions):
+        self._transport = transport
+        self._options = options
+        self._http = _http_module()
+
+    def handle_request(self, request: Any) -> Any:
+        options = self._options
+        body = request.read() if request.method in ("POST", "PUT", "PATCH") else b""
+        encoding = options.compression
+        if not body or not encoding or len(body) < options.threshold or "content-encoding" in request.headers:
+            if body:
+                options.stats.record(len(body), len(body), None)
+            return self._transport.handle_request(request)
+
+        data = compress(body, encoding, options.level)
+        headers = request.headers.copy()
+        headers["Content-Encoding"] = encoding
+        headers["Content-Length"] = str(len(data))
+        compressed = self._http.Request(request.method, request.url, headers=headers, content=data,
+                                        extensions=request.extensions)
+        response = self._transport.handle_request(compressed)
+        if response.status_code != 415:
+            options.stats.record(len(body), len(data), encoding)
+            return response
+
+        # Endpoint akzeptiert keine komprimierten Bodies: unkomprimiert wiederholen und abschalten
+        response.close()
+        options.compression = None
+        options.stats.count_fallback()
+        options.stats.record(len(body), len(body), None)
+        return self._transport.handle_request(request)
+
+    def close(self):
+        self._transport.close()
+
+    def __enter__(self):
+        self._transport.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        self._transport.__exit__(*exc)
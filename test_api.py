@@ -53,6 +53,10 @@ def main():
         ("https://api.moonshot.ai/v1", "Moonshot AI (Alternative)"),
     ]
     
+    # Eigener Endpoint (z.B. lokaler Stand-in Server) zuerst testen
+    if os.getenv("MOONSHOT_BASE_URL"):
+        endpoints.insert(0, (os.getenv("MOONSHOT_BASE_URL"), "MOONSHOT_BASE_URL"))
+    
     for base_url, description in endpoints:
         success = run_api_endpoint(base_url, description)
         if success:
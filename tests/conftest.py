@@ -0,0 +1,33 @@
+import types
+
+import pytest
+
+from kimi_keypool import set_shared_key_pool
+from kimi_ratelimit import set_shared_limiter
+from kimi_standin_server import StandinConfig, StandinServer
+
+
+class DummyStatusError(Exception):
+    """API-Fehler mit status_code und optionalen Response-Headern (z.B. Retry-After)"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = types.SimpleNamespace(headers=headers or {})
+
+
+@pytest.fixture
+def standin():
+    """Lokaler Moonshot Stand-in Server ohne Verzögerungen"""
+    with StandinServer(StandinConfig(retry_after=0)) as server:
+        yield server
+
+
+@pytest.fixture(autouse=True)
+def fresh_limiter():
+    """Jeder Test bekommt einen frischen prozessweiten Rate-Limiter und Key-Pool"""
+    set_shared_limiter(None)
+    set_shared_key_pool(None)
+    yield
+    set_shared_limiter(None)
+    set_shared_key_pool(None)
@@ -0,0 +1,81 @@
+import asyncio
+import types
+
+import kimi_client_async
+from kimi_client_async import AsyncKimiClient
+
+
+def _chunk(text):
+    delta = types.SimpleNamespace(content=text)
+    return types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])
+
+
+class DummyStream:
+    def __init__(self, parts):
+        self.parts = parts
+
+    def __aiter__(self):
+        return self._gen()
+
+    async def _gen(self):
+        for part in self.parts:
+            yield _chunk(part)
+
+
+class DummyCompletions:
+    def __init__(self):
+        self.calls = []
+
+    async def create(self, **kwargs):
+        self.calls.append(kwargs)
+        if kwargs.get("stream"):
+            return DummyStream(["Hal", "lo"])
+        message = types.SimpleNamespace(content="Antwort", tool_calls=None)
+        choice = types.SimpleNamespace(message=message, finish_reason="stop")
+        return types.SimpleNamespace(choices=[choice])
+
+
+def _patch(monkeypatch):
+    completions = DummyCompletions()
+    dummy = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    monkeypatch.setattr(kimi_client_async, "_shared_client", lambda *a: dummy)
+    return completions
+
+
+def test_conversation_stream_keeps_history(monkeypatch):
+    completions = _patch(monkeypatch)
+    client = AsyncKimiClient(api_key="sk-test")
+
+    async def run():
+        return [c async for c in client.conversation_stream("Hi", "sys")]
+
+    assert asyncio.run(run()) == ["Hal", "lo"]
+    assert client.get_conversation_history() == [
+        {"role": "system", "content": "sys"},
+        {"role": "user", "content": "Hi"},
+        {"role": "assistant", "content": "Hallo"},
+    ]
+    assert completions.calls[0]["stream"] is True
+
+
+def test_concurrent_chats(monkeypatch):
+    completions = _patch(monkeypatch)
+    clients = [AsyncKimiClient(api_key="sk-test") for _ in range(5)]
+
+    async def run():
+        return await asyncio.gather(*(c.conversation_chat(str(i)) for i, c in enumerate(clients)))
+
+    assert asyncio.run(run()) == ["Antwort"] * 5
+    assert len(completions.calls) == 5
+    assert all(len(c.conversation_history) == 2 for c in clients)
+
+
+def test_shared_client_per_loop():
+    async def run():
+        first = kimi_client_async._shared_client("sk-test", "http://localhost/v1")
+        second = kimi_client_async._shared_client("sk-test", "http://localhost/v1")
+        await kimi_client_async.close_shared_clients()
+        return first, second
+
+    first, second = asyncio.run(run())
+    assert first is second
@@ -0,0 +1,31 @@
+import time
+
+from kimi_batch import run_batch
+from kimi_client import KimiClient
+
+
+def test_run_batch_preserves_order_and_errors():
+    def work(n):
+        time.sleep(0.01 * (5 - n))
+        if n == 3:
+            raise RuntimeError("boom")
+        return n * 2
+
+    progress = []
+    results = run_batch(work, [0, 1, 2, 3, 4], concurrency=5,
+                        on_progress=lambda done, total, item: progress.append((done, total)))
+
+    assert [r["result"] for r in results] == [0, 2, 4, None, 8]
+    assert results[3]["error"] == "boom"
+    assert [p[0] for p in progress] == [1, 2, 3, 4, 5]
+    assert all(p[1] == 5 for p in progress)
+
+
+def test_chat_many_uses_system_prompt(monkeypatch):
+    client = KimiClient(api_key="sk-test")
+    monkeypatch.setattr(client, "chat", lambda message, system_prompt=None: f"{system_prompt}:{message}")
+
+    results = client.chat_many(["a", "b"], concurrency=2, system_prompt="sys")
+
+    assert [r["result"] for r in results] == ["sys:a", "sys:b"]
+    assert run_batch(len, []) == []
@@ -0,0 +1,39 @@
+import pytest
+
+from kimi_benchmark import build_report, compare_reports, percentile, run_suite
+
+
+def test_percentile_interpolates():
+    values = [1.0, 2.0, 3.0, 4.0]
+    assert percentile(values, 50) == pytest.approx(2.5)
+    assert percentile(values, 100) == 4.0
+    assert percentile([], 50) is None
+
+
+def test_suite_measures_clients_against_raw_baseline(standin):
+    rows = run_suite(standin.base_url, concurrency_levels=[2], requests=4)
+
+    scenarios = {(r["client"], r["operation"]) for r in rows}
+    assert ("raw", "chat_stream") in scenarios
+    assert ("KimiMoonshotClient", "tool_call") in scenarios
+    # KimiClient bietet kein tool_call
+    assert ("KimiClient", "tool_call") not in scenarios
+
+    for row in rows:
+        assert row["errors"] == 0, row["first_error"]
+        assert row["latency_ms"]["p50"] <= row["latency_ms"]["p99"]
+        if row["client"] != "raw":
+            assert "latency_p50_ms" in row["overhead"]
+
+    stream = next(r for r in rows if r["client"] == "KimiClient" and r["operation"] == "chat_stream")
+    assert stream["ttft_ms"]["p50"] > 0 and stream["chunks_per_sec"] > 0
+
+    savings = build_report(rows, {})["sse_cpu_savings"]
+    assert {row["client"] for row in savings} == {"KimiClient", "KimiMoonshotClient"}
+
+
+def test_compare_reports_computes_change():
+    row = {"client": "KimiClient", "operation": "chat", "concurrency": 1}
+    old = build_report([dict(row, latency_ms={"p50": 10.0})], {})
+    new = build_report([dict(row, latency_ms={"p50": 12.0})], {})
+    assert compare_reports(old, new)[0]["change_pct"] == 20.0
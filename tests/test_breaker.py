@@ -0,0 +1,88 @@
+import time
+
+import pytest
+
+import kimi_ratelimit
+from kimi_breaker import CLOSED, HALF_OPEN, OPEN, CircuitBreaker, ModelBreakers
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_standin_server import StandinConfig, StandinServer
+
+
+def _client(server, breakers):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, breakers=breakers)
+    client.model = "moonshot-v1-128k"
+    return client
+
+
+def _models(server):
+    return [request["model"] for request in server.requests]
+
+
+def test_breaker_opens_probes_and_closes():
+    transitions = []
+    breaker = CircuitBreaker("m", failure_threshold=2, open_seconds=0.05,
+                             on_transition=lambda model, old, new, reason: transitions.append((old, new)))
+    breaker.record_failure("503")
+    assert breaker.allow()
+    breaker.record_failure("503")
+    assert breaker.state == OPEN and not breaker.allow()
+
+    time.sleep(0.06)
+    assert breaker.allow() and breaker.state == HALF_OPEN
+    assert not breaker.allow()  # nur eine Probe gleichzeitig
+    breaker.record_success()
+    assert breaker.state == CLOSED and breaker.allow()
+    assert transitions == [(CLOSED, OPEN), (OPEN, HALF_OPEN), (HALF_OPEN, CLOSED)]
+
+
+def test_failing_model_falls_back_and_is_skipped_once_open():
+    with StandinServer(StandinConfig(retry_after=0, failing_models=["moonshot-v1-128k"])) as server:
+        events = []
+        breakers = ModelBreakers(failure_threshold=2, open_seconds=60, on_event=events.append)
+        client = _client(server, breakers)
+        for _ in range(3):
+            assert client.chat("Hallo").startswith("Stand-in-Antwort")
+
+        # Je ein Retry auf 128k für die ersten beiden Anfragen, danach direkt 32k
+        assert _models(server) == ["moonshot-v1-128k"] * 2 + ["moonshot-v1-32k"] \
+            + ["moonshot-v1-128k"] * 2 + ["moonshot-v1-32k"] * 2
+        stats = client.get_model_info()["circuit_breakers"]
+        assert stats["models"]["moonshot-v1-128k"]["state"] == OPEN
+        assert stats["fallback_calls"] == 3
+        assert [(e["model"], e["from"], e["to"]) for e in events] == [("moonshot-v1-128k", CLOSED, OPEN)]
+
+
+def test_slo_breaches_open_and_half_open_probe_recovers():
+    config = StandinConfig(model_ttft={"moonshot-v1-128k": 0.3})
+    with StandinServer(config) as server:
+        breakers = ModelBreakers(failure_threshold=2, open_seconds=0.2, slo=0.15)
+        client = _client(server, breakers)
+        for _ in range(3):
+            assert client.chat("Hallo")
+        assert _models(server) == ["moonshot-v1-128k"] * 2 + ["moonshot-v1-32k"]
+        assert breakers.get_stats()["models"]["moonshot-v1-128k"]["slo_breaches"] == 2
+
+        config.model_ttft.clear()
+        time.sleep(0.25)
+        assert client.chat("Hallo")
+        assert _models(server)[-1] == "moonshot-v1-128k"
+        assert [e["to"] for e in breakers.events] == [OPEN, HALF_OPEN, CLOSED]
+
+
+def test_all_models_open_fails_fast_and_small_fallbacks_are_skipped(monkeypatch):
+    monkeypatch.setattr(kimi_ratelimit, "backoff_delay", lambda *args: 0.0)
+    breakers = ModelBreakers(fallbacks={"moonshot-v1-128k": ["moonshot-v1-32k", "moonshot-v1-8k"]})
+    assert breakers.candidates("moonshot-v1-128k", needed_tokens=20000) == ["moonshot-v1-128k", "moonshot-v1-32k"]
+
+    failing = ["moonshot-v1-128k", "moonshot-v1-32k"]
+    with StandinServer(StandinConfig(retry_after=0, failing_models=failing)) as server:
+        client = _client(server, ModelBreakers(fallbacks={"moonshot-v1-128k": ["moonshot-v1-32k"]},
+                                               failure_threshold=1, open_seconds=60))
+        with pytest.raises(Exception):
+            client.chat("Hallo")
+        sent = len(server.requests)
+        start = time.perf_counter()
+        with pytest.raises(Exception, match="Circuit Breaker offen"):
+            client.chat("Hallo")
+        assert time.perf_counter() - start < 0.1
+        assert len(server.requests) == sent
@@ -0,0 +1,80 @@
+import types
+
+from kimi_cache import ResponseCache
+from kimi_client_moonshot import KimiMoonshotClient
+
+
+class DummyCompletions:
+    def __init__(self):
+        self.calls = 0
+
+    def create(self, **kwargs):
+        self.calls += 1
+        if kwargs.get("stream"):
+            delta = types.SimpleNamespace(content="Gecachte Antwort")
+            return iter([types.SimpleNamespace(choices=[types.SimpleNamespace(delta=delta)])])
+        message = types.SimpleNamespace(content="Antwort")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+
+def _client(cache):
+    client = KimiMoonshotClient(api_key="sk-test", cache=cache)
+    completions = DummyCompletions()
+    client.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=completions))
+    return client, completions
+
+
+def test_key_is_stable():
+    messages = [{"role": "user", "content": "hi"}]
+    key = ResponseCache.make_key("http://a/v1", "m", 0, 10, messages)
+    assert key == ResponseCache.make_key("http://a/v1", "m", 0, 10, list(messages))
+    assert key != ResponseCache.make_key("http://a/v1", "m", 0, 11, messages)
+    assert key != ResponseCache.make_key("http://b/v1", "m", 0, 10, messages)
+
+
+def test_lru_and_ttl(monkeypatch):
+    cache = ResponseCache(max_entries=2, ttl=10)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    cache.get("a")
+    cache.set("c", "3")
+    assert cache.get("b") is None
+    assert cache.get("a") == "1"
+
+    now = __import__("time").time()
+    monkeypatch.setattr("kimi_cache.time.time", lambda: now + 60)
+    assert cache.get("a") is None
+
+
+def test_sqlite_tier_survives_restart(tmp_path):
+    db = str(tmp_path / "cache.db")
+    first = ResponseCache(db_path=db)
+    first.set("k", "persistiert")
+    first.close()
+
+    second = ResponseCache(db_path=db)
+    assert second.get("k") == "persistiert"
+    assert second.get("k") == "persistiert"
+    stats = second.get_stats()
+    assert stats["disk_hits"] == 1 and stats["memory_hits"] == 1
+
+
+def test_client_skips_network_on_hit():
+    client, completions = _client(ResponseCache())
+    client.temperature = 0
+    assert client.chat("hi") == "Antwort"
+    assert client.chat("hi") == "Antwort"
+    assert completions.calls == 1
+
+    streamed = "".join(client.chat_stream([{"role": "user", "content": "x"}]))
+    replayed = list(client.chat_stream([{"role": "user", "content": "x"}]))
+    assert "".join(replayed) == streamed == "Gecachte Antwort"
+    assert completions.calls == 2
+
+
+def test_default_policy_ignores_sampling_requests():
+    client, completions = _client(ResponseCache())
+    client.temperature = 0.6
+    client.chat("hi")
+    client.chat("hi")
+    assert completions.calls == 2
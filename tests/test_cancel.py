@@ -0,0 +1,91 @@
+import threading
+import time
+
+import pytest
+
+from kimi_cache import ResponseCache
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_k2_agent import KimiK2Agent
+from kimi_standin_server import StandinConfig, StandinServer
+from kimi_stream import TRUNCATED_MARKER, CancelToken
+
+
+@pytest.fixture
+def slow_standin():
+    """Stand-in Server, der langsam Tokens liefert (200 ms pro Chunk)"""
+    with StandinServer(StandinConfig(token_delay=0.2, response_tokens=40, retry_after=0)) as server:
+        yield server
+
+
+def test_cancel_from_another_thread_returns_immediately(slow_standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=slow_standin.base_url)
+    stream = client.conversation_stream("Erzähl eine lange Geschichte")
+    first_chunk = threading.Event()
+    finished = threading.Event()
+
+    def consume():
+        for _ in stream:
+            first_chunk.set()
+        finished.set()
+
+    threading.Thread(target=consume, daemon=True).start()
+    assert first_chunk.wait(5)
+    cancelled_at = time.perf_counter()
+    stream.cancel()
+    assert finished.wait(1)
+    assert time.perf_counter() - cancelled_at < 0.1
+
+    assert stream.truncated and stream.chunk_count < 40
+    last = client.conversation_history[-1]
+    assert last["role"] == "assistant" and last["content"] == stream.text + TRUNCATED_MARKER
+
+    # Der Server bemerkt die geschlossene Verbindung beim nächsten Chunk
+    deadline = time.time() + 2
+    while slow_standin.get_stats().get("streams_aborted", 0) == 0 and time.time() < deadline:
+        time.sleep(0.02)
+    assert slow_standin.get_stats()["streams_aborted"] == 1
+
+
+def test_cancelled_token_sends_no_request(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url)
+    token = CancelToken()
+    token.cancel()
+
+    stream = client.chat_stream([{"role": "user", "content": "Hallo"}], cancel=token)
+    assert list(stream) == []
+    assert stream.truncated
+    assert standin.get_stats()["requests"] == 0
+
+
+def test_truncated_answers_are_not_cached(slow_standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=slow_standin.base_url,
+                                cache=ResponseCache(only_deterministic=False))
+    messages = [{"role": "user", "content": "Hallo"}]
+    stream = client.chat_stream(messages).cancel_after(0.3)
+    stream.consume()
+    assert stream.truncated and stream.text
+
+    assert client.cache.get_stats()["stores"] == 0
+
+
+def test_agent_timeout_cancels_the_stream(slow_standin, monkeypatch):
+    monkeypatch.setenv("MOONSHOT_API_KEY", "sk-standin")
+    monkeypatch.setenv("MOONSHOT_BASE_URL", slow_standin.base_url)
+    agent = KimiK2Agent(response_timeout=0.3)
+
+    start = time.perf_counter()
+    answer = agent.ask("Plane die nächsten Schritte")
+    assert time.perf_counter() - start < 1.0
+    assert answer.startswith("Stand-in-Antwort")
+    assert agent.client.conversation_history[-1]["content"].endswith(TRUNCATED_MARKER)
+
+
+def test_finished_stream_stops_its_timeout_timer(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url)
+    stream = client.chat_stream([{"role": "user", "content": "Hallo"}]).cancel_after(30)
+    stream.consume()
+
+    assert not stream.cancelled and not stream.truncated
+    for timer in stream._timers:
+        timer.join(1)
+        assert not timer.is_alive()
@@ -0,0 +1,120 @@
+import threading
+import time
+
+import pytest
+
+from conftest import DummyStatusError
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_concurrency import AdaptiveConcurrency
+from kimi_standin_server import StandinConfig, StandinServer
+
+
+def test_additive_increase_and_multiplicative_decrease():
+    limiter = AdaptiveConcurrency(initial=2, max_limit=4, cooldown=0)
+    # +increase/limit pro Erfolg, also etwa +1 pro Fenster von limit Anfragen
+    for _ in range(6):
+        limiter.call(lambda: None)
+    assert limiter.limit == 4
+    for _ in range(20):
+        limiter.call(lambda: None)
+    assert limiter.limit == 4
+
+    with pytest.raises(DummyStatusError):
+        limiter.call(lambda: (_ for _ in ()).throw(DummyStatusError(429)))
+    assert limiter.limit == 2
+    # 400 sagt nichts über die Last aus
+    with pytest.raises(DummyStatusError):
+        limiter.call(lambda: (_ for _ in ()).throw(DummyStatusError(400)))
+    assert limiter.limit == 2
+
+    stats = limiter.get_stats()
+    assert stats["decreases"] == 1 and stats["overloads"] == 1 and stats["peak_limit"] == 4
+
+
+def test_latency_spikes_reduce_once_per_cooldown():
+    limiter = AdaptiveConcurrency(initial=8, latency_factor=3.0, cooldown=60)
+    for _ in range(5):
+        limiter.acquire()
+        limiter.release(latency=0.1)
+    for _ in range(3):
+        limiter.acquire()
+        limiter.release(latency=1.0)
+    stats = limiter.get_stats()
+    assert stats["latency_spikes"] == 3 and stats["decreases"] == 1
+    assert limiter.limit == 4
+    assert stats["baseline_latency"] == pytest.approx(0.1)
+
+
+def test_acquire_blocks_at_the_limit():
+    limiter = AdaptiveConcurrency(initial=1, max_limit=1)
+    limiter.acquire()
+    entered = threading.Event()
+
+    def second():
+        limiter.acquire()
+        entered.set()
+        limiter.release()
+
+    threading.Thread(target=second, daemon=True).start()
+    assert not entered.wait(0.1)
+    limiter.release(latency=0.01)
+    assert entered.wait(1)
+
+
+def test_client_backs_off_on_429_and_recovers(standin):
+    limiter = AdaptiveConcurrency(initial=8, max_limit=8, cooldown=0)
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, concurrency=limiter)
+    standin.fail_next(429, times=2)
+
+    start = time.perf_counter()
+    results = client.chat_many([f"Frage {i}" for i in range(16)])
+    assert all(item["error"] is None for item in results)
+    assert time.perf_counter() - start < 5
+
+    stats = client.get_model_info()["concurrency"]
+    assert stats["overloads"] == 2 and stats["decreases"] == 2
+    assert stats["in_flight"] == 0
+    assert 1 <= stats["limit"] <= 8 and stats["increases"] >= 1
+
+
+def test_streams_hold_their_slot_until_consumed():
+    limiter = AdaptiveConcurrency(initial=2, max_limit=2)
+    with StandinServer(StandinConfig(retry_after=0, token_delay=0.02, response_tokens=10)) as server:
+        client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, concurrency=limiter)
+
+        first = iter(client.chat_stream([{"role": "user", "content": "Erster Stream"}]))
+        assert next(first)
+        assert limiter.in_flight == 1
+        assert "".join(first) and limiter.in_flight == 0
+        # Bewertet wird der erste Chunk, nicht der ganze Stream (10 x 20 ms)
+        stats = limiter.get_stats()
+        assert stats["baseline_first_chunk"] < 0.15 and stats["baseline_latency"] is None
+
+        abandoned = client.chat_stream([{"role": "user", "content": "Abgebrochen"}])
+        chunks = iter(abandoned)
+        next(chunks)
+        assert limiter.in_flight == 1
+        abandoned.cancel()
+        deadline = time.monotonic() + 2
+        while limiter.in_flight and time.monotonic() < deadline:
+            time.sleep(0.01)
+        assert limiter.in_flight == 0
+
+
+def test_slow_but_healthy_streams_do_not_shrink_the_limit():
+    limiter = AdaptiveConcurrency(initial=4, max_limit=4, min_spike=0.05, cooldown=0)
+    for _ in range(5):
+        limiter.call(lambda: "schnell")
+
+    def slow_stream():
+        for i in range(5):
+            yield f"Chunk {i}"
+            time.sleep(0.05)
+
+    for _ in range(3):
+        assert len(list(limiter.call(slow_stream, stream=True))) == 5
+
+    stats = limiter.get_stats()
+    assert stats["decreases"] == 0 and stats["latency_spikes"] == 0
+    assert stats["limit"] == 4 and stats["in_flight"] == 0
+    assert stats["baseline_first_chunk"] < 0.05
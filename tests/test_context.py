@@ -0,0 +1,91 @@
+from kimi_context import ConversationWindow, FOLD_MARKER, context_window_for, estimate_tokens
+import kimi_context
+
+
+def _history(turns, size=400):
+    history = [{"role": "system", "content": "sys"}]
+    for i in range(turns):
+        history.append({"role": "user", "content": f"frage {i} " + "x" * size})
+        history.append({"role": "assistant", "content": f"antwort {i} " + "y" * size})
+    return history
+
+
+def test_context_window_for_models():
+    assert context_window_for("moonshot-v1-8k") == 8 * 1024
+    assert context_window_for("moonshot-v1-32k") == 32 * 1024
+    assert context_window_for("kimi-k2-0711-preview") == 128 * 1024
+
+
+def test_drop_keeps_system_prompt_and_latest_turn():
+    window = ConversationWindow(max_budget=500)
+    history = _history(10)
+    history.append({"role": "user", "content": "letzte frage"})
+
+    window.fit(history, "moonshot-v1-8k", 100)
+
+    assert history[0] == {"role": "system", "content": "sys"}
+    assert history[-1]["content"] == "letzte frage"
+    assert history[1]["role"] == "user"
+    assert window.count(history) <= 500
+    assert window.dropped_messages > 0
+
+
+def test_estimates_are_incremental(monkeypatch):
+    window = ConversationWindow()
+    history = _history(3)
+    window.count(history)
+
+    calls = []
+    original = kimi_context.estimate_message_tokens
+    monkeypatch.setattr(kimi_context, "estimate_message_tokens", lambda m: calls.append(m) or original(m))
+    history.append({"role": "user", "content": "neu"})
+    window.fit(history, "moonshot-v1-128k", 4096)
+
+    assert len(calls) == 1
+
+
+def test_fold_leaves_note_after_system_prompt():
+    window = ConversationWindow(max_budget=600, strategy="fold")
+    history = _history(8)
+    history.append({"role": "user", "content": "weiter"})
+
+    window.fit(history, "moonshot-v1-8k", 100)
+
+    assert history[1]["role"] == "system"
+    assert history[1]["content"].startswith(FOLD_MARKER)
+    assert "antwort" in history[1]["content"]
+    assert window.count(history) <= 600
+    assert estimate_tokens("abcd" * 10) == 10
+
+
+def test_select_model_tier_upgrades_with_size():
+    from kimi_context import select_model_tier
+    assert select_model_tier(200, 1000) == "moonshot-v1-8k"
+    assert select_model_tier(10000, 4096) == "moonshot-v1-32k"
+    assert select_model_tier(60000, 4096) == "moonshot-v1-128k"
+    assert select_model_tier(10 ** 6, 4096) == "moonshot-v1-128k"
+
+
+def test_moonshot_auto_routing_is_reported():
+    import types
+    from kimi_client_moonshot import KimiMoonshotClient
+
+    used = []
+
+    def create(**kwargs):
+        used.append(kwargs["model"])
+        message = types.SimpleNamespace(content="ok")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    client = KimiMoonshotClient(api_key="sk-test")
+    client.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+    client.set_model("auto")
+    client.max_tokens = 1000
+
+    client.conversation_chat("kurz")
+    client.conversation_chat("lang " + "z" * 40000)
+
+    assert used == ["moonshot-v1-8k", "moonshot-v1-32k"]
+    info = client.get_model_info()
+    assert info["routed_model"] == "moonshot-v1-32k"
+    assert info["routing_counts"] == {"moonshot-v1-8k": 1, "moonshot-v1-32k": 1}
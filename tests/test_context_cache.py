@@ -0,0 +1,111 @@
+import time
+
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_context_cache import ContextCache
+from kimi_keypool import KeyPool
+from kimi_standin_server import StandinConfig, StandinServer
+
+SYSTEM_PROMPT = "Referenzhandbuch " * 2000
+
+
+def _client(server, cache):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, context_cache=cache)
+    client.model = "moonshot-v1-128k"
+    return client
+
+
+def test_prefix_is_registered_once_and_referenced_afterwards():
+    with StandinServer(StandinConfig(retry_after=0, prefill_delay=0.05)) as server:
+        client = _client(server, ContextCache(min_tokens=100))
+        client.conversation_chat("Frage 0", system_prompt=SYSTEM_PROMPT)
+        start = time.perf_counter()
+        for i in range(1, 4):
+            assert client.conversation_chat(f"Frage {i}").startswith(f"Stand-in-Antwort: Frage {i}")
+        # Ohne Cache kostet der Präfix 0.05s pro 1000 Tokens bei jeder Anfrage
+        assert time.perf_counter() - start < 0.5
+
+        last = server.requests[-1]["messages"]
+        assert last[0]["role"] == "cache" and "reset_ttl=3600" in last[0]["content"]
+        assert all(m["role"] != "system" for m in last)
+        stats = client.get_model_info()["context_cache"]
+        assert stats["created"] == 1 and stats["hits"] == 4 and stats["cached_tokens"] > 10000
+        assert server.get_stats()["caches_created"] == 1
+        # Der Verlauf des Clients bleibt unverändert
+        assert client.conversation_history[0] == {"role": "system", "content": SYSTEM_PROMPT}
+
+
+def test_evicted_cache_falls_back_to_full_prefix_and_re_registers():
+    with StandinServer(StandinConfig(retry_after=0)) as server:
+        client = _client(server, ContextCache(min_tokens=100))
+        client.conversation_chat("Erste Frage", system_prompt=SYSTEM_PROMPT)
+        server.evict_caches()
+
+        assert client.conversation_chat("Nach der Verdrängung").startswith("Stand-in-Antwort")
+        retried = server.requests[-1]["messages"]
+        assert retried[0] == {"role": "system", "content": SYSTEM_PROMPT}
+
+        client.conversation_chat("Wieder gecacht")
+        assert server.requests[-1]["messages"][0]["role"] == "cache"
+        stats = client.context_cache.get_stats()
+        assert stats["evicted"] == 1 and stats["created"] == 2
+
+
+def test_each_use_resets_the_ttl_and_expired_entries_are_refreshed():
+    with StandinServer(StandinConfig(retry_after=0)) as server:
+        client = _client(server, ContextCache(ttl=1, min_tokens=100))
+        client.conversation_chat("Eins", system_prompt=SYSTEM_PROMPT)
+        for message in ("Zwei", "Drei"):
+            time.sleep(0.6)
+            client.conversation_chat(message)
+        assert client.context_cache.get_stats()["created"] == 1
+
+        time.sleep(1.1)
+        client.conversation_chat("Vier")
+        stats = client.context_cache.get_stats()
+        assert stats["refreshed"] == 1 and stats["created"] == 2 and stats["evicted"] == 0
+
+
+def test_small_prefixes_and_failed_registrations_send_the_full_request():
+    class FailingClient:
+        base_url = "http://127.0.0.1:1/v1"
+        posts = 0
+
+        def post(self, *args, **kwargs):
+            FailingClient.posts += 1
+            raise RuntimeError("Caching nicht verfügbar")
+
+    sent = []
+    cache = ContextCache(min_tokens=100, retry_after_failure=60)
+    small = {"model": "moonshot-v1-8k", "messages": [{"role": "system", "content": "kurz"}, {"role": "user", "content": "Hallo"}]}
+    cache.call(FailingClient(), small, sent.append)
+    large = {"model": "moonshot-v1-8k", "messages": [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "Hallo"}]}
+    cache.call(FailingClient(), large, sent.append)
+    cache.call(FailingClient(), large, sent.append)
+
+    assert sent == [small, large, large]
+    assert FailingClient.posts == 1
+    stats = cache.get_stats()
+    assert stats["skipped"] == 1 and stats["errors"] == 1 and stats["hits"] == 0
+
+
+def test_other_model_families_and_pooled_keys():
+    prefix = [{"role": "system", "content": SYSTEM_PROMPT}, {"role": "user", "content": "Hallo"}]
+    with StandinServer(StandinConfig(retry_after=0)) as server:
+        client = _client(server, ContextCache(min_tokens=100))
+        client.model = "moonshotai/Kimi-K2-Instruct"
+        client.conversation_chat("Frage", system_prompt=SYSTEM_PROMPT)
+        assert server.get_stats().get("caches_created", 0) == 0
+        assert server.requests[-1]["messages"][0]["role"] == "system"
+        assert client.context_cache.get_stats()["other_model"] == 1
+
+        # Mit Key-Pool: Registrierung und Referenz über denselben Key
+        keys = ["sk-pool-key-0001", "sk-pool-key-0002"]
+        pooled = KimiMoonshotClient(base_url=server.base_url, key_pool=KeyPool(keys),
+                                    context_cache=ContextCache(min_tokens=100))
+        pooled.model = "moonshot-v1-128k"
+        pooled.key_pool.pick = lambda tokens=0: keys[1]
+        for _ in range(3):
+            pooled._complete(prefix)
+        used = [info["successes"] for info in pooled.get_model_info()["key_pool"]["keys"].values()]
+        stats = pooled.context_cache.get_stats()
+        assert used == [0, 3] and stats["hits"] == 3 and stats["evicted"] == 0 and stats["created"] == 1
@@ -0,0 +1,82 @@
+from kimi_client import KimiClient
+from kimi_context_cache import ContextCache
+from kimi_files import FileStore
+from kimi_standin_server import StandinConfig, StandinServer
+
+REPORT = "Quartalsbericht: Umsatz äöü gestiegen.\n" * 200
+
+
+def _client(server, store, **kwargs):
+    return KimiClient(api_key="sk-standin", base_url=server.base_url, file_store=store, **kwargs)
+
+
+def test_same_content_is_uploaded_and_extracted_once(standin, tmp_path):
+    first, second = tmp_path / "bericht.txt", tmp_path / "kopie.txt"
+    first.write_text(REPORT, encoding="utf-8")
+    second.write_text(REPORT, encoding="utf-8")
+    client = _client(standin, FileStore())
+
+    message, info = client.upload_file(str(first), with_info=True)
+    assert message == {"role": "system", "content": f"[FILE bericht.txt]:\n{REPORT}"}
+    assert not info["reused"]
+    message, info = client.upload_file(str(second), with_info=True)
+    assert message["content"].endswith(REPORT) and info["reused"]
+
+    stats = client.get_model_info()["files"]
+    assert stats["uploads"] == 1 and stats["reused"] == 1 and stats["content_fetches"] == 1
+    assert stats["bytes_saved"] == len(REPORT.encode("utf-8"))
+    server_stats = standin.get_stats()
+    assert server_stats["files_uploaded"] == 1 and server_stats["file_content_requests"] == 1
+
+
+def test_upload_cache_persists_across_processes(standin, tmp_path):
+    path = tmp_path / "bericht.txt"
+    path.write_text(REPORT, encoding="utf-8")
+    db_path = str(tmp_path / "files.db")
+    _client(standin, FileStore(db_path=db_path)).upload_file(str(path))
+
+    client = _client(standin, FileStore(db_path=db_path))
+    assert client.upload_file(str(path))["content"].endswith(REPORT)
+    assert client.file_store.get_stats()["uploads"] == 0
+    assert standin.get_stats()["files_uploaded"] == 1 and standin.get_stats()["file_content_requests"] == 1
+
+
+def test_uploads_are_not_shared_between_accounts(standin):
+    store = FileStore()
+    first = store.extract(_client(standin, store).client, "notiz.txt", b"Kurze Notiz")
+    other = KimiClient(api_key="sk-other-account", base_url=standin.base_url, file_store=store)
+    second = store.extract(other.client, "notiz.txt", b"Kurze Notiz")
+
+    assert not second["reused"] and second["id"] != first["id"]
+    assert second["content"] == "Kurze Notiz"
+    assert store.get_stats()["uploads"] == 2 and store.get_stats()["reuploads"] == 0
+
+
+def test_file_deleted_at_provider_is_uploaded_again(standin):
+    store = FileStore()
+    client = _client(standin, store)
+    info = store.upload(client.client, "notiz.txt", b"Kurze Notiz")
+    standin.delete_files()
+
+    extracted = store.extract(client.client, "notiz.txt", b"Kurze Notiz")
+    assert extracted["content"] == "Kurze Notiz" and not extracted["reused"]
+    stats = store.get_stats()
+    assert stats["reuploads"] == 1 and stats["uploads"] == 2
+    assert store.upload(client.client, "notiz.txt", b"Kurze Notiz")["id"] != info["id"]
+
+
+def test_file_messages_are_sent_once_with_context_caching(tmp_path):
+    path = tmp_path / "bericht.txt"
+    path.write_text(REPORT, encoding="utf-8")
+    with StandinServer(StandinConfig(retry_after=0)) as server:
+        client = _client(server, FileStore(), context_cache=ContextCache(min_tokens=500, cache_model=None))
+        conversation = [{"role": "system", "content": "Du bist ein Analyst."}, client.upload_file(str(path))]
+        for question in ("Wie lief das Quartal?", "Und der Ausblick?"):
+            conversation.append({"role": "user", "content": question})
+            conversation.append({"role": "assistant", "content": "".join(client.chat_stream(conversation))})
+
+        assert len(server.requests) == 2
+        for request in server.requests:
+            assert request["messages"][0]["role"] == "cache"
+            assert all(REPORT not in str(m.get("content")) for m in request["messages"])
+        assert server.get_stats()["caches_created"] == 1
@@ -0,0 +1,66 @@
+import time
+
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_hedge import HedgePolicy
+from kimi_prewarm import warm_openai_client
+
+
+def _client(standin, policy, model="moonshot-v1-128k"):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, hedge=policy)
+    client.model = model
+    # SDK-Import und Verbindungsaufbau nicht in die gemessene Zeit einrechnen
+    warm_openai_client(client.client)
+    return client
+
+
+def test_slow_first_token_is_hedged_and_the_hedge_wins(standin):
+    policy = HedgePolicy(initial_delay=0.05, hedge_model="auto")
+    client = _client(standin, policy)
+    standin.slow_next(1.0)
+
+    start = time.perf_counter()
+    text = "".join(client.chat_stream([{"role": "user", "content": "Hallo"}]))
+    assert time.perf_counter() - start < 0.8
+    assert text.startswith("Stand-in-Antwort")
+
+    stats = client.get_model_info()["hedging"]
+    assert stats["hedged"] == 1 and stats["hedge_wins"] == 1 and stats["losers_closed"] == 1
+    assert stats["hedge_rate"] == 1.0
+    # Gemessen wird ab Start des Primärversuchs - die Wartezeit bis zum Duplikat zählt mit
+    assert min(policy._samples) >= 0.05
+    # Das Duplikat geht an das kleinste passende Tier
+    assert [r["model"] for r in standin.requests] == ["moonshot-v1-128k", "moonshot-v1-8k"]
+
+
+def test_fast_responses_are_not_hedged(standin):
+    policy = HedgePolicy(initial_delay=1.0)
+    client = _client(standin, policy)
+    for i in range(3):
+        assert client.chat(f"Frage {i}").startswith("Stand-in-Antwort")
+
+    stats = policy.get_stats()
+    assert stats["requests"] == 3 and stats["hedged"] == 0 and stats["primary_wins"] == 3
+    assert stats["samples"] == 3
+    assert standin.get_stats()["requests"] == 3
+
+
+def test_non_streaming_chat_is_hedged_too(standin):
+    policy = HedgePolicy(initial_delay=0.05)
+    client = _client(standin, policy)
+    standin.slow_next(1.0)
+
+    start = time.perf_counter()
+    assert client.chat("Hallo").startswith("Stand-in-Antwort")
+    assert time.perf_counter() - start < 0.8
+    assert policy.get_stats()["hedge_wins"] == 1
+
+
+def test_delay_follows_the_ttft_percentile():
+    policy = HedgePolicy(percentile=90, initial_delay=3.0, min_delay=0.01, min_samples=5)
+    assert policy.delay == 3.0
+    for ttft in (0.1, 0.2, 0.3, 0.4, 0.5, 0.6, 0.7, 0.8, 0.9, 1.0, 1.1):
+        policy.observe(ttft)
+    assert abs(policy.delay - 1.0) < 1e-9
+
+    policy.max_delay = 0.5
+    assert policy.delay == 0.5
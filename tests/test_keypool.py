@@ -0,0 +1,124 @@
+import time
+import types
+
+import pytest
+
+import kimi_keypool
+from conftest import DummyStatusError
+from kimi_client import KimiClient
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_keypool import KeyPool, KeyPoolExhausted, get_shared_key_pool, parse_reset
+from kimi_ratelimit import retry_after
+from kimi_standin_server import StandinConfig, StandinServer
+
+KEYS = ["sk-pool-key-0001", "sk-pool-key-0002", "sk-pool-key-0003"]
+
+
+def test_requests_are_spread_over_all_keys(standin):
+    client = KimiMoonshotClient(base_url=standin.base_url, key_pool=KeyPool(KEYS))
+    for i in range(6):
+        assert client.chat(f"Frage {i}")
+
+    stats = client.get_model_info()["key_pool"]
+    assert stats["active_keys"] == 3
+    assert [info["successes"] for info in stats["keys"].values()] == [2, 2, 2]
+
+
+def test_clients_share_the_pool_from_the_environment(monkeypatch, standin):
+    monkeypatch.setenv("MOONSHOT_API_KEYS", ",".join(KEYS))
+    first = KimiMoonshotClient(base_url=standin.base_url)
+    second = KimiClient(base_url=standin.base_url)
+    assert first.key_pool is second.key_pool is get_shared_key_pool()
+
+    assert first.chat("Frage 1") and second.chat("Frage 2")
+    keys = get_shared_key_pool().get_stats()["keys"]
+    assert sum(info["requests"] for info in keys.values()) == 2
+
+
+def test_throughput_grows_with_the_number_of_keys(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(kimi_keypool.time, "sleep", sleeps.append)
+
+    single = KeyPool(KEYS[:1], requests_per_minute=6)
+    for _ in range(12):
+        single.call(lambda key: key)
+    assert len(sleeps) == 6
+
+    sleeps.clear()
+    pool = KeyPool(KEYS[:2], requests_per_minute=6)
+    used = [pool.call(lambda key: key) for _ in range(12)]
+    assert sleeps == []
+    assert used.count(KEYS[0]) == used.count(KEYS[1]) == 6
+
+
+def test_rate_limited_key_fails_over_without_backoff():
+    with StandinServer(StandinConfig(retry_after=5)) as server:
+        client = KimiMoonshotClient(base_url=server.base_url, key_pool=KeyPool(KEYS[:2]))
+        server.fail_next(429)
+        start = time.perf_counter()
+        assert client.chat("Hallo")
+        assert time.perf_counter() - start < 2
+
+        info = client.get_model_info()
+        keys = list(info["key_pool"]["keys"].values())
+        assert keys[0]["rate_limited"] == 1 and keys[0]["quarantined"]
+        assert keys[1]["successes"] == 1
+        assert info["request_stats"]["retries"] == 0
+
+
+def test_invalid_keys_and_429_storms_are_quarantined():
+    with StandinServer(StandinConfig(invalid_keys=[KEYS[0]])) as server:
+        client = KimiMoonshotClient(base_url=server.base_url, key_pool=KeyPool(KEYS))
+        for _ in range(4):
+            assert client.chat("Hallo")
+        keys = list(client.get_model_info()["key_pool"]["keys"].values())
+        assert keys[0]["auth_errors"] == 1 and keys[0]["quarantined"] and keys[0]["successes"] == 0
+        assert server.get_stats()["auth_errors"] == 1
+
+    pool = KeyPool(KEYS[:2], storm_threshold=3, quarantine=60)
+
+    def storm(key):
+        if key == KEYS[0]:
+            raise DummyStatusError(429)
+        return key
+
+    state = pool._states[KEYS[0]]
+    for _ in range(3):
+        # Kurze Sperre nach jedem 429 überspringen, damit der Key erneut gewählt wird
+        state.blocked_until = 0.0
+        assert pool.call(storm) == KEYS[1]
+    info = pool.get_stats()["keys"]["sk-...0001"]
+    assert info["rate_limited"] == 3 and info["quarantines"] == 1
+    assert state.blocked_until - time.monotonic() > 30
+    assert [pool.call(storm) for _ in range(3)] == [KEYS[1]] * 3
+
+
+def test_rate_limit_headers_steer_requests_away():
+    pool = KeyPool(KEYS[:2])
+    request = types.SimpleNamespace(headers={"authorization": f"Bearer {KEYS[0]}"})
+    pool.observe(types.SimpleNamespace(request=request, headers={
+        "x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "6m0s"}))
+    assert [pool.call(lambda key: key) for _ in range(3)] == [KEYS[1]] * 3
+    assert parse_reset("1m30s") == 90 and parse_reset("20ms") == pytest.approx(0.02)
+
+
+def test_quarantined_keys_fail_fast_instead_of_waiting():
+    pool = KeyPool(KEYS[:1], auth_quarantine=5)
+
+    def revoked(key):
+        raise DummyStatusError(401)
+
+    with pytest.raises(DummyStatusError):
+        pool.call(revoked)
+    start = time.perf_counter()
+    with pytest.raises(KeyPoolExhausted) as info:
+        pool.call(lambda key: key)
+    assert time.perf_counter() - start < 0.5
+    assert info.value.status_code is None and "status 401" in str(info.value)
+
+    # Kurze 429-Sperre: kein Warten im Pool, Retry-After für das Backoff von call_with_retry
+    pool = KeyPool(KEYS[:1])
+    pool._failure(pool._states[KEYS[0]], DummyStatusError(429), 429, 2.0)
+    with pytest.raises(KeyPoolExhausted) as info:
+        pool.call(lambda key: key)
+    assert info.value.status_code == 429 and 1.5 < retry_after(info.value) <= 2.0
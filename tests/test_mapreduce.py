@@ -0,0 +1,93 @@
+import threading
+
+from kimi_client import KimiClient
+from kimi_context import estimate_tokens
+from kimi_mapreduce import MapReduce, split_document
+
+CODE = "".join(f"def funktion_{i}(wert):\n    ergebnis = wert * {i}\n    return ergebnis\n\n\n" for i in range(120))
+TEXT = "".join(f"## Kapitel {i}\n\nDer Umsatz stieg im Quartal {i}. Die Kosten blieben stabil.\n\n" for i in range(80))
+
+
+def test_split_document_respects_boundaries_size_and_overlap():
+    chunks = split_document(CODE, 200, kind="code")
+    assert len(chunks) > 1 and "".join(chunks) == CODE
+    assert all(estimate_tokens(chunk) <= 200 for chunk in chunks)
+    assert all(chunk.startswith("def funktion_") for chunk in chunks)
+
+    overlapping = split_document(CODE, 200, overlap_tokens=30, kind="code")
+    assert len(overlapping) == len(chunks)
+    for i in range(1, len(chunks)):
+        overlap = overlapping[i][:len(overlapping[i]) - len(chunks[i])]
+        assert overlap and chunks[i - 1].endswith(overlap) and overlapping[i].endswith(chunks[i])
+
+    sections = split_document(TEXT, 150)
+    assert "".join(sections) == TEXT and all(section.startswith("## Kapitel") for section in sections)
+
+
+def test_partial_results_are_reduced_hierarchically():
+    prompts = []
+    lock = threading.Lock()
+
+    def complete(prompt):
+        with lock:
+            prompts.append(prompt)
+        return f"Teilergebnis {len(prompt)}"
+
+    pipeline = MapReduce(complete, chunk_tokens=100, overlap_tokens=0, fan_in=3, concurrency=4)
+    summary = pipeline.run(CODE, "Finde Bugs", kind="code", name="modul.py")
+
+    assert summary["chunks"] == summary["map_calls"] == len(split_document(CODE, 100, kind="code"))
+    assert summary["chunks"] > 9 and summary["levels"] >= 3
+    assert summary["reduce_calls"] == sum(p.startswith("Die folgenden Teilergebnisse") for p in prompts)
+    assert summary["result"].startswith("Teilergebnis")
+    assert all("modul.py" in p and "Finde Bugs" in p for p in prompts)
+
+    single = MapReduce(complete, chunk_tokens=100000).run("kurzer Text", "Fasse zusammen")
+    assert single["map_calls"] == 1 and single["reduce_calls"] == 0 and single["chunks"] == 1
+
+
+def test_oversized_partials_still_converge():
+    calls = []
+    lock = threading.Lock()
+
+    def complete(prompt):
+        with lock:
+            calls.append(estimate_tokens(prompt))
+        return "Befund " * 1000  # ~1500 Tokens, größer als reduce_tokens / 2
+
+    pipeline = MapReduce(complete, chunk_tokens=100, overlap_tokens=0, reduce_tokens=2048, concurrency=4)
+    summary = pipeline.run(CODE, "Finde Bugs", kind="code")
+
+    assert summary["chunks"] > 9
+    assert summary["reduce_calls"] < summary["chunks"] and summary["levels"] <= summary["chunks"].bit_length()
+    assert len(calls) == summary["map_calls"] + summary["reduce_calls"]
+    assert max(calls[summary["map_calls"]:]) < 2048 + 200  # gekürzte Teilergebnisse plus Prompt-Rahmen
+
+
+def test_stream_yields_progress_until_done_or_error():
+    events = list(MapReduce(lambda prompt: "ok", chunk_tokens=150, fan_in=4).stream(TEXT, "Fasse zusammen"))
+    stages = [event["stage"] for event in events]
+    assert stages[0] == "split" and stages[-1] == "done"
+    assert stages.count("map") == events[0]["chunks"] and "reduce" in stages
+    assert events[-1]["result"] == "ok"
+
+    def failing(prompt):
+        raise RuntimeError("Limit erreicht")
+
+    events = list(MapReduce(failing, chunk_tokens=150).stream(TEXT, "Fasse zusammen"))
+    assert events[-1]["stage"] == "error" and "fehlgeschlagen" in events[-1]["error"]
+
+
+def test_client_map_reduce_against_standin(standin):
+    client = KimiClient(api_key="sk-standin", base_url=standin.base_url)
+    progress = []
+    pipeline = client.document_pipeline(chunk_tokens=300, concurrency=4)
+    summary = pipeline.run(TEXT, "Fasse zusammen", name="bericht.md", on_progress=progress.append)
+
+    assert summary["result"].startswith("Stand-in-Antwort")
+    assert len(standin.requests) == summary["map_calls"] + summary["reduce_calls"]
+    assert summary["map_calls"] == summary["chunks"] > 1
+    assert [event["stage"] for event in progress].count("map") == summary["chunks"]
+
+    assert client.document_pipeline().chunk_tokens >= 1000
+    assert client.map_reduce("Kurzer Bericht.", "Fasse zusammen")["map_calls"] == 1
@@ -0,0 +1,27 @@
+from kimi_client import KimiClient
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_prewarm import Prewarm
+
+
+def test_prewarm_opens_a_pooled_connection_that_the_first_chat_reuses(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, prewarm=True)
+    assert client.prewarm.wait(10)
+    assert client.get_model_info()["prewarm"]["error"] is None
+    assert standin.get_stats()["models"] == 1
+
+    assert client.chat("Hallo").startswith("Stand-in-Antwort")
+    # Keine neue TCP-Verbindung für die erste Nachricht
+    assert standin.get_stats()["connections"] == 1
+
+
+def test_prewarm_is_off_by_default(monkeypatch):
+    monkeypatch.delenv("KIMI_PREWARM", raising=False)
+    assert KimiClient(api_key="sk-test").prewarm is None
+    monkeypatch.setenv("KIMI_PREWARM", "1")
+    assert KimiClient(api_key="sk-test", base_url="http://127.0.0.1:9/v1").prewarm is not None
+
+
+def test_prewarm_errors_are_recorded_not_raised():
+    warmup = Prewarm(lambda: 1 / 0).start()
+    assert warmup.wait(5)
+    assert "division" in warmup.as_dict()["error"]
@@ -0,0 +1,57 @@
+import pytest
+
+import kimi_ratelimit
+from conftest import DummyStatusError
+from kimi_client import KimiClient
+from kimi_ratelimit import RateLimiter, RequestStats, TokenBucket, call_with_retry, retry_after
+
+
+def test_token_bucket_reserves_in_order():
+    bucket = TokenBucket(60, capacity=2)
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == 0.0
+    assert bucket.reserve() == pytest.approx(1.0, abs=0.05)
+    assert bucket.reserve() == pytest.approx(2.0, abs=0.05)
+
+
+def test_limiter_uses_the_stricter_bucket():
+    limiter = RateLimiter(requests_per_minute=600, tokens_per_minute=60)
+    assert limiter.reserve(60) == 0.0
+    assert limiter.reserve(30) == pytest.approx(30.0, abs=0.1)
+
+
+def test_retry_honors_retry_after(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(kimi_ratelimit.time, "sleep", sleeps.append)
+    attempts = []
+
+    def flaky():
+        attempts.append(1)
+        if len(attempts) < 3:
+            raise DummyStatusError(429, {"retry-after": "2"})
+        return "ok"
+
+    stats = RequestStats()
+    assert call_with_retry(flaky, stats=stats) == "ok"
+    assert sleeps == [2.0, 2.0]
+    info = stats.as_dict()
+    assert info["retries"] == 2 and info["requests"] == 1
+    assert info["backoff_total"] == 4.0
+
+
+def test_non_retryable_errors_are_raised(monkeypatch):
+    monkeypatch.setattr(kimi_ratelimit.time, "sleep", lambda s: None)
+    attempts = []
+
+    def broken():
+        attempts.append(1)
+        raise DummyStatusError(401)
+
+    with pytest.raises(DummyStatusError):
+        call_with_retry(broken)
+    assert len(attempts) == 1
+    assert retry_after(DummyStatusError(429, {"retry-after-ms": "250"})) == 0.25
+
+
+def test_clients_share_the_process_limiter():
+    assert KimiClient(api_key="sk-a").rate_limiter is KimiClient(api_key="sk-b").rate_limiter
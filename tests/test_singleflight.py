@@ -0,0 +1,130 @@
+import threading
+import time
+import types
+
+from kimi_client import KimiClient
+from kimi_singleflight import SingleFlight
+
+
+def test_do_shares_one_call_between_threads():
+    flight = SingleFlight()
+    calls = []
+    release = threading.Event()
+
+    def slow():
+        calls.append(1)
+        release.wait(2)
+        return "ergebnis"
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(flight.do("k", slow))) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    while flight.get_stats()["coalesced_calls"] < 4:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["ergebnis"] * 5
+    assert len(calls) == 1
+    assert flight.get_stats()["saved_calls"] == 4
+
+
+def test_stream_fans_out_chunks_to_late_subscribers():
+    flight = SingleFlight()
+    gate = threading.Event()
+    opened = []
+
+    def upstream():
+        opened.append(1)
+        yield "a"
+        gate.wait(2)
+        yield "b"
+
+    first = flight.stream("k", upstream)
+    assert next(first) == "a"
+    second = flight.stream("k", upstream)
+    gate.set()
+
+    assert list(first) == ["b"]
+    assert list(second) == ["a", "b"]
+    assert len(opened) == 1
+
+
+def test_stream_errors_reach_every_subscriber():
+    flight = SingleFlight()
+
+    def broken():
+        raise RuntimeError("kaputt")
+        yield
+
+    try:
+        list(flight.stream("k", broken))
+    except RuntimeError as e:
+        assert str(e) == "kaputt"
+    else:
+        raise AssertionError("error was swallowed")
+
+
+def test_client_coalesces_identical_requests():
+    release = threading.Event()
+    calls = []
+
+    def create(**kwargs):
+        calls.append(kwargs)
+        release.wait(2)
+        message = types.SimpleNamespace(content="gleich")
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+
+    client = KimiClient(api_key="sk-test")
+    client.single_flight = SingleFlight()
+    client.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(client.chat("identisch"))) for _ in range(3)]
+    for thread in threads:
+        thread.start()
+    while client.single_flight.get_stats()["coalesced_calls"] < 2:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == ["gleich"] * 3
+    assert len(calls) == 1
+
+
+def test_clients_for_other_endpoints_or_keys_are_not_coalesced():
+    release = threading.Event()
+    calls = []
+
+    def fake_client(answer):
+        def create(**kwargs):
+            calls.append(answer)
+            release.wait(2)
+            message = types.SimpleNamespace(content=answer)
+            return types.SimpleNamespace(choices=[types.SimpleNamespace(message=message)])
+        return types.SimpleNamespace(chat=types.SimpleNamespace(completions=types.SimpleNamespace(create=create)))
+
+    flight = SingleFlight()
+    clients = [KimiClient(api_key="sk-konto-a"), KimiClient(api_key="sk-konto-b"),
+               KimiClient(api_key="sk-konto-a", base_url="http://127.0.0.1:1/v1")]
+    for i, client in enumerate(clients):
+        client.single_flight = flight
+        client.client = fake_client(f"antwort-{i}")
+
+    results = {}
+    threads = [threading.Thread(target=lambda i=i, c=c: results.update({i: c.chat("identisch")}))
+               for i, c in enumerate(clients)]
+    for thread in threads:
+        thread.start()
+    deadline = time.monotonic() + 2
+    while len(calls) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    assert results == {0: "antwort-0", 1: "antwort-1", 2: "antwort-2"}
+    assert flight.get_stats()["coalesced_calls"] == 0
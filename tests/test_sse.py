@@ -0,0 +1,51 @@
+import threading
+import time
+
+import pytest
+
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_sse import iter_sse_data, parse_chunk
+from kimi_standin_server import StandinConfig, StandinServer
+
+
+def test_iter_sse_data_joins_multiline_events_and_stops_at_done():
+    lines = [": keep-alive", "", "data: {\"a\":", "data: 1}", "", "event: x", "data: {\"b\": 2}", "",
+             "data: [DONE]", "", "data: {\"c\": 3}", ""]
+    assert list(iter_sse_data(lines)) == ['{"a":\n1}', '{"b": 2}']
+
+
+def test_parse_chunk_exposes_the_sdk_attributes():
+    chunk = parse_chunk('{"id": "c1", "choices": [{"index": 0, "delta": {"content": "Hi"}, '
+                        '"finish_reason": "stop", "usage": {"completion_tokens": 1}}]}')
+    assert chunk.choices[0].delta.content == "Hi"
+    assert chunk.choices[0].finish_reason == "stop"
+    assert chunk.choices[0].usage == {"completion_tokens": 1}
+
+    with pytest.raises(Exception, match="kaputt"):
+        parse_chunk('{"error": {"message": "kaputt"}}')
+
+
+def test_raw_sse_stream_matches_the_sdk_stream(standin):
+    messages = [{"role": "user", "content": "Vergleich"}]
+    sdk = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url).chat_stream(messages).consume()
+    raw = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, raw_sse=True).chat_stream(messages)
+    assert list(raw) == sdk.chunks
+    assert raw.finish_reason == sdk.finish_reason == "stop"
+    assert raw.usage["completion_tokens"] == sdk.usage["completion_tokens"]
+
+
+def test_raw_sse_stream_can_be_cancelled():
+    with StandinServer(StandinConfig(token_delay=0.2, response_tokens=40)) as server:
+        client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, raw_sse=True)
+        stream = client.chat_stream([{"role": "user", "content": "Hallo"}])
+        finished = threading.Event()
+
+        def consume():
+            stream.consume()
+            finished.set()
+
+        threading.Thread(target=consume, daemon=True).start()
+        time.sleep(0.3)
+        stream.cancel()
+        assert finished.wait(0.5)
+        assert stream.truncated
@@ -0,0 +1,49 @@
+import json
+
+from kimi_client import KimiClient
+from kimi_client_moonshot import KimiMoonshotClient
+
+CODE_RUNNER = [{
+    "type": "function",
+    "function": {
+        "name": "code_runner",
+        "parameters": {
+            "type": "object",
+            "properties": {"language": {"type": "string", "enum": ["python", "javascript"]}, "code": {"type": "string"}},
+            "required": ["language", "code"],
+        },
+    },
+}]
+
+
+def test_chat_and_stream_against_standin(standin):
+    client = KimiClient(api_key="sk-standin", base_url=standin.base_url)
+    assert client.chat("Hallo Welt").startswith("Stand-in-Antwort: Hallo Welt")
+
+    stream = client.chat_stream([{"role": "user", "content": "Stream"}])
+    chunks = list(stream)
+    assert chunks[0] == "Stand-in-Antwort: "
+    assert stream.finish_reason == "stop"
+    assert stream.usage["completion_tokens"] == 32
+    assert client.get_model_info()["base_url"] == standin.base_url
+
+
+def test_tool_calls_and_models(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url)
+    result = client.tool_call("Führe Code aus", CODE_RUNNER)
+    assert result["finish_reason"] == "tool_calls"
+    assert json.loads(result["tool_calls"][0].function.arguments)["language"] == "python"
+    assert "moonshot-v1-8k" in [m.id for m in client.client.models.list().data]
+
+
+def test_injected_errors_are_retried(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url)
+    standin.fail_next(429, 2)
+    assert client.chat("nochmal").startswith("Stand-in-Antwort")
+    assert client.request_stats.as_dict()["retries"] == 2
+    assert standin.get_stats()["errors_injected"] == 2
+
+
+def test_base_url_from_environment(monkeypatch, standin):
+    monkeypatch.setenv("MOONSHOT_BASE_URL", standin.base_url)
+    assert KimiMoonshotClient(api_key="sk-standin").chat("env").startswith("Stand-in-Antwort")
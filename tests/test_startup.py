@@ -0,0 +1,47 @@
+import pytest
+
+from kimi_lazy import LazyModule, module_available
+from kimi_startup_benchmark import check_budgets, measure_import, parse_importtime
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 | site
+import time:       300 |        300 |     openai._client
+import time:       500 |        800 |   openai
+import time:       200 |        200 |   json
+import time:        50 |       1050 | kimi_demo
+"""
+
+
+def test_parse_importtime_collects_children_of_entry_point():
+    parsed = parse_importtime(IMPORTTIME, "kimi_demo")
+    assert parsed["cumulative_ms"] == pytest.approx(1.05)
+    assert parsed["imported"] == ["json", "openai", "openai._client"]
+    assert [d["module"] for d in parsed["direct"]] == ["openai", "json"]
+    assert parse_importtime(IMPORTTIME, "fehlt") is None
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    lazy = LazyModule("colorsys")
+    assert not lazy.loaded
+    assert lazy.rgb_to_hsv(1, 0, 0)[2] == 1
+    assert lazy.loaded
+    assert module_available("json") and not module_available("gibt_es_nicht_12345")
+
+
+@pytest.mark.parametrize("module", ["kimi_client", "kimi_client_moonshot", "kimi_chat"])
+def test_entry_points_do_not_import_heavy_dependencies(module):
+    result = measure_import(module, runs=1)
+    assert result["heavy_imports"] == []
+
+
+def test_gui_entry_point_defers_tts_and_http_libraries():
+    pytest.importorskip("tkinter")
+    result = measure_import("kimi_gui_modern", runs=1)
+    assert check_budgets([result], {}) == []
+
+
+def test_check_budgets_reports_violations():
+    result = {"module": "kimi_chat", "import_ms": 80.0, "heavy_imports": ["openai"]}
+    assert len(check_budgets([result], {"kimi_chat": 50})) == 2
+    assert check_budgets([result], {"kimi_chat": 50}, scale=2.0) == ["kimi_chat: lädt beim Import openai"]
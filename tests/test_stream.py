@@ -0,0 +1,104 @@
+import time
+import types
+
+from kimi_client import KimiClient
+from kimi_stream import StreamResult, coalesce_chunks
+
+
+def _chunk(content, finish_reason=None, usage=None):
+    delta = types.SimpleNamespace(content=content)
+    choice = types.SimpleNamespace(delta=delta, finish_reason=finish_reason, usage=usage)
+    return types.SimpleNamespace(choices=[choice], usage=None)
+
+
+class DummyCompletions:
+    def create(self, **kwargs):
+        return iter([
+            _chunk("Hal"),
+            _chunk("lo"),
+            _chunk(None, "stop", {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5}),
+        ])
+
+
+def _client():
+    client = KimiClient(api_key="sk-test")
+    client.client = types.SimpleNamespace(chat=types.SimpleNamespace(completions=DummyCompletions()))
+    return client
+
+
+def test_stream_result_collects_text_and_metrics():
+    stream = _client().chat_stream([{"role": "user", "content": "hi"}])
+    assert list(stream) == ["Hal", "lo"]
+    assert stream.text == "Hallo"
+    assert stream.finish_reason == "stop"
+    assert stream.usage["completion_tokens"] == 2
+    assert stream.chunk_count == 2
+    assert stream.time_to_first_token is not None
+    assert stream.done
+
+
+def test_conversation_stream_appends_joined_text():
+    client = _client()
+    assert client.conversation_stream("hi").consume().text == "Hallo"
+    assert client.conversation_history[-1] == {"role": "assistant", "content": "Hallo"}
+
+
+def test_stream_result_is_single_use():
+    stream = StreamResult(lambda result: iter(["a"]))
+    stream.consume()
+    try:
+        list(stream)
+    except RuntimeError:
+        pass
+    else:
+        raise AssertionError("second iteration should fail")
+
+
+def _ticking(chunks, delay):
+    for chunk in chunks:
+        time.sleep(delay)
+        yield chunk
+
+
+def test_coalesce_batches_chunks_but_keeps_the_first_one_immediate():
+    parts = [f"w{i} " for i in range(100)]
+    start = time.perf_counter()
+    out = []
+    first_at = None
+    for piece in coalesce_chunks(_ticking(parts, 0.002), interval=0.03):
+        if first_at is None:
+            first_at = time.perf_counter() - start
+        out.append(piece)
+
+    assert "".join(out) == "".join(parts)
+    assert out[0] == "w0 "
+    assert first_at < 0.02
+    assert len(out) <= 20
+
+
+def test_coalesce_flushes_while_the_upstream_stalls():
+    def stalling():
+        yield "a"
+        yield "b"
+        time.sleep(0.3)
+        yield "c"
+
+    start = time.perf_counter()
+    seen = []
+    for piece in coalesce_chunks(stalling(), interval=0.02):
+        seen.append((piece, time.perf_counter() - start))
+    assert [p for p, _ in seen] == ["a", "b", "c"]
+    # "b" wartet nicht auf "c"
+    assert seen[1][1] < 0.1
+
+
+def test_coalesce_respects_max_chars():
+    out = list(coalesce_chunks(iter(["x"] + ["abc"] * 10), interval=10, max_chars=6))
+    assert out[0] == "x" and all(len(piece) == 6 for piece in out[1:])
+
+
+def test_leaving_a_coalesced_stream_early_cancels_it():
+    stream = StreamResult(lambda result: _ticking(["a", "b", "c", "d"], 0.01))
+    for _ in stream.coalesce(interval=0.001):
+        break
+    assert stream.cancelled
@@ -0,0 +1,149 @@
+import json
+import threading
+import time
+import types
+
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_standin_server import StandinConfig, StandinServer
+from kimi_tools import ToolCallAssembler, ToolLoop
+
+SLOW_TOOLS = [{
+    "type": "function",
+    "function": {
+        "name": name,
+        "parameters": {"type": "object", "properties": {"query": {"type": "string"}}, "required": ["query"]},
+    },
+} for name in ("search", "lookup")]
+
+
+def _client(server):
+    return KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url)
+
+
+def test_all_calls_of_a_round_run_in_parallel_over_several_rounds():
+    with StandinServer(StandinConfig(retry_after=0, tool_calls_per_turn=3, tool_rounds=2)) as server:
+        client = _client(server)
+        running, peak, lock = [0], [0], threading.Lock()
+
+        def slow(arguments):
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.2)
+            with lock:
+                running[0] -= 1
+            return {"query": arguments["query"], "hits": 1}
+
+        result = client.run_tools("Recherchiere", SLOW_TOOLS, {"search": slow, "lookup": slow})
+
+        assert result["stop_reason"] == "stop" and result["rounds"] == 2
+        assert result["content"].startswith("Stand-in-Antwort")
+        assert len(result["tool_calls"]) == 6 and peak[0] == 3
+        assert result["tool_time"] < 0.6  # 2 Runden x 0.2s statt 6 x 0.2s
+
+        # Verlauf: User-Nachricht bleibt, jedes Ergebnis kommt in Call-Reihenfolge zurück
+        roles = [m["role"] for m in result["messages"]]
+        assert roles == ["user"] + (["assistant"] + ["tool"] * 3) * 2 + ["assistant"]
+        final_request = server.requests[-1]["messages"]
+        assert final_request[0]["content"] == "Recherchiere"
+        assert [m["tool_call_id"] for m in final_request[2:5]] == \
+            [c["id"] for c in final_request[1]["tool_calls"]]
+
+        stats = client.get_model_info()["tools"]
+        assert stats["search"]["calls"] == 4 and stats["lookup"]["calls"] == 2
+        assert stats["search"]["avg_time"] >= 0.2
+
+
+def test_tool_errors_and_unknown_tools_are_fed_back():
+    with StandinServer(StandinConfig(retry_after=0, tool_calls_per_turn=2)) as server:
+        client = _client(server)
+
+        def broken(arguments):
+            raise RuntimeError("Index nicht erreichbar")
+
+        result = client.run_tools("Suche", SLOW_TOOLS, {"search": broken})
+        assert result["stop_reason"] == "stop"
+        tool_messages = [m for m in result["messages"] if m["role"] == "tool"]
+        assert json.loads(tool_messages[0]["content"]) == {"error": "Index nicht erreichbar"}
+        assert "Unbekanntes Tool: lookup" in tool_messages[1]["content"]
+        assert [record["error"] is not None for record in result["tool_calls"]] == [True, True]
+        assert client.tool_stats.as_dict()["search"]["errors"] == 1
+
+
+def test_round_and_time_budgets_stop_the_loop():
+    with StandinServer(StandinConfig(retry_after=0, tool_rounds=10)) as server:
+        client = _client(server)
+        result = client.run_tools("Endlos", SLOW_TOOLS, {"search": lambda args: "ok"}, max_rounds=3)
+        assert result["stop_reason"] == "max_rounds" and result["rounds"] == 3
+        # Letzte Anfrage ohne Tools erzwingt eine Text-Antwort
+        assert server.requests[-1]["tool_choice"] == "none"
+        assert result["content"].startswith("Stand-in-Antwort")
+
+        start = time.perf_counter()
+        result = client.run_tools("Langsam", SLOW_TOOLS, {"search": lambda args: time.sleep(0.5)},
+                                  time_budget=0.1)
+        assert time.perf_counter() - start < 0.45
+        assert result["stop_reason"] == "time_budget" and result["rounds"] == 1
+        assert result["tool_calls"][0]["error"] == "Timeout"
+
+
+def test_calls_without_or_with_duplicate_ids_each_get_their_result():
+    def message(content, tool_calls=None):
+        return types.SimpleNamespace(choices=[types.SimpleNamespace(
+            message=types.SimpleNamespace(content=content, tool_calls=tool_calls))])
+
+    def call(call_id, query):
+        return {"id": call_id, "function": {"name": "search", "arguments": json.dumps({"query": query})}}
+
+    replies = iter([message(None, [call(None, "a"), call(None, "b"), call("x", "c"), call("x", "d")]),
+                    message("fertig")])
+    result = ToolLoop(lambda messages, tool_choice: next(replies), {"search": lambda args: args["query"]}).run(
+        [{"role": "user", "content": "Suche"}])
+
+    tool_messages = [m for m in result["messages"] if m["role"] == "tool"]
+    assert [m["content"] for m in tool_messages] == ["a", "b", "c", "d"]
+    assert [m["tool_call_id"] for m in tool_messages] == [None, None, "x", "x"]
+    assert result["content"] == "fertig"
+
+
+def test_code_runner_executes_every_call_and_keeps_the_prompt():
+    with StandinServer(StandinConfig(retry_after=0, tool_calls_per_turn=2)) as server:
+        client = _client(server)
+        client.model = "moonshot-v1-32k"
+        answer = client.execute_with_code_runner("Rechne etwas aus")
+
+        assert answer.startswith("Stand-in-Antwort")
+        follow_up = server.requests[-1]
+        assert follow_up["model"] == "moonshot-v1-32k"
+        assert follow_up["messages"][0] == {"role": "user", "content": "Rechne etwas aus"}
+        outputs = [json.loads(m["content"]) for m in follow_up["messages"] if m["role"] == "tool"]
+        assert len(outputs) == 2 and all(o["stdout"] == "stand-in\n" for o in outputs)
+
+
+def test_streamed_calls_start_before_the_stream_ends():
+    with StandinServer(StandinConfig(retry_after=0, tool_calls_per_turn=3, token_delay=0.05, response_tokens=4)) as server:
+        for raw_sse in (False, True):
+            client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, raw_sse=raw_sse)
+            started = []
+            result = client.run_tools("Suche parallel", SLOW_TOOLS,
+                                      {"search": lambda args: started.append(time.perf_counter()) or args,
+                                       "lookup": lambda args: started.append(time.perf_counter()) or args},
+                                      stream=True)
+
+            assert result["stop_reason"] == "stop" and result["early_calls"] == 3
+            # Der erste Call läuft, während das Modell die weiteren noch sendet
+            assert max(started) - min(started) > 0.1
+            tool_messages = [m for m in result["messages"] if m["role"] == "tool"]
+            assert [json.loads(m["content"]) for m in tool_messages] == [{"query": "stand-in"}] * 3
+            assert result["content"].startswith("Stand-in-Antwort")
+
+
+def test_assembler_completes_calls_as_soon_as_their_json_closes():
+    assembler = ToolCallAssembler()
+    assert assembler.feed([{"index": 0, "id": "a", "function": {"name": "search", "arguments": '{"q": "}'}}]) == []
+    ready = assembler.feed([{"index": 0, "function": {"arguments": '"}'}}])
+    assert [call["id"] for call in ready] == ["a"] and json.loads(ready[0]["function"]["arguments"]) == {"q": "}"}
+    # Ungültiges JSON wird spätestens beim nächsten Index abgeschlossen (Fehler meldet der Loop)
+    assert assembler.feed([{"index": 1, "id": "b", "function": {"name": "x", "arguments": "{kaputt}"}}]) == []
+    assert [call["id"] for call in assembler.feed([{"index": 2, "id": "c", "function": {"name": "y"}}])] == ["b"]
+    assert [call["id"] for call in assembler.finish()] == ["c"]
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from kimi_client_moonshot import KimiMoonshotClient
+from kimi_standin_server import StandinConfig, StandinServer
+from kimi_wire import compression_setting, dumps
+
+LONG_HISTORY = [{"role": "user" if i % 2 == 0 else "assistant", "content": f"Nachricht {i}: Äpfel und Birnen " * 20}
+                for i in range(40)]
+
+
+def test_dumps_is_compact_utf8_and_matches_json():
+    payload = {"messages": [{"role": "user", "content": "Grüße 👋"}], "temperature": 0.6}
+    data = dumps(payload)
+    assert b" " not in data.replace("Grüße 👋".encode(), b"")
+    assert "Grüße 👋".encode() in data
+    assert json.loads(data) == payload
+
+    assert compression_setting("off") is None
+    assert compression_setting(" GZIP ") == "gzip"
+    with pytest.raises(ValueError):
+        compression_setting("brotli")
+
+
+def test_compact_json_sends_the_same_request(standin):
+    sdk = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url)
+    compact = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, compact_json=True)
+    sdk.conversation_history = list(LONG_HISTORY)
+    compact.conversation_history = list(LONG_HISTORY)
+
+    assert compact.conversation_chat("Weiter") == sdk.conversation_chat("Weiter")
+    assert "".join(compact.chat_stream([{"role": "user", "content": "Hallo"}])) \
+        == "".join(sdk.chat_stream([{"role": "user", "content": "Hallo"}]))
+    first, second = standin.requests[0], standin.requests[1]
+    assert first == second
+
+    wire = compact.get_model_info()["wire"]
+    assert wire["requests"] == 2 and wire["compressed"] == 0
+    assert wire["wire_bytes"] == wire["body_bytes"]
+
+
+def test_gzip_bodies_above_threshold(standin):
+    client = KimiMoonshotClient(api_key="sk-standin", base_url=standin.base_url, compact_json=True, compression="gzip")
+    client.wire.threshold = 4096
+    client.conversation_history = list(LONG_HISTORY)
+
+    assert client.conversation_chat("Weiter")
+    assert client.chat("Kurz")
+    assert list(client.chat_stream(LONG_HISTORY + [{"role": "user", "content": "Stream"}]))
+
+    wire = client.get_model_info()["wire"]
+    assert wire["requests"] == 3 and wire["compressed"] == 2
+    assert wire["saving_ratio"] > 0.5
+    assert wire["last_request"]["encoding"] == "gzip"
+    assert standin.get_stats()["compressed_requests"] == 2
+    assert standin.get_stats()["bytes_received"] == wire["wire_bytes"]
+    assert standin.requests[0]["messages"][:-1] == LONG_HISTORY
+
+
+def test_falls_back_when_the_endpoint_rejects_compression():
+    with StandinServer(StandinConfig(accept_compression=False)) as server:
+        client = KimiMoonshotClient(api_key="sk-standin", base_url=server.base_url, compression="deflate")
+        client.wire.threshold = 0
+        assert client.chat("Hallo")
+        assert client.chat("Nochmal")
+
+        wire = client.get_model_info()["wire"]
+        assert wire["compression"] is None
+        assert wire["uncompressed_fallbacks"] == 1 and wire["compressed"] == 0
+        assert server.get_stats()["requests"] == 2
+
+
+def test_proxy_settings_from_the_environment_still_apply(monkeypatch):
+    monkeypatch.setenv("HTTPS_PROXY", "http://proxy.invalid:3128")
+    monkeypatch.setenv("HTTP_PROXY", "http://proxy.invalid:3128")
+    for compression in ("off", "gzip"):
+        client = KimiMoonshotClient(api_key="sk-test", base_url="https://api.example.invalid/v1",
+                                    compression=compression)
+        mounts = client.client._client._mounts
+        assert mounts and all(transport is not None for transport in mounts.values())
+        assert all(type(transport).__name__ == ("_WireTransport" if compression == "gzip" else "HTTPTransport")
+                   for transport in mounts.values())
@@ -8,9 +8,14 @@ Advanced AI agent with code execution and analysis capabilities
 
 import os
 import threading
-from typing import Optional, List, Dict, Any
+from typing import Optional, List, Dict, Any, Callable
 from openai import OpenAI
 from tools.execution_toolkit import execute_shell_command, read_file, write_file
+from tools.map_reduce import estimate_tokens, split_code, map_reduce
+from tools.rate_limit import call_with_retry, get_shared_limiter
+
+# Code above this size is analyzed in chunks (map-reduce) instead of one request
+MAX_CHUNK_TOKENS = 24000
 
 
 class KimiK2Agent:
@@ -18,7 +23,8 @@ class KimiK2Agent:
     Advanced Kimi K2 Agent with autonomous execution capabilities
     """
     
-    def __init__(self, api_key: Optional[str] = None, model: str = "moonshotai/Kimi-K2-Instruct", temperature: float = 0.6):
+    def __init__(self, api_key: Optional[str] = None, model: str = "moonshotai/Kimi-K2-Instruct", temperature: float = 0.6,
+                 base_url: Optional[str] = None):
         """
         Initialize the Kimi K2 Agent
         
@@ -26,12 +32,16 @@ class KimiK2Agent:
             api_key: Moonshot AI API key
             model: Model name to use
             temperature: Response temperature (0.0-1.0)
+            base_url: API endpoint (default: MOONSHOT_BASE_URL, e.g. a local stand-in server)
         """
         self.api_key = api_key or os.getenv("MOONSHOT_API_KEY")
         if not self.api_key or self.api_key == "sk-demo_key_please_replace":
             raise ValueError("Valid MOONSHOT_API_KEY is required")
         
-        self.client = OpenAI(api_key=self.api_key, base_url="https://api.moonshot.ai/v1")
+        self.base_url = base_url or os.getenv("MOONSHOT_BASE_URL", "https://api.moonshot.ai/v1")
+        # Retries are handled by call_with_retry under the shared limiter
+        self.client = OpenAI(api_key=self.api_key, base_url=self.base_url, max_retries=0)
+        self.limiter = get_shared_limiter()
         self.model = model
         self.temperature = temperature
         self.conversation_history = []
@@ -65,12 +75,7 @@ class KimiK2Agent:
             messages.extend(self.conversation_history)
             
             # Get response
-            response = self.client.chat.completions.create(
-                model=self.model,
-                messages=messages,
-                temperature=self.temperature,
-                max_tokens=4096
-            )
+            response = self._create(messages)
             
             assistant_response = response.choices[0].message.content
             
@@ -82,17 +87,50 @@ class KimiK2Agent:
         except Exception as e:
             return f"Error communicating with Kimi K2: {e}"
     
-    def analyze_code(self, code: str, filename: str = "") -> str:
+    def _create(self, messages: List[Dict[str, str]]):
+        """Chat completion under the shared rate limit, retried on 429/5xx"""
+        return call_with_retry(lambda: self.client.chat.completions.create(
+            model=self.model,
+            messages=messages,
+            temperature=self.temperature,
+            max_tokens=4096
+        ), self.limiter)
+    
+    def _complete(self, prompt: str, system_prompt: str) -> str:
+        """Single request without touching the conversation history"""
+        response = self._create([{"role": "system", "content": system_prompt}, {"role": "user", "content": prompt}])
+        return response.choices[0].message.content or ""
+    
+    def analyze_code(self, code: str, filename: str = "",
+                     on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
         """
         Analyze code for bugs, improvements, and best practices
         
+        Code larger than MAX_CHUNK_TOKENS is split at definition boundaries,
+        the chunks are analyzed concurrently and the results merged.
+        
         Args:
             code: Code to analyze
             filename: Optional filename for context
+            on_progress: Optional callback(event) for chunked analysis
             
         Returns:
             Analysis results
         """
+        system_prompt = "You are an expert code reviewer and security analyst."
+        if estimate_tokens(code) > MAX_CHUNK_TOKENS:
+            task = ("Analyze the code for bugs, performance, code quality, security and optimization. "
+                    "Provide specific recommendations.")
+            try:
+                analysis = map_reduce(lambda prompt: self._complete(prompt, system_prompt),
+                                      split_code(code, MAX_CHUNK_TOKENS), task, filename,
+                                      on_progress=on_progress)
+            except Exception as e:
+                return f"Error communicating with Kimi K2: {e}"
+            self.conversation_history.append({"role": "user", "content": f"Analyze {filename or 'the code'}"})
+            self.conversation_history.append({"role": "assistant", "content": analysis})
+            return analysis
+        
         prompt = f"""
 Analyze the following code for:
 1. Potential bugs and issues
@@ -109,7 +147,7 @@ Code:
 
 Provide a detailed analysis with specific recommendations.
 """
-        return self.chat(prompt, "You are an expert code reviewer and security analyst.")
+        return self.chat(prompt, system_prompt)
     
     def generate_tests(self, code: str, language: str = "python") -> str:
         """
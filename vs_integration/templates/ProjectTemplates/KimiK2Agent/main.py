@@ -31,7 +31,8 @@ def main():
         agent = KimiK2Agent(
             api_key=config.API_KEY,
             model=config.MODEL_NAME,
-            temperature=config.TEMPERATURE
+            temperature=config.TEMPERATURE,
+            base_url=config.BASE_URL
         )
         
         # Example: Interactive mode
@@ -78,7 +79,11 @@ Available commands:
             if os.path.exists(filename):
                 with open(filename, 'r') as f:
                     code = f.read()
-                result = agent.analyze_code(code, filename)
+                def show_progress(event):
+                    stage = "Analyzing" if event["stage"] == "map" else f"Merging (level {event['level']})"
+                    print(f"\r⏳ {stage}: {event['done']}/{event['total']}", end="", flush=True)
+                
+                result = agent.analyze_code(code, filename, on_progress=show_progress)
                 print(f"\n📊 Analysis for {filename}:\n{result}")
             else:
                 print(f"❌ File not found: {filename}")
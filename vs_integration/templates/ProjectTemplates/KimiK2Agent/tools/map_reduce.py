@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Map-Reduce for Kimi K2 Agent
+Process code or documents larger than the context window in chunks and merge the results
+"""
+
+import re
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# Start of a top-level or class-level definition (Python, JS/TS, Java, C#, Go, Rust, ...)
+CODE_BOUNDARY = re.compile(
+    r"^(?: {4}|\t)?(?:@|def |async def |class |function |export |public |private |protected |static |"
+    r"func |fn |pub |impl |interface |struct |enum |type |const |let |var |namespace |#{1,6} )"
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token estimate (~4 characters per token)"""
+    return (len(text) + 3) // 4
+
+
+def split_code(text: str, max_tokens: int, overlap_tokens: int = 200) -> List[str]:
+    """
+    Split code at definition boundaries into chunks of at most max_tokens
+
+    Args:
+        text: Source code or document
+        max_tokens: Maximum tokens per chunk (without overlap)
+        overlap_tokens: Trailing lines of the previous chunk prepended to each chunk
+
+    Returns:
+        List of chunks in source order
+    """
+    units: List[str] = []
+    current: List[str] = []
+    previous_blank = True
+    for line in text.splitlines(keepends=True):
+        if CODE_BOUNDARY.match(line) and previous_blank and any(part.strip() for part in current):
+            units.append("".join(current))
+            current = []
+        current.append(line)
+        previous_blank = not line.strip()
+    if current:
+        units.append("".join(current))
+
+    chunks: List[List[str]] = [[]]
+    size = 0
+    for unit in units:
+        # Oversized definitions are split by lines
+        for piece in (unit.splitlines(keepends=True) if estimate_tokens(unit) > max_tokens else [unit]):
+            tokens = estimate_tokens(piece)
+            if chunks[-1] and size + tokens > max_tokens:
+                chunks.append([])
+                size = 0
+            chunks[-1].append(piece)
+            size += tokens
+
+    result = []
+    for i, chunk in enumerate(chunks):
+        overlap: List[str] = []
+        if i and overlap_tokens:
+            lines = "".join(chunks[i - 1]).splitlines(keepends=True)
+            size = 0
+            for line in reversed(lines):
+                size += estimate_tokens(line)
+                if size > overlap_tokens:
+                    break
+                overlap.insert(0, line)
+        result.append("".join(overlap + chunk))
+    return result
+
+
+def map_reduce(complete: Callable[[str], str], chunks: List[str], task: str, name: str = "",
+               max_workers: int = 4, fan_in: int = 8,
+               on_progress: Optional[Callable[[Dict[str, Any]], None]] = None) -> str:
+    """
+    Run the task on every chunk concurrently and merge the partial results hierarchically
+
+    Args:
+        complete: Sends a prompt and returns the answer (should go through the shared
+            limiter, see tools/rate_limit.py)
+        chunks: Chunks from split_code
+        task: Task description (e.g. "Find bugs and security issues")
+        name: File name for the prompts
+        max_workers: Maximum concurrent chunks (the limiter may allow fewer)
+        fan_in: Maximum partial results per merge request
+        on_progress: Optional callback(event) with stage "map" or "reduce"
+
+    Returns:
+        Merged result
+    """
+    emit = on_progress or (lambda event: None)
+
+    def run_all(prompts: List[str], stage: str, level: int = 0) -> List[str]:
+        results: List[str] = []
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(prompts)))) as pool:
+            for done, result in enumerate(pool.map(complete, prompts), 1):
+                results.append(result or "")
+                emit({"stage": stage, "level": level, "done": done, "total": len(prompts)})
+        return results
+
+    total = len(chunks)
+    partials = run_all([
+        f"You are analyzing part {i} of {total} of {name or 'a larger file'}.\nTask: {task}\n\n"
+        f"Only cover this part and cite concrete names or lines so the results can be merged later. "
+        f"The beginning may overlap with the previous part.\n\n--- Part {i}/{total} ---\n{chunk}"
+        for i, chunk in enumerate(chunks, 1)
+    ], "map")
+
+    level = 0
+    while len(partials) > 1:
+        level += 1
+        groups = [partials[i:i + fan_in] for i in range(0, len(partials), fan_in)]
+        partials = run_all([
+            f"Merge these partial results for {name or 'a larger file'} into one.\nTask: {task}\n\n"
+            f"Remove duplicates, resolve contradictions and keep every important finding.\n\n"
+            + "\n\n".join(f"--- Partial result {i} ---\n{partial}" for i, partial in enumerate(group, 1))
+            for group in groups
+        ], "reduce", level)
+    return partials[0] if partials else ""
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+"""
+Rate Limiting for Kimi K2 Agent
+Shared request budget and retry with jittered backoff for all API calls of the agent
+"""
+
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Optional
+
+# Rate limits, server errors and overload are worth retrying
+RETRY_STATUS = {429, 500, 502, 503, 504}
+
+
+class RateLimiter:
+    """
+    Token bucket (requests per minute) plus a cap on concurrent requests
+
+    One instance is shared by chat, analysis and the map-reduce fan-out (see get_shared_limiter).
+    """
+
+    def __init__(self, requests_per_minute: float = 200, max_concurrent: int = 4):
+        """
+        Args:
+            requests_per_minute: Request budget (0 = unlimited)
+            max_concurrent: Maximum requests in flight at the same time
+        """
+        self.rate = requests_per_minute / 60.0
+        self.capacity = max(1.0, requests_per_minute / 60.0)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+        self._slots = threading.BoundedSemaphore(max(1, max_concurrent))
+
+    def _wait_for_token(self):
+        if self.rate <= 0:
+            return
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+                self._updated = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+    def call(self, func: Callable[[], Any]) -> Any:
+        """Run func once a token and a free slot are available"""
+        self._wait_for_token()
+        with self._slots:
+            return func()
+
+
+def retry_after(error: Exception) -> Optional[float]:
+    """Retry-After header of an API error in seconds"""
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+
+def call_with_retry(func: Callable[[], Any], limiter: Optional[RateLimiter] = None, max_retries: int = 4,
+                    base_delay: float = 0.5, max_delay: float = 30.0) -> Any:
+    """
+    Call the API through the limiter and retry on 429/5xx with jittered exponential backoff
+
+    Args:
+        func: API call without arguments
+        limiter: Shared limiter (None = no limit)
+        max_retries: Maximum retries
+        base_delay: Base of the exponential backoff in seconds
+        max_delay: Upper bound for a single pause (also caps Retry-After)
+    """
+    attempt = 0
+    while True:
+        try:
+            return limiter.call(func) if limiter else func()
+        except Exception as e:
+            if attempt >= max_retries or getattr(e, "status_code", None) not in RETRY_STATUS:
+                raise
+            delay = retry_after(e)
+            if delay is None:
+                delay = random.uniform(0, base_delay * (2 ** attempt))
+            time.sleep(min(delay, max_delay))
+            attempt += 1
+
+
+_shared_limiter: Optional[RateLimiter] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_limiter() -> RateLimiter:
+    """Process-wide limiter (KIMI_RPM, KIMI_MAX_CONCURRENCY)"""
+    global _shared_limiter
+    with _shared_lock:
+        if _shared_limiter is None:
+            _shared_limiter = RateLimiter(float(os.getenv("KIMI_RPM", "200")),
+                                          int(os.getenv("KIMI_MAX_CONCURRENCY", "4")))
+        return _shared_limiter